@@ -0,0 +1,198 @@
+"""
+Loading serialized declarations compared to parsing their source, along with the size of both, and walking
+and type checking an arena compared to the object tree
+
+    python bench/bench_arena.py [amount of functions]
+
+Before measuring, the type checked declarations of test.v are dumped and loaded back to make sure the
+round trip keeps them the same
+"""
+import io
+import os
+import sys
+import time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from vork.tokenizer import *
+from vork.parser import Parser
+from vork.ast import *
+from vork.arena import *
+from vork.visitor import iter_children, Visitor, walk
+import source
+
+
+def module_decls(module: Module) -> list:
+    return list(module.interop.values()) + list(module.decls.values()) + list(module.methods.values())
+
+
+def nodes_of(decls: list) -> list:
+    """
+    All the nodes of the declarations, in pre-order
+    """
+    nodes = []
+    stack = list(reversed(decls))
+    while len(stack) != 0:
+        node = stack.pop()
+        nodes.append(node)
+        stack += reversed(list(iter_children(node)))
+    return nodes
+
+
+def check_round_trip():
+    """
+    Dump and load the type checked test.v, the types of the expressions have to come back as the same
+    types, and what is outside of the declarations (like the interop namespace) as the same object
+    """
+    workspace = Workspace([])
+    os.chdir(ROOT)
+    workspace.load_main('./')
+    module = workspace.load_module('main')
+    module.type_checking()
+
+    decls = module_decls(module)
+    stream = io.BytesIO()
+    dump_decls(decls, stream, module)
+    loaded = load_decls(io.BytesIO(stream.getvalue()), module)
+
+    assert list(map(str, decls)) == list(map(str, loaded)), 'The declarations changed'
+
+    # What is in the declarations is mapped to what was loaded, everything else has to be the same object
+    old_nodes = nodes_of(decls)
+    new_nodes = nodes_of(loaded)
+    assert len(old_nodes) == len(new_nodes), 'The declarations changed'
+    mapping = {id(old): new for old, new in zip(old_nodes, new_nodes)}
+    for old, new in zip(old_nodes, new_nodes):
+        if isinstance(old, Expr):
+            assert old.type is not None, f'{old} was not type checked'
+            expected = mapping.get(id(old.type), old.type)
+            assert new.type is expected or isinstance(old.type, VType) and str(new.type) == str(old.type), \
+                f'The type of {old} changed from {old.type} to {new.type}'
+
+
+class CountNames(Visitor):
+    """
+    Counts the identifiers in the object tree
+    """
+
+    def __init__(self):
+        super(CountNames, self).__init__()
+        self.names = 0
+
+    def visit_ExprIdentifierLiteral(self, node):
+        self.names += 1
+
+
+class CountArenaNames(ArenaVisitor):
+    """
+    Counts the identifiers in an arena
+    """
+
+    def __init__(self):
+        super(CountArenaNames, self).__init__()
+        self.names = 0
+
+    def visit_ExprIdentifierLiteral(self, index):
+        self.names += 1
+
+
+def walk_objects(decls: list) -> int:
+    visitor = CountNames()
+    for decl in decls:
+        walk(decl, visitor)
+    return visitor.names
+
+
+def walk_arena(arena: Arena) -> int:
+    visitor = CountArenaNames()
+    for root in arena.roots:
+        visitor.visit(arena, root)
+    return visitor.names
+
+
+def walk_arena_in_order(arena: Arena) -> int:
+    visitor = CountArenaNames()
+    visitor.visit_all(arena)
+    return visitor.names
+
+
+def type_check(decls: list):
+    workspace = Workspace([])
+    module = Module()
+    module.workspace = workspace
+    module.builtin = workspace.builtin
+    for decl in decls:
+        module.add(decl)
+    module.type_checking()
+
+
+def best(function, runs: int = 5) -> float:
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        result = elapsed if result is None else min(result, elapsed)
+    return result
+
+
+def main():
+    check_round_trip()
+    print('test.v round trip ok')
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    text = source.functions(count)
+
+    workspace = Workspace([])
+    module = Module()
+    module.workspace = workspace
+    module.builtin = workspace.builtin
+    decls = Parser(Tokenizer(text)).parse()
+    for decl in decls:
+        module.add(decl)
+
+    stream = io.BytesIO()
+    dump_decls(decls, stream)
+    parsed = stream.getvalue()
+
+    module.type_checking()
+    stream = io.BytesIO()
+    dump_decls(decls, stream, module)
+    checked = stream.getvalue()
+
+    parse_time = best(lambda: Parser(Tokenizer(text)).parse())
+    load_time = best(lambda: load_decls(io.BytesIO(parsed)))
+    checked_time = best(lambda: load_decls(io.BytesIO(checked), module))
+    dump_time = best(lambda: dump_decls(decls, io.BytesIO(), module))
+
+    print(f'source:       {len(text.encode()):>10} bytes  parse {parse_time * 1000:8.1f}ms')
+    print(f'parsed:       {len(parsed):>10} bytes  load  {load_time * 1000:8.1f}ms')
+    print(f'type checked: {len(checked):>10} bytes  load  {checked_time * 1000:8.1f}ms  dump {dump_time * 1000:8.1f}ms')
+
+    # Walking counts the identifiers, so every walk has to find the same amount
+    arena = Arena.from_decls(decls)
+    nodes = len(nodes_of(decls))
+    assert walk_objects(decls) == walk_arena(arena) == walk_arena_in_order(arena), 'The walks found different nodes'
+    print()
+    print(f'{nodes} nodes')
+    for name, function in (('walk objects', lambda: walk_objects(decls)),
+                           ('walk arena', lambda: walk_arena(arena)),
+                           ('walk arena in order', lambda: walk_arena_in_order(arena))):
+        elapsed = best(function)
+        print(f'{name + ":":<28}{elapsed * 1000:8.1f}ms {nodes / elapsed / 1e6:6.2f}M nodes/s')
+
+    # The type checker works on objects, so checking an arena converts it back first
+    objects_time = None
+    for _ in range(3):
+        parsed = Parser(Tokenizer(text)).parse()
+        start = time.perf_counter()
+        type_check(parsed)
+        elapsed = time.perf_counter() - start
+        objects_time = elapsed if objects_time is None else min(objects_time, elapsed)
+    arena_time = best(lambda: type_check(arena.to_decls()), 3)
+    print(f'{"type check objects:":<28}{objects_time * 1000:8.1f}ms {nodes / objects_time / 1e6:6.2f}M nodes/s')
+    print(f'{"arena to objects + check:":<28}{arena_time * 1000:8.1f}ms {nodes / arena_time / 1e6:6.2f}M nodes/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Type checking throughput on generated sources
+
+    python bench/bench_checker.py [section ...]
+
+The sections are:
+    scopes    functions with many parameters and deeply nested blocks of locals
+    members   member accesses on a wide struct and a big enum, and enum members used without the enum
+    methods   method calls, and how the time of finding a method grows with the amount of methods
+    symbols   functions using many constants, and the time of looking a name up in a module
+    resolve   functions with nested types, and how many times resolve_type is called for each of them
+
+Run a section on a checkout from before a change to the type checker to compare
+"""
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vork.tokenizer import *
+from vork.parser import Parser
+from vork.ast import *
+import source
+
+
+def new_module(workspace: Workspace) -> Module:
+    module = Module()
+    module.workspace = workspace
+    if hasattr(workspace.builtin, 'interop'):
+        module.builtin = workspace.builtin
+    else:
+        # Before modules had separate namespaces the builtins were declarations of the module
+        module.decls['builtin'] = workspace.builtin
+        module.decls['C'] = {}
+    return module
+
+
+def load(text: str, workspace: Workspace) -> Module:
+    module = new_module(workspace)
+    for decl in Parser(Tokenizer(text)).parse():
+        module.add(decl)
+    return module
+
+
+def check_time(text: str, runs: int = 3) -> float:
+    """
+    The best time of type checking the source, every run checks a newly parsed module
+    """
+    workspace = Workspace([])
+    result = None
+    for _ in range(runs):
+        module = load(text, workspace)
+        start = time.perf_counter()
+        module.type_checking()
+        elapsed = time.perf_counter() - start
+        result = elapsed if result is None else min(result, elapsed)
+    return result
+
+
+def per_call(function, calls: int) -> float:
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) / calls
+
+
+def scopes():
+    elapsed = check_time(source.nested_scopes(100, depth=100), 5)
+    print(f'100 functions, 20 parameters, 100 nested blocks: {elapsed:.3f}s')
+
+
+def members():
+    print(f'500 field struct, 3000 member enum, 200 functions: {check_time(source.wide_members(200)):.3f}s')
+    print(f'2000 enums, 5000 implicit members:                 {check_time(source.implicit_enums(500)):.3f}s')
+
+
+def methods():
+    workspace = Workspace([])
+    for types, per_type in ((50, 10), (50, 100), (200, 100)):
+        text = source.methods(types, per_type)
+        module = load(text, workspace)
+        module.type_checking()
+
+        keys = list(module.methods)[:5_000]
+        elapsed = per_call(lambda: [module.get_method(receiver, name) for _ in range(20) for receiver, name in keys],
+                           20 * len(keys))
+        print(f'{types} types x {per_type} methods: type check {check_time(text):.3f}s, '
+              f'get_method {elapsed * 1e9:.0f}ns')
+
+
+def symbols():
+    text = source.constants(300)
+    print(f'500 constants used 36000 times: type check {check_time(text, 7):.3f}s')
+
+    module = load(text, Workspace([]))
+    module.type_checking()
+    names = [f'c{k}' for k in range(500)] + ['int', 'bool', 'nope', 'g7']
+    elapsed = per_call(lambda: [module.get_var(name) for _ in range(200) for name in names], 200 * len(names))
+    print(f'    get_var {elapsed * 1e9:.0f}ns' + (f', {module.lookups} lookups' if hasattr(module, 'lookups') else ''))
+
+
+def resolve():
+    count = 2_000
+    text = source.nested_types(count)
+    elapsed = check_time(text, 5)
+
+    # Count the calls while checking once more
+    calls = 0
+    resolve_type = Module.resolve_type
+
+    def counted(self, xtype):
+        nonlocal calls
+        calls += 1
+        return resolve_type(self, xtype)
+
+    module = load(text, Workspace([]))
+    Module.resolve_type = counted
+    try:
+        module.type_checking()
+    finally:
+        Module.resolve_type = resolve_type
+    print(f'{count} functions with nested types: type check {elapsed:.3f}s, '
+          f'{calls / count:.1f} resolve_type calls per function')
+
+
+SECTIONS = {
+    'scopes': scopes,
+    'members': members,
+    'methods': methods,
+    'symbols': symbols,
+    'resolve': resolve,
+}
+
+
+def main():
+    sections = sys.argv[1:] if len(sys.argv) > 1 else list(SECTIONS)
+    for name in sections:
+        assert name in SECTIONS, f'Unknown section `{name}`, expected one of {", ".join(SECTIONS)}'
+        print(f'{name}:')
+        SECTIONS[name]()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Reparsing a generated module after an edit to one of its functions, compared to parsing all of it again
+
+    python bench/bench_incremental.py [amount of functions]
+
+Before measuring, edits at the start, in the middle and at the end of a source are checked to give the same
+declarations a full parse of the edited source gives
+"""
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vork.tokenizer import *
+from vork.parser import Parser, IncrementalParser
+import source
+
+# A source and edits to it, as (where, how many characters are removed, what is inserted)
+_SOURCE = '\n\n// leading comment\nfn f() {\n    a := 1\n}\n\nfn g(x int) int {\n    return x\n}\n'
+_EDITS = [
+    (0, 0, 'fn h() {}\n'),
+    (0, 0, '/*'),
+    (0, 2, ''),
+    (_SOURCE.index('a := 1') + 5, 1, '2 + 3'),
+    (_SOURCE.index('fn g'), 0, 'const k = 1\n'),
+    (_SOURCE.index('fn g'), 0, 'fn f() {\n    a := 1\n}\n'),
+    (_SOURCE.index('fn g'), 2, 'struct'),
+    (len(_SOURCE), 0, 'fn f() {\n    a := 1\n}\n'),
+    (len(_SOURCE), 0, 'fn'),
+    (len(_SOURCE) - 2, 2, ''),
+]
+
+
+def full_parse(text: str) -> list or None:
+    try:
+        return Parser(Tokenizer(text)).parse()
+    except AssertionError:
+        return None
+
+
+def check_edits():
+    """
+    Every edit is applied to a new IncrementalParser of the source, the declarations have to be the ones a
+    full parse gives, and every declaration has to be a different object
+    """
+    for offset, removed, inserted in _EDITS:
+        text = _SOURCE[:offset] + inserted + _SOURCE[offset + removed:]
+        parser = IncrementalParser(_SOURCE)
+        parser.edit(offset, removed, inserted)
+        decls = parser.get_decls()
+        errors = [error for error in parser.errors if error is not None]
+
+        expected = full_parse(text)
+        if expected is None:
+            assert len(errors) != 0, f'Inserting {inserted!r} at {offset} gave no error'
+        else:
+            assert len(errors) == 0, f'Inserting {inserted!r} at {offset} gave {errors}'
+            assert list(map(str, decls)) == list(map(str, expected)), \
+                f'Inserting {inserted!r} at {offset} gave {[decl.name for decl in decls]}, ' \
+                f'expected {[decl.name for decl in expected]}'
+        assert len(set(map(id, decls))) == len(decls), f'Inserting {inserted!r} at {offset} reused a declaration twice'
+
+
+def main():
+    check_edits()
+    print('edits ok')
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    text = source.functions(count)
+
+    start = time.perf_counter()
+    parser = IncrementalParser(text)
+    parse_time = time.perf_counter() - start
+
+    # Change the length of the function in the middle, and change it back
+    offset = text.index(f'x := a * {count // 2} + b') + len('x := ')
+    edit_time = None
+    for _ in range(10):
+        start = time.perf_counter()
+        parser.edit(offset, 0, '(1 + b) * ')
+        elapsed = time.perf_counter() - start
+        edit_time = elapsed if edit_time is None else min(edit_time, elapsed)
+        parser.edit(offset, len('(1 + b) * '), '')
+
+    print(f'{count} functions ({len(text) // 1024}KB): full parse {parse_time * 1000:8.1f}ms, '
+          f'one function edit {edit_time * 1000:6.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
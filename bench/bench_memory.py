@@ -0,0 +1,54 @@
+"""
+Memory used by the AST and by the tokens of a generated module, measured with tracemalloc
+
+    python bench/bench_memory.py [amount of functions]
+
+Run it on a checkout from before a change to the node classes to compare the bytes per node
+"""
+import gc
+import os
+import sys
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vork.tokenizer import *
+from vork.parser import Parser
+from vork.ast import *
+import source
+
+# The objects counted as nodes of the AST
+_NODE_CLASSES = (Stmt, Expr, VType, FuncDecl, FuncParam)
+
+
+def measure(function):
+    """
+    Run the function and return what it returned, with how many bytes it allocated that are still alive
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    text = source.functions(count)
+
+    decls, size = measure(lambda: Parser(Tokenizer(text)).parse())
+    nodes = sum(1 for obj in gc.get_objects() if isinstance(obj, _NODE_CLASSES))
+    print(f'ast:     {nodes:>9} nodes  {size / 1e6:7.1f}MB {size / nodes:6.0f} bytes per node')
+    del decls
+
+    tokens, size = measure(lambda: Tokenizer(text, buffered=True).tokenize())
+    print(f'tokens:  {len(tokens):>9} tokens {size / 1e6:7.1f}MB {size / len(tokens):6.0f} bytes per token')
+    del tokens
+
+    tokens, size = measure(lambda: Tokenizer(text, buffered=True, compact=True).tokenize())
+    print(f'compact: {len(tokens):>9} tokens {size / 1e6:7.1f}MB {size / len(tokens):6.0f} bytes per token')
+
+
+if __name__ == '__main__':
+    main()
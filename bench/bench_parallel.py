@@ -0,0 +1,55 @@
+"""
+Type checking a generated module with 1, 2, 4 and 8 worker processes, compared to checking it serially
+
+    python bench/bench_parallel.py [amount of functions] [fork|spawn|forkserver]
+
+The time includes starting the workers, and sending them the module when they are not forked
+"""
+import multiprocessing
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vork.tokenizer import *
+from vork.parser import Parser
+from vork.ast import *
+import source
+
+
+def check_time(text: str, workers: int or None, runs: int = 3) -> float:
+    """
+    The best time of type checking the module, every run checks a newly parsed one
+    """
+    workspace = Workspace([])
+    result = None
+    for _ in range(runs):
+        module = Module()
+        module.workspace = workspace
+        module.builtin = workspace.builtin
+        for decl in Parser(Tokenizer(text)).parse():
+            module.add(decl)
+
+        start = time.perf_counter()
+        module.type_checking(workers)
+        elapsed = time.perf_counter() - start
+        result = elapsed if result is None else min(result, elapsed)
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    if len(sys.argv) > 2:
+        multiprocessing.set_start_method(sys.argv[2])
+    text = source.functions(count)
+
+    print(f'{count} functions, {os.cpu_count()} cpus, {multiprocessing.get_start_method()}')
+    serial = check_time(text, None)
+    print(f'serial:    {serial:8.3f}s')
+    for workers in (1, 2, 4, 8):
+        elapsed = check_time(text, workers)
+        print(f'{workers} workers: {elapsed:8.3f}s {serial / elapsed:6.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Parser throughput on generated sources
+
+    python bench/bench_parser.py [section ...]
+
+The sections are:
+    lookahead    tokenizing and parsing expressions with the tokens dropped as they are used, and with all of
+                 them scanned into a buffer first
+    expressions  expressions parsed per second, from scanned tokens
+    statements   parsing every kind of statement, and how many times each production was used
+    recovery     parsing valid code with and without error recovery, and a source with syntax errors in it
+
+Run a section on a checkout from before a change to the parser to compare
+"""
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vork.tokenizer import *
+from vork.parser import Parser
+import source
+
+
+def best(function, runs: int = 5) -> float:
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        result = elapsed if result is None else min(result, elapsed)
+    return result
+
+
+def scanned(text: str) -> Tokenizer:
+    tokenizer = Tokenizer(text, buffered=True)
+    tokenizer.tokenize()
+    return tokenizer
+
+
+def parse_scanned(text: str, runs: int = 5) -> float:
+    """
+    The best time of parsing the source from tokens which were already scanned
+    """
+    result = None
+    for _ in range(runs):
+        tokenizer = scanned(text)
+        start = time.perf_counter()
+        Parser(tokenizer).parse()
+        elapsed = time.perf_counter() - start
+        result = elapsed if result is None else min(result, elapsed)
+    return result
+
+
+def lookahead():
+    text = source.expressions(6_000)
+    print(f'6000 expression statements ({len(text) // 1024}KB)')
+    print(f'    unbuffered:  {best(lambda: Parser(Tokenizer(text)).parse()):.3f}s tokenize+parse')
+    print(f'    buffered:    {best(lambda: scanned(text)):.3f}s tokenize, {parse_scanned(text):.3f}s parse')
+
+
+def expressions():
+    count = 6_000
+    elapsed = parse_scanned(source.expressions(count))
+    print(f'{count} expression statements: {elapsed:.3f}s, {count / elapsed:.0f} expressions/s')
+
+
+def statements():
+    count = 2_000
+    text = source.statements(count)
+    print(f'{count} functions with every kind of statement ({len(text) // 1024}KB): {parse_scanned(text):.3f}s')
+
+    parser = Parser(Tokenizer(text))
+    parser.parse()
+    if hasattr(parser, 'hits'):
+        print('    ' + ', '.join(f'{name} {hits}' for name, hits in parser.hits.most_common()))
+
+
+def recovery():
+    count = 2_000
+    text = source.functions(count)
+    print(f'{count} functions ({len(text) // 1024}KB)')
+    print(f'    without recovery: {best(lambda: Parser(Tokenizer(text)).parse()):.3f}s')
+    print(f'    with recovery:    {best(lambda: Parser(Tokenizer(text), recover=True).parse()):.3f}s')
+
+    # Break a statement in every 40th function
+    errors = 0
+    broken = ''
+    for i, function in enumerate(text.split('\n\n')):
+        if i % 40 == 0 and function != '':
+            function = function.replace('x := a *', 'x := ) a *', 1)
+            errors += 1
+        broken += function + '\n\n'
+
+    elapsed = best(lambda: Parser(Tokenizer(broken), recover=True).parse())
+    parser = Parser(Tokenizer(broken), recover=True)
+    parser.parse()
+    print(f'    {errors} syntax errors: {len(parser.diagnostics)} diagnostics, {elapsed:.3f}s')
+
+
+SECTIONS = {
+    'lookahead': lookahead,
+    'expressions': expressions,
+    'statements': statements,
+    'recovery': recovery,
+}
+
+
+def main():
+    sections = sys.argv[1:] if len(sys.argv) > 1 else list(SECTIONS)
+    for name in sections:
+        assert name in SECTIONS, f'Unknown section `{name}`, expected one of {", ".join(SECTIONS)}'
+        print(f'{name}:')
+        SECTIONS[name]()
+
+
+if __name__ == '__main__':
+    main()
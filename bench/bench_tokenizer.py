@@ -0,0 +1,58 @@
+"""
+Tokenizer throughput from 1KB to 10MB of source, the time per byte should stay the same, followed by scanning
+identifier and keyword dense input, and scanning into token objects compared to the compact token buffer
+
+    python bench/bench_tokenizer.py [max size in bytes]
+
+The bytes per token of both token stores are measured by bench_memory.py
+"""
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vork.tokenizer import *
+import source
+
+
+def best(function, runs: int = 5) -> float:
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        result = elapsed if result is None else min(result, elapsed)
+    return result
+
+
+def main():
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+
+    size = 1_000
+    while size <= max_size:
+        text = source.sized(size)
+        tokenizer = Tokenizer(text)
+
+        start = time.perf_counter()
+        count = 0
+        while not isinstance(tokenizer.next_token(), EofToken):
+            count += 1
+        elapsed = time.perf_counter() - start
+
+        print(f'{len(text):>10} bytes {count:>9} tokens {elapsed:8.3f}s {elapsed / len(text) * 1e6:6.2f} us/byte')
+        size *= 10
+
+    print()
+    text = source.identifiers(1_000_000)
+    elapsed = best(lambda: Tokenizer(text, buffered=True).tokenize())
+    print(f'identifiers: {len(text):>10} bytes {elapsed:8.3f}s {elapsed / len(text) * 1e6:6.2f} us/byte')
+
+    text = source.sized(1_000_000)
+    elapsed = best(lambda: Tokenizer(text, buffered=True).tokenize())
+    print(f'objects:     {len(text):>10} bytes {elapsed:8.3f}s {elapsed / len(text) * 1e6:6.2f} us/byte')
+    elapsed = best(lambda: Tokenizer(text, buffered=True, compact=True).tokenize())
+    print(f'compact:     {len(text):>10} bytes {elapsed:8.3f}s {elapsed / len(text) * 1e6:6.2f} us/byte')
+
+
+if __name__ == '__main__':
+    main()
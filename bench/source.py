@@ -0,0 +1,239 @@
+"""
+Generated V sources for the benchmarks
+"""
+import random
+
+# A function which uses every kind of token and type checks, {i} is replaced with the index of the function
+_FUNCTION = '''fn g{i}(a int, b int) {{
+    // line comment
+    x := a * {i} + b
+    y := (x * 2) | b % 7 /* block /* nested */ comment */
+    f := 2.5 * 0.5
+    h := 0x1F + 0b101
+    for {{
+        z := x + a - y
+    }}
+    unsafe {{
+        w := -y * (a + 1)
+        q := [a b x]
+        r := q[1] + q.len
+    }}
+}}
+
+'''
+
+
+def functions(count: int) -> str:
+    """
+    A module with the given amount of functions
+    """
+    return ''.join(_FUNCTION.format(i=i) for i in range(count))
+
+
+def sized(size: int) -> str:
+    """
+    A module of about the given size in bytes, made of whole functions
+    """
+    count = max(1, size // len(_FUNCTION.format(i=0)))
+    return functions(count)
+
+# A function with every kind of statement
+_STATEMENTS = '''fn s{i}(n int, q []int) int {{
+    mut a, b := s{i}(n, q)
+    a += b * 2
+    if a > 10 {{
+        b = a - 1
+    }} else if a < 0 {{
+        b = -a
+    }} else {{
+        ++b
+    }}
+    for x in q {{
+        a += x
+    }}
+    for k, x in q {{
+        a -= k * x
+    }}
+    for j = 0; j < 10; ++j {{
+        b ^= j
+    }}
+    for {{
+        assert a != b
+    }}
+    defer {{
+        n = 0
+    }}
+    unsafe {{
+        v := s{i}(a, q) or {{ return 0 }}
+    }}
+    s{i}(b, q)
+    return a + b
+}}
+
+'''
+
+
+def statements(count: int) -> str:
+    """
+    A module with the given amount of functions, each using every kind of statement
+    """
+    return ''.join(_STATEMENTS.format(i=i) for i in range(count))
+
+
+_OPERATORS = ['+', '-', '*', '/', '%', '&', '|', '^', '<<', '>>', '&&', '||', '==', '!=', '<', '>', '<=', '>=']
+_NAMES = ['a', 'b', 'foo', 'bar_1', '_x', 'counter', 'i', 'j']
+_LITERALS = ['349', '0x1F', '0b101', '3.25']
+
+
+def _operand(rand: random.Random, depth: int) -> str:
+    r = rand.random()
+    if depth > 3 or r < 0.3:
+        return rand.choice(_NAMES + _LITERALS)
+    elif r < 0.45:
+        return f'({_expression(rand, depth + 1)})'
+    elif r < 0.55:
+        args = ', '.join(_expression(rand, depth + 1) for _ in range(rand.randint(0, 3)))
+        return f'{rand.choice(_NAMES)}({args})'
+    elif r < 0.65:
+        return f'{rand.choice(_NAMES)}[{_expression(rand, depth + 1)}]'
+    elif r < 0.75:
+        return f'{rand.choice(_NAMES)}.{rand.choice(_NAMES)}'
+    elif r < 0.8:
+        return '(1..10)'
+    elif r < 0.9:
+        return rand.choice(['-', '!', '~', '&']) + rand.choice(_NAMES)
+    else:
+        return rand.choice(_NAMES)
+
+
+def _expression(rand: random.Random, depth: int = 0) -> str:
+    text = _operand(rand, depth)
+    for _ in range(rand.randint(0, 3)):
+        text += f' {rand.choice(_OPERATORS)} {_operand(rand, depth)}'
+    return text
+
+
+def expressions(count: int) -> str:
+    """
+    A module of the given amount of random expression statements, in functions of 10, the same count always
+    gives the same module
+    """
+    rand = random.Random(count)
+    text = ''
+    for i in range(0, count, 10):
+        body = ''.join(f'    x := {_expression(rand)}\n' for _ in range(min(10, count - i)))
+        text += f'fn e{i}() {{\n{body}}}\n\n'
+    return text
+
+
+def identifiers(size: int) -> str:
+    """
+    About the given amount of bytes of identifiers and keywords, in lines of 10
+    """
+    rand = random.Random(size)
+    words = ['counter', 'items', 'value_1', 'name', 'x', 'foo', 'bar', 'fn', 'mut', 'return', 'if', 'else', 'struct']
+    lines = []
+    length = 0
+    while length < size:
+        line = ' '.join(rand.choice(words) for _ in range(10)) + '\n'
+        lines.append(line)
+        length += len(line)
+    return ''.join(lines)
+
+
+###################################################################################################################
+# Type checking
+###################################################################################################################
+
+def nested_scopes(count: int, params: int = 20, depth: int = 30) -> str:
+    """
+    Functions with many parameters, and locals declared in deeply nested blocks which use the ones around them
+    """
+    text = ''
+    args = ', '.join(f'p{k} int' for k in range(params))
+    for i in range(count):
+        body = ''
+        for d in range(depth):
+            indent = '    ' * (d + 1)
+            body += f'{indent}v{d} := p{d % params} + p{params - 1} * {d}\n'
+            body += f'{indent}w{d} := {" + ".join(f"v{k}" for k in range(max(0, d - 5), d + 1))} + p0\n'
+            body += f'{indent}for {{\n'
+        for d in reversed(range(depth)):
+            body += '    ' * (d + 1) + '}\n'
+        text += f'fn g{i}({args}) {{\n{body}}}\n\n'
+    return text
+
+
+def wide_members(count: int, fields: int = 500, members: int = 3000) -> str:
+    """
+    A wide struct and a big enum, and functions which access 30 fields and 10 members each
+    """
+    text = 'struct Wide {\npub mut:\n' + ''.join(f'    f{k} int\n' for k in range(fields)) + '}\n\n'
+    text += 'enum Big {\n' + ''.join(f'    m{k}\n' for k in range(members)) + '}\n\n'
+    for i in range(count):
+        body = ''.join(f'    x{k} := w.f{(k * 37 + i) % fields} + w.f{fields - 1 - k}\n' for k in range(30))
+        body += ''.join(f'    e{k} := b.m{(k * 97 + i) % members}\n' for k in range(10))
+        text += f'fn g{i}(w Wide, b Big) {{\n{body}}}\n\n'
+    return text
+
+
+def implicit_enums(count: int, enums: int = 2000) -> str:
+    """
+    Many small enums, and functions which use 10 of their members without naming the enum
+    """
+    text = ''.join(f'enum E{i} {{\n    a{i}\n    b{i}\n}}\n' for i in range(enums))
+    for i in range(count):
+        text += f'fn g{i}() {{\n' + ''.join(f'    x{k} := .a{(i * 7 + k) % enums}\n' for k in range(10)) + '}\n'
+    return text
+
+
+def methods(types: int, per_type: int, count: int = 200) -> str:
+    """
+    Structs with the given amount of methods each, and functions calling 80 of them through values and pointers
+    """
+    text = ''
+    for t in range(types):
+        text += f'struct S{t} {{\n    x int\n}}\n\n'
+        text += ''.join(f'fn (s S{t}) m{k}(n int) int {{ return n }}\n' for k in range(per_type))
+    for i in range(count):
+        body = ''.join(f'    x{k} := s.m{(k * 31 + i) % per_type}({k}) + r.m{(k * 7) % per_type}(1)\n' for k in range(40))
+        text += f'fn g{i}(s S{i % types}, r &S{(i + 1) % types}) {{\n{body}}}\n\n'
+    return text
+
+
+def constants(count: int, amount: int = 500) -> str:
+    """
+    Many constants, and functions which use 120 of them each
+    """
+    text = ''.join(f'const c{k} = {k}\n' for k in range(amount))
+    for i in range(count):
+        body = ''.join(f'    x{k} := c{(k * 13 + i) % amount} + c{k} * c{(i + k) % amount}\n' for k in range(40))
+        text += f'fn g{i}(a int) {{\n{body}}}\n\n'
+    return text
+
+
+# A function whose parameters, locals and return type nest array, optional and pointer types
+_NESTED_TYPES = '''fn g{i}(a []int, b ?[]&int, c ?[][]int) []int {{
+    x := a
+    y := c
+    z := [a a a]
+    w := [y y]
+    for {{
+        v := [z z]
+        u := x.len + a.len
+    }}
+    unsafe {{
+        q := [[[x.len]]]
+        r := [q q]
+    }}
+    return a
+}}
+
+'''
+
+
+def nested_types(count: int) -> str:
+    """
+    A module with the given amount of functions using nested types
+    """
+    return ''.join(_NESTED_TYPES.format(i=i) for i in range(count))
@@ -1,12 +1,14 @@
-from vork.tokenizer import *
-from vork.parser import *
-
-
-def main():
-    workspace = Workspace([])
-    workspace.load_main('./')
-    print(workspace.load_module('main'))
-
-
-if __name__ == '__main__':
-    main()
+import sys
+from vork.tokenizer import *
+from vork.parser import *
+
+
+def main():
+    workspace = Workspace([])
+    workspace.load_main('./')
+    workspace.load_module('main').dump(sys.stdout)
+    print()
+
+
+if __name__ == '__main__':
+    main()
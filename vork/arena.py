@@ -0,0 +1,647 @@
+from vork.ast import *
+from vork.parser import _BINARY_POWER, _ASSIGNMENT_OPS, _PREFIX_ONCE, _PREFIX_REPEAT
+from array import array
+from typing import *
+import struct
+import sys
+import zlib
+
+###################################################################################################################
+# Schema
+#
+# Every node class is a kind, the kind of a node is its index in the schema. Every field of a node is stored as a
+# single int in the data array, which int depends on how the field is encoded
+###################################################################################################################
+
+# The index of a child node, or -1 for None
+_NODE = 0
+# Where a list of child nodes starts in the lists array, which holds the length followed by the items
+_NODES = 1
+# The index of a string in the string table, or -1 for None
+_STR = 2
+# Where a list of strings starts in the lists array
+_STRS = 3
+# 0 or 1
+_BOOL = 4
+# The int itself
+_INT = 5
+# The operator code, the index of the operator in OPERATORS
+_OP = 6
+# The index of a constant in the constant table, or -1 for None
+_CONST = 7
+# The index of the block or function a block is in, or -1, filled in once the parent is added since
+# children are added first
+_PARENT = 8
+# The index of a node which is not a child, like the resolved type of an expression, or -1 for None. Something
+# which is not in the dumped tree but has a name in the module (like the interop namespace `C`, an imported module
+# or a builtin declaration) is -2 - the index of the name in the externals table, see Arena.from_decls
+_REF = 9
+# The variables of a block, where they start in the lists array, which holds the amount of them followed
+# by the name, the index of the type and whether it is mutable for every variable
+_VARS = 10
+
+# The node classes with their fields, the first `args` fields are passed to the constructor in order
+# and the rest are set once the node is created
+_SCHEMA = (
+    (StmtBlock, (('parent', _PARENT), ('stmts', _NODES), ('vars', _VARS)), 2),
+    (StmtExpr, (('expr', _NODE),), 1),
+    (StmtReturn, (('exprs', _NODES),), 1),
+    (StmtAssert, (('expr', _NODE),), 1),
+    (StmtIf, (('condition', _NODE), ('block_true', _NODE), ('block_false', _NODE)), 3),
+    (StmtVarDecl, (('mut', _BOOL), ('names', _STRS), ('expr', _NODE)), 3),
+    (StmtForeach, (('index', _STR), ('name', _STR), ('list', _NODE), ('block', _NODE)), 4),
+    (StmtFor, (('value', _NODE), ('condition', _NODE), ('next', _NODE), ('block', _NODE)), 4),
+    (StmtUnsafe, (('block', _NODE),), 1),
+    (StmtDefer, (('block', _NODE),), 1),
+    (StmtError, (('message', _STR),), 1),
+
+    (VUnknownType, (('name', _STR),), 1),
+    (VIntegerType, (('bits', _INT), ('signed', _BOOL)), 2),
+    (VFloatType, (('bits', _INT),), 1),
+    (VBool, (), 0),
+    (VArrayType, (('type', _NODE),), 1),
+    (VMapType, (('key_type', _NODE), ('value_type', _NODE)), 2),
+    (VOptionalType, (('type', _NODE),), 1),
+    (VPointerType, (('type', _NODE),), 1),
+
+    (ExprIntegerLiteral, (('value', _CONST), ('type', _REF)), 1),
+    (ExprArrayLiteral, (('values', _NODES), ('type', _REF)), 1),
+    (ExprRange, (('expr_from', _NODE), ('expr_to', _NODE), ('type', _REF)), 2),
+    (ExprFloatLiteral, (('value', _CONST), ('type', _REF)), 1),
+    (ExprIdentifierLiteral, (('name', _STR), ('type', _REF), ('slot', _CONST)), 1),
+    (ExprBinary, (('left', _NODE), ('op', _OP), ('right', _NODE), ('type', _REF)), 3),
+    (ExprUnary, (('op', _OP), ('right', _NODE), ('type', _REF)), 2),
+    (ExprImplicitEnum, (('name', _STR), ('type', _REF)), 1),
+    (ExprIn, (('left', _NODE), ('right', _NODE), ('type', _REF)), 2),
+    (ExprPostfix, (('left', _NODE), ('op', _OP), ('type', _REF)), 2),
+    (ExprIf, (('condition', _NODE), ('block_true', _NODE), ('block_false', _NODE), ('type', _REF)), 3),
+    (ExprOr, (('expr', _NODE), ('block_error', _NODE), ('type', _REF)), 2),
+    (ExprMemberAccess, (('value', _NODE), ('member', _STR), ('type', _REF)), 2),
+    (ExprIndexAccess, (('value', _NODE), ('index', _NODE), ('type', _REF)), 2),
+    (ExprCall, (('func', _NODE), ('args', _NODES), ('type', _REF)), 2),
+
+    (FuncParam, (('mut', _BOOL), ('name', _STR), ('type', _NODE)), 3),
+    (FuncDecl, (('pub', _BOOL), ('interop', _BOOL), ('name', _STR), ('method', _NODE), ('args', _NODES),
+                ('ret_type', _NODE), ('block', _NODE)), 6),
+    (StructElement, (('access', _CONST), ('name', _STR), ('type', _NODE)), 3),
+    (StructDecl, (('pub', _BOOL), ('attribute', _CONST), ('name', _STR), ('base', _NODE), ('elements', _NODES)), 5),
+    (ModuleDecl, (('name', _STR),), 1),
+    (ImportDecl, (('name', _STR),), 1),
+    (EnumDecl, (('pub', _BOOL), ('name', _STR), ('elements', _STRS)), 3),
+    (ConstDecl, (('pub', _BOOL), ('name', _STR), ('value', _NODE)), 3),
+    (TypeDecl, (('pub', _BOOL), ('name', _STR), ('type', _NODE)), 3),
+)
+
+# The kind of every node class
+KINDS = {cls: kind for kind, (cls, fields, args) in enumerate(_SCHEMA)}  # type: Dict[type, int]
+
+
+# Every operator the parser creates, an operator's code is its index
+OPERATORS = tuple(sorted(set(_BINARY_POWER) | _ASSIGNMENT_OPS | _PREFIX_ONCE | _PREFIX_REPEAT))
+_OPERATOR_CODES = {op: code for code, op in enumerate(OPERATORS)}
+
+# The fields of every kind, in the order they are stored in
+_FIELDS = tuple(fields for cls, fields, args in _SCHEMA)
+
+# For every kind where its children are relative to the start of the node, and whether that is a list of them,
+# from the last to the first so pushing them on a stack pops them in order
+_CHILDREN = tuple(
+    tuple((offset, encoding == _NODES) for offset, (name, encoding) in reversed(list(enumerate(stored)))
+          if encoding in (_NODE, _NODES))
+    for stored in _FIELDS
+)
+
+# The fields of every node class which hold its children, in the order they are visited in, with whether the
+# field is a list of children, this is how the visitors in vork.visitor find the children of node objects
+CHILD_FIELDS = {
+    cls: tuple((name, encoding == _NODES) for name, encoding in fields if encoding in (_NODE, _NODES))
+    for cls, fields, args in _SCHEMA
+}  # type: Dict[type, Tuple[Tuple[str, bool], ...]]
+
+
+def field_offset(cls: type, name: str) -> int:
+    """
+    Where a field of the given node class is stored, relative to the start of the node in the data array
+    """
+    for offset, (field, encoding) in enumerate(_FIELDS[KINDS[cls]]):
+        if field == name:
+            return offset
+    assert False, f'{cls.__name__} has no field {name}'
+
+
+###################################################################################################################
+# Arena
+###################################################################################################################
+
+class Arena:
+    """
+    A tree of nodes stored in flat arrays instead of an object per node
+
+    Node i is of kind kinds[i] and its fields are at data[starts[i]:], children are always stored
+    before their parents, and nodes which were shared in the tree (like types) are only stored once
+    """
+
+    def __init__(self):
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.data = array('i')
+        self.lists = array('i')
+
+        # The interned strings and constants the nodes refer to, and the names of what they refer to
+        # outside of the arena
+        self.strings = []  # type: List[str]
+        self.constants = []  # type: List[object]
+        self.externals = []  # type: List[str]
+        self._string_ids = {}  # type: Dict[str, int]
+        self._constant_ids = {}  # type: Dict[Tuple[type, object], int]
+        self._external_ids = {}  # type: Dict[str, int]
+
+        # The nodes of the declarations which were added, in order
+        self.roots = array('I')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @staticmethod
+    def from_decls(decls: list, module: Module = None) -> 'Arena':
+        """
+        Convert declarations, as returned from Parser.parse, to an arena
+
+        Type checked declarations refer to things which are not part of them, like the interop namespace,
+        imported modules or builtin declarations. Given the module the declarations are in, those are stored
+        by their name in it so to_decls can find them again, otherwise references to anything which is not a
+        node are left out and are resolved again once they are needed.
+        """
+        arena = Arena()
+        memo = {}
+        parents = []
+        names = {} if module is None else _external_names(module)
+        for decl in decls:
+            names.pop(id(decl), None)
+        for decl in decls:
+            arena.roots.append(arena._add(decl, memo, parents, names))
+
+        # The parents are only added after the blocks in them
+        for position, parent in parents:
+            arena.data[position] = memo.get(id(parent), -1)
+
+        return arena
+
+    def to_decls(self, module: Module = None) -> list:
+        """
+        Convert the declarations back to nodes, references outside of them are looked up in the module
+        """
+        nodes = self.to_nodes(module)
+        return [nodes[root] for root in self.roots]
+
+    def get(self, index: int, cls: type, name: str):
+        """
+        Get a field of a node, decoded, child nodes are returned as their index and references outside
+        of the arena as their name
+        """
+        assert _SCHEMA[self.kinds[index]][0] is cls, f'Node {index} is not a {cls.__name__}'
+        offset = field_offset(cls, name)
+        return self._decode(_FIELDS[self.kinds[index]][offset][1], self.data[self.starts[index] + offset], None)
+
+    def children(self, index: int) -> Iterator[int]:
+        """
+        The children of a node, in order
+        """
+        start = self.starts[index]
+        for offset, many in reversed(_CHILDREN[self.kinds[index]]):
+            value = self.data[start + offset]
+            if value == -1:
+                continue
+            if many:
+                yield from self.lists[value + 1:value + 1 + self.lists[value]]
+            else:
+                yield value
+
+    def dump(self, stream: BinaryIO):
+        """
+        Write the arena to a binary stream
+        """
+        stream.write(_HEADER.pack(MAGIC, VERSION, _SCHEMA_HASH))
+        for items in (self.kinds, self.starts, self.data, self.lists, self.roots):
+            _write_array(stream, items)
+        _write_strings(stream, self.strings)
+        _write_strings(stream, [_encode_constant(constant) for constant in self.constants])
+        _write_strings(stream, self.externals)
+
+    @staticmethod
+    def load(stream: BinaryIO) -> 'Arena':
+        """
+        Read an arena which was written with dump
+        """
+        magic, version, schema_hash = _HEADER.unpack(stream.read(_HEADER.size))
+        assert magic == MAGIC, 'Not a serialized arena'
+        assert version == VERSION and schema_hash == _SCHEMA_HASH, \
+            f'Arena was serialized with format version {version}, expected {VERSION}'
+
+        arena = Arena()
+        for items in (arena.kinds, arena.starts, arena.data, arena.lists, arena.roots):
+            _read_array(stream, items)
+        arena.strings = _read_strings(stream)
+        arena.constants = [_decode_constant(constant) for constant in _read_strings(stream)]
+        arena.externals = _read_strings(stream)
+
+        arena._string_ids = {string: string_id for string_id, string in enumerate(arena.strings)}
+        arena._constant_ids = {(type(constant), constant): constant_id for constant_id, constant in enumerate(arena.constants)}
+        arena._external_ids = {name: external_id for external_id, name in enumerate(arena.externals)}
+        return arena
+
+    ###################################################################################################################
+    # Converting
+    ###################################################################################################################
+
+    def _intern(self, value: str) -> int:
+        if value is None:
+            return -1
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def _constant(self, value) -> int:
+        if value is None:
+            return -1
+        try:
+            key = type(value), value
+            constant_id = self._constant_ids.get(key)
+        except TypeError:
+            # Not hashable, can't be shared
+            key = constant_id = None
+        if constant_id is None:
+            constant_id = len(self.constants)
+            self.constants.append(value)
+            if key is not None:
+                self._constant_ids[key] = constant_id
+        return constant_id
+
+    def _ref(self, value, memo: Dict[int, int], names: Dict[int, str]) -> int:
+        if value is None:
+            return -1
+        index = memo.get(id(value))
+        if index is not None:
+            return index
+
+        # Outside of the arena, by name or left out
+        name = names.get(id(value))
+        if name is None:
+            return -1
+        external_id = self._external_ids.get(name)
+        if external_id is None:
+            external_id = self._external_ids[name] = len(self.externals)
+            self.externals.append(name)
+        return -2 - external_id
+
+    def _encode(self, encoding: int, value, memo: Dict[int, int], parents: List[Tuple[int, object]],
+                names: Dict[int, str]) -> int:
+        if encoding == _NODE:
+            return -1 if value is None else memo[id(value)]
+
+        elif encoding == _REF:
+            return self._ref(value, memo, names)
+
+        elif encoding == _PARENT:
+            parents.append((len(self.data), value))
+            return -1
+
+        elif encoding == _STR:
+            return self._intern(value)
+
+        elif encoding == _BOOL or encoding == _INT:
+            return int(value)
+
+        elif encoding == _OP:
+            return _OPERATOR_CODES[value]
+
+        elif encoding == _CONST:
+            return self._constant(value)
+
+        elif encoding == _VARS:
+            start = len(self.lists)
+            self.lists.append(len(value))
+            for name, (xtype, mut) in value.items():
+                self.lists.append(self._intern(name))
+                self.lists.append(self._ref(xtype, memo, names))
+                self.lists.append(int(mut))
+            return start
+
+        else:
+            start = len(self.lists)
+            self.lists.append(len(value))
+            if encoding == _NODES:
+                self.lists.extend(memo[id(item)] for item in value)
+            else:
+                self.lists.extend(self._intern(item) for item in value)
+            return start
+
+    def _add(self, node, memo: Dict[int, int], parents: List[Tuple[int, object]], names: Dict[int, str]) -> int:
+        """
+        Add a node and everything under it, children go first so the stack replaces recursion, the nodes it
+        refers to are added as well unless they have a name outside of the arena
+        """
+        stack = [(node, False)]
+        while len(stack) != 0:
+            node, ready = stack.pop()
+            if id(node) in memo:
+                continue
+
+            kind = KINDS[type(node)]
+            fields = _FIELDS[kind]
+
+            # First add the children, then come back to this node
+            if not ready:
+                stack.append((node, True))
+                for name, encoding in reversed(fields):
+                    if encoding == _NODE:
+                        child = getattr(node, name)
+                        if child is not None:
+                            stack.append((child, False))
+                    elif encoding == _REF:
+                        child = getattr(node, name)
+                        if _is_ref_node(child, names):
+                            stack.append((child, False))
+                    elif encoding == _NODES:
+                        for child in reversed(getattr(node, name)):
+                            stack.append((child, False))
+                    elif encoding == _VARS:
+                        for xtype, mut in getattr(node, name).values():
+                            if _is_ref_node(xtype, names):
+                                stack.append((xtype, False))
+                continue
+
+            memo[id(node)] = len(self.kinds)
+            self.kinds.append(kind)
+            self.starts.append(len(self.data))
+            for name, encoding in fields:
+                self.data.append(self._encode(encoding, getattr(node, name), memo, parents, names))
+
+        return memo[id(node)]
+
+    def _decode(self, encoding: int, value: int, nodes: list or None, externals: list = None):
+        if encoding == _NODE or encoding == _REF or encoding == _PARENT:
+            if value == -1:
+                return None
+            elif value < -1:
+                return self.externals[-2 - value] if nodes is None else externals[-2 - value]
+            return value if nodes is None else nodes[value]
+
+        elif encoding == _STR:
+            return None if value == -1 else self.strings[value]
+
+        elif encoding == _BOOL:
+            return value != 0
+
+        elif encoding == _INT:
+            return value
+
+        elif encoding == _OP:
+            return OPERATORS[value]
+
+        elif encoding == _CONST:
+            return None if value == -1 else self.constants[value]
+
+        elif encoding == _VARS:
+            variables = {}
+            lists = self.lists
+            for item in range(value + 1, value + 1 + lists[value] * 3, 3):
+                xtype = self._decode(_REF, lists[item + 1], nodes, externals)
+                variables[self.strings[lists[item]]] = xtype, lists[item + 2] != 0
+            return variables
+
+        else:
+            items = self.lists[value + 1:value + 1 + self.lists[value]]
+            if encoding == _STRS:
+                return [self.strings[item] for item in items]
+            elif nodes is None:
+                return list(items)
+            else:
+                return [nodes[item] for item in items]
+
+    def to_nodes(self, module: Module = None) -> list:
+        """
+        Create the node objects of all the nodes, children are stored first so this is a single pass,
+        references outside of the arena are looked up in the module, or left out without one
+        """
+        nodes = []
+        parents = []
+        data = self.data
+        externals = [None if module is None else _find_external(module, name) for name in self.externals]
+        for index, kind in enumerate(self.kinds):
+            cls, fields, args = _SCHEMA[kind]
+            start = self.starts[index]
+            values = []
+            for offset, (name, encoding) in enumerate(fields):
+                value = data[start + offset]
+                # Most fields are nodes, so decode them here instead of going through _decode
+                if encoding == _NODE or encoding == _REF:
+                    if value >= 0:
+                        values.append(nodes[value])
+                    else:
+                        values.append(None if value == -1 else externals[-2 - value])
+                elif encoding == _PARENT:
+                    parents.append((index, name, value))
+                    values.append(None)
+                else:
+                    values.append(self._decode(encoding, value, nodes, externals))
+
+            if args == len(fields):
+                node = cls(*values)
+            else:
+                node = cls(*values[:args])
+                for (name, encoding), value in zip(fields[args:], values[args:]):
+                    setattr(node, name, value)
+            nodes.append(node)
+
+        # The parents were only created after the blocks in them
+        for index, name, parent in parents:
+            setattr(nodes[index], name, None if parent == -1 else nodes[parent])
+
+        return nodes
+
+
+def _is_ref_node(value, names: Dict[int, str]) -> bool:
+    """
+    Is a referenced value added to the arena along with what refers to it
+    """
+    return value is not None and type(value) in KINDS and id(value) not in names
+
+
+def _external_names(module: Module) -> Dict[int, str]:
+    """
+    The names everything which can be referred to from the declarations of a module has in it, by id. These
+    are the symbols of the module, the interop functions as `C.<name>` and the declarations of the imported
+    modules as `<import>.<name>`
+    """
+    names = {}
+    for name, value in module.symbols.items():
+        names.setdefault(id(value), name)
+    for name, value in module.interop.items():
+        names.setdefault(id(value), f'C.{name}')
+    for import_name, imported in module.imports.items():
+        for name, value in imported.decls.items():
+            names.setdefault(id(value), f'{import_name}.{name}')
+    return names
+
+
+def _find_external(module: Module, name: str):
+    """
+    Find what a name from _external_names refers to in a module
+    """
+    parts = name.split('.')
+    value = module.symbols.get(parts[0])
+    for part in parts[1:]:
+        value = value.get(part) if isinstance(value, dict) else value.decls.get(part)
+    assert value is not None, f'Unknown name `{name}` in module `{module.name}`'
+    return value
+
+
+###################################################################################################################
+# Serialization
+#
+# An arena is written as a header followed by its arrays and tables, every array is its length and then its items
+# as little endian ints, and every table of strings is an array of the lengths of the utf-8 encoded strings followed
+# by all of them
+###################################################################################################################
+
+# Identifies a serialized arena, the version has to change whenever the format does, and the schema hash makes sure
+# the nodes are read with the same schema they were written with
+MAGIC = b'VAST'
+VERSION = 3
+_SCHEMA_HASH = zlib.crc32(repr(([(cls.__name__, fields, args) for cls, fields, args in _SCHEMA], OPERATORS)).encode())
+
+_HEADER = struct.Struct('<4sII')
+_LENGTH = struct.Struct('<I')
+
+
+def _write_array(stream: BinaryIO, items: array):
+    if sys.byteorder == 'big':
+        items = array(items.typecode, items)
+        items.byteswap()
+    stream.write(_LENGTH.pack(len(items)))
+    stream.write(items.tobytes())
+
+
+def _read_array(stream: BinaryIO, items: array):
+    length, = _LENGTH.unpack(stream.read(_LENGTH.size))
+    items.frombytes(stream.read(length * items.itemsize))
+    assert len(items) == length, 'Unexpected end of serialized arena'
+    if sys.byteorder == 'big':
+        items.byteswap()
+
+
+def _write_strings(stream: BinaryIO, strings: List[str]):
+    encoded = [string.encode() for string in strings]
+    _write_array(stream, array('I', map(len, encoded)))
+    stream.write(b''.join(encoded))
+
+
+def _read_strings(stream: BinaryIO) -> List[str]:
+    lengths = array('I')
+    _read_array(stream, lengths)
+    blob = stream.read(sum(lengths))
+    strings = []
+    offset = 0
+    for length in lengths:
+        strings.append(blob[offset:offset + length].decode())
+        offset += length
+    assert offset == len(blob), 'Unexpected end of serialized arena'
+    return strings
+
+
+def _encode_constant(value) -> str:
+    if isinstance(value, StructMemberAccess):
+        return 'a' + value.name
+    elif isinstance(value, int):
+        return 'i' + str(value)
+    elif isinstance(value, float):
+        return 'f' + repr(value)
+    else:
+        assert False, f'Can not serialize constant {value!r}'
+
+
+def _decode_constant(text: str):
+    tag, value = text[0], text[1:]
+    if tag == 'a':
+        return StructMemberAccess[value]
+    elif tag == 'i':
+        return int(value)
+    else:
+        return float(value)
+
+
+def dump_decls(decls: list, stream: BinaryIO, module: Module = None):
+    """
+    Serialize declarations, parsed or type checked, to a binary stream, type checked declarations
+    should be given the module they are in (see Arena.from_decls)
+    """
+    Arena.from_decls(decls, module).dump(stream)
+
+
+def load_decls(stream: BinaryIO, module: Module = None) -> list:
+    """
+    Load declarations which were serialized with dump_decls, into the module they were dumped from
+    """
+    return Arena.load(stream).to_decls(module)
+
+
+###################################################################################################################
+# Visitor
+###################################################################################################################
+
+class ArenaVisitor:
+    """
+    Walks the nodes of an arena, without creating any objects along the way
+
+    visit_<node class name>(index) is called for every node whose class has one. The fields of a node are at
+    arena.data[arena.starts[index] + offset], where the offset comes from field_offset.
+    """
+
+    def __init__(self):
+        self._handlers = tuple(getattr(self, f'visit_{cls.__name__}', None) for cls, fields, args in _SCHEMA)
+
+    def visit(self, arena: Arena, root: int):
+        """
+        Visit a node and everything under it in pre-order, returning False from a handler skips the
+        children of the node
+        """
+        handlers = self._handlers
+        kinds = arena.kinds
+        starts = arena.starts
+        data = arena.data
+        lists = arena.lists
+
+        stack = [root]
+        pop = stack.pop
+        push = stack.append
+        while len(stack) != 0:
+            index = pop()
+            kind = kinds[index]
+
+            handler = handlers[kind]
+            if handler is not None and handler(index) is False:
+                continue
+
+            start = starts[index]
+            for offset, many in _CHILDREN[kind]:
+                value = data[start + offset]
+                if value == -1:
+                    continue
+                if many:
+                    stack += reversed(lists[value + 1:value + 1 + lists[value]])
+                else:
+                    push(value)
+
+    def visit_all(self, arena: Arena):
+        """
+        Visit every node once in the order they are stored in, so the children of a node are always
+        visited before it, which is the order bottom up passes (like resolving types) need
+        """
+        handlers = self._handlers
+        for index, kind in enumerate(arena.kinds):
+            handler = handlers[kind]
+            if handler is not None:
+                handler(index)
@@ -1,1296 +1,2153 @@
-import os
-from typing import *
-from enum import Enum
-
-
-###################################################################################################################
-# Forward declare stmts
-###################################################################################################################
-
-
-class VType:
-
-    def __ne__(self, other):
-        return not (self == other)
-
-
-class Stmt:
-
-    def type_checking(self, function):
-        raise NotImplementedError
-
-
-class Expr:
-
-    def __init__(self):
-        self.type = None  # type: VType
-
-    def resolve_type(self, function):
-        """
-        :type function: FuncDecl
-        """
-        if self.type is None:
-            self.type = self._internal_resolve_type(function)
-            self.type = function.get_module().resolve_type(self.type)
-        return self.type
-
-    def _internal_resolve_type(self, function):
-        """
-        :type function: FuncDecl
-        """
-        raise NotImplementedError
-
-###################################################################################################################
-# Statements
-###################################################################################################################
-
-
-class StmtBlock(Stmt):
-
-    def __init__(self, parent, stmts: List[Stmt]):
-        """
-        :type parent: StmtBlock or FuncDecl
-        """
-        self.vars = {}  # type: Dict[str, Tuple(VType, bool)]
-        self.parent = parent
-        self.stmts = stmts
-
-    def __str__(self, indent=''):
-        s = '(block\n'
-        indent += '  '
-        for stmt in self.stmts:
-            s += indent + str(stmt).replace('\n', '\n' + indent) + '\n'
-        s = s[:-1]
-        s += ')'
-        return s
-
-    def get_var(self, name, search_parent: bool = True) -> Tuple[VType, bool] or None:
-        if name not in self.vars:
-            if search_parent:
-                return self.parent.get_var(name)
-            else:
-                return None
-        return self.vars[name]
-
-    def add_var(self, name: str, type: VType, mut: bool):
-        assert self.get_var(name) is None, f"variable {name} already exists in scope"
-        self.vars[name] = type, mut
-
-    def type_checking(self, function):
-        function.push_frame(self)
-        for stmt in self.stmts:
-            stmt.type_checking(function)
-        function.pop_frame()
-
-
-class StmtExpr(Stmt):
-
-    def __init__(self, expr):
-        self.expr = expr
-
-    def __str__(self):
-        return str(self.expr)
-
-    def type_checking(self, function):
-        self.expr.resolve_type(function)
-
-
-class StmtReturn(Stmt):
-
-    def __init__(self, exprs: List[Expr]):
-        self.exprs = exprs
-
-    def __str__(self):
-        return f'(return {" ".join(map(str, self.exprs))})'
-
-    def type_checking(self, function):
-        assert len(self.exprs) <= 1, f'Multiple return values are not supported yet'
-
-        for expr in self.exprs:
-            expr.resolve_type(function)
-            assert expr.type == function.ret_type, f'Type mismatch, expected `{function.ret_type}`, got `{expr.type}`'
-
-
-class StmtAssert(Stmt):
-
-    def __init__(self, expr: Expr):
-        self.expr = expr
-
-    def __str__(self):
-        return f'(assert {self.expr})'
-
-    def type_checking(self, function):
-        assert isinstance(self.expr.resolve_type(function), VBool), f'assert requires a boolean expression'
-
-
-class StmtIf(Stmt):
-
-    def __init__(self, condition: Expr, block_true: StmtBlock, block_false: StmtBlock or None):
-        self.condition = condition
-        self.block_true = block_true
-        self.block_false = block_false
-
-    def __str__(self):
-        s = f'(if {self.condition}'
-        s += '\n  ' + str(self.block_true).replace('\n', '\n  ')
-        if self.block_false is not None:
-            s += '\n  else\n'
-            s += '  ' + str(self.block_false).replace('\n', '\n  ')
-        s += ')'
-        return s
-
-    def type_checking(self, function):
-        assert isinstance(self.condition.resolve_type(function), VBool), f'if condition must be a boolean expression'
-        self.block_true.type_checking(function)
-        if self.block_false is not None:
-            self.block_false.type_checking(function)
-
-
-class StmtVarDecl(Stmt):
-
-    def __init__(self, mut: bool, names: List[str], expr: Expr):
-        self.mut = mut
-        self.names = names
-        self.expr = expr
-
-    def __str__(self):
-        mut = 'mut ' if self.mut else ''
-        return f'(var {mut}({" ".join(self.names)}) {self.expr})'
-
-    def type_checking(self, function):
-        # TODO: support multiple return
-        xtype = self.expr.resolve_type(function)
-        function.frame[-1].add_var(self.names[0], xtype, self.mut)
-
-
-class StmtForeach(Stmt):
-
-    def __init__(self, index: str or None, name: str, list: Expr, block: StmtBlock):
-        self.index = index
-        self.name = name
-        self.list = list
-        self.block = block
-
-    def __str__(self):
-        name = ''
-        if self.index is not None:
-            name += self.index + ' '
-        name += self.name
-        s = f'(foreach {name} {self.list}\n'
-        s += '  ' + str(self.block).replace('\n', '\n  ')
-        s += ')'
-        return s
-
-    def type_checking(self, function):
-        list_type = self.list.resolve_type(function)
-
-        if isinstance(list_type, VArrayType):
-            self.block.add_var(self.name, list_type.type, False)
-            if self.index is not None:
-                self.block.add_var(self.index, VIntegerType(32, True), False)
-
-        elif isinstance(list_type, VMapType):
-            self.block.add_var(self.name, list_type.value_type, False)
-            if self.index is not None:
-                self.block.add_var(self.index, list_type.key_type, False)
-
-        else:
-            assert False, f'Can not iterate over type `{list_type}`'
-
-        self.block.type_checking(function)
-
-
-class StmtFor(Stmt):
-
-    def __init__(self, value: Expr or StmtVarDecl or None, condition: Expr or None, next: Expr or None, block: StmtBlock):
-        self.value = value
-        self.condition = condition
-        self.next = next
-        self.block = block
-
-    def __str__(self):
-        val = str(self.value) if self.value is not None else '()'
-        cond = str(self.condition) if self.condition is not None else '()'
-        next = str(self.next) if self.next is not None else '()'
-        s = f'(for {val} {cond} {next}\n'
-        s += '  ' + str(self.block).replace('\n', '\n  ')
-        s += ')'
-        return s
-
-    def type_checking(self, function):
-        if self.value is not None:
-
-            if isinstance(self.value, Expr):
-                self.value.resolve_type(function)
-
-            elif isinstance(self.value, StmtVarDecl):
-                self.value.type_checking(function)
-
-            else:
-                assert False
-
-        if self.condition is not None:
-            assert isinstance(self.condition.resolve_type(function), VBool), f'Condition of a for loop must be a boolean expression (got `{self.condition.resolve_type(function)}`)'
-
-        if self.next is not None:
-            self.next.resolve_type(function)
-
-        self.block.type_checking(function)
-
-
-class StmtUnsafe(Stmt):
-
-    def __init__(self, block: StmtBlock):
-        self.block = block
-
-    def __str__(self):
-        return '(unsafe\n  ' + str(self.block).replace('\n', '\n  ') + ')'
-
-    def type_checking(self, function):
-        self.block.type_checking(function)
-
-
-class StmtDefer(Stmt):
-
-    def __init__(self, block: StmtBlock):
-        self.block = block
-
-    def __str__(self):
-        return '(defer\n  ' + str(self.block).replace('\n', '\n  ') + ')'
-
-    def type_checking(self, function):
-        self.block.type_checking(function)
-
-###################################################################################################################
-# Types
-###################################################################################################################
-
-
-class VUnknownType(VType):
-
-    def __init__(self, name: str):
-        self.name = name
-
-    def __str__(self):
-        return f'UnknownType<{self.name}>'
-
-
-class VIntegerType(VType):
-
-    def __init__(self, bits: int, signed: bool):
-        self.bits = bits
-        self.signed = signed
-
-    def __str__(self):
-        # Special cases
-        if self.signed and self.bits == 32:
-            return 'int'
-        elif not self.signed and self.bits == 8:
-            return 'byte'
-        elif self.signed:
-            return f'i{self.bits}'
-        else:
-            return f'u{self.bits}'
-
-    def __eq__(self, other):
-        if isinstance(other, VIntegerType):
-            return self.signed == other.signed and self.bits == other.bits
-        return False
-
-
-class VFloatType(VType):
-
-    def __init__(self, bits: int):
-        self.bits = bits
-
-    def __str__(self):
-        return f'f{self.bits}'
-
-    def __eq__(self, other):
-        if isinstance(other, VFloatType):
-            return self.bits == other.bits
-        return False
-
-
-class VBool(VType):
-
-    def __init__(self):
-        pass
-
-    def __str__(self):
-        return 'bool'
-
-    def __eq__(self, other):
-        return isinstance(other, VBool)
-
-#
-# class VFuncType(VType):
-#
-#     def __init__(self, args: List[Tuple[VType, bool]], ret: VType or None):
-#         self.args = args
-#         self.ret = ret
-#
-#     def __str__(self):
-#         args = []
-#         for arg in self.args:
-#             a = ''
-#             if arg[1]:
-#                 a += 'mut '
-#             a += arg[0]
-#             args.append(a)
-#
-#         s = f'fn ({args})'
-#
-#         if self.ret is not None:
-#             s += ' ' + self.ret
-#
-#         return s
-#
-#     def __eq__(self, other):
-#         if isinstance(other, VFuncType):
-#             return self.args == other.args and self.ret == other.ret
-#         return False
-#
-
-class VArrayType(VType):
-
-    def __init__(self, xtype: VType):
-        self.type = xtype
-
-    def __str__(self):
-        return f'[]{self.type}'
-
-    def __eq__(self, other):
-        if isinstance(other, VArrayType):
-            return self.type == other.type
-        return False
-
-
-class VMapType(VType):
-
-    def __init__(self, key_type: VType, value_type: VType):
-        self.key_type = key_type
-        self.value_type = value_type
-
-    def __str__(self):
-        return f'map[{self.key_type}]{self.value_type}'
-
-    def __eq__(self, other):
-        if isinstance(other, VMapType):
-            return self.key_type == other.key_type and self.value_type == other.value_type
-        return False
-
-
-class VOptionalType(VType):
-
-    def __init__(self, xtype: VType):
-        self.type = xtype
-
-    def __str__(self):
-        return f'?{self.type}'
-
-    def __eq__(self, other):
-        if isinstance(other, VOptionalType):
-            return self.type == other.type
-        return False
-
-
-class VPointerType(VType):
-
-    def __init__(self, xtype: VType):
-        self.type = xtype
-
-    def __str__(self):
-        return f'&{self.type}'
-
-    def __eq__(self, other):
-        if isinstance(other, VPointerType):
-            return self.type == other.type
-        return False
-
-
-###################################################################################################################
-# Expressions
-###################################################################################################################
-
-
-class ExprIntegerLiteral(Expr):
-
-    def __init__(self, value: int):
-        super(ExprIntegerLiteral, self).__init__()
-        self.value = value
-
-    def __str__(self):
-        return str(self.value)
-
-    def _internal_resolve_type(self, function):
-        # Always an int
-        return VIntegerType(32, True)
-
-
-class ExprArrayLiteral(Expr):
-
-    def __init__(self, values: List[Expr]):
-        super(ExprArrayLiteral, self).__init__()
-        self.values = values
-
-    def __str__(self):
-        s = '(array\n'
-        s += '  ' + str(self.values).replace('\n', '\n  ') + ')'
-        return s
-
-    def _internal_resolve_type(self, function):
-        array_type = None
-        for element in self.values:
-            type = element.resolve_type(function)
-            if array_type is None:
-                array_type = type
-            else:
-                assert type == array_type, f"Type mismatch in array literal, expected `{array_type}`, got `{type}`"
-        return VArrayType(array_type)
-
-
-class ExprRange(Expr):
-
-    def __init__(self, expr_from: Expr, expr_to: Expr):
-        super(ExprRange, self).__init__()
-        self.expr_from = expr_from
-        self.expr_to = expr_to
-
-    def __str__(self):
-        return f'(range {self.expr_from} {self.expr_to})'
-
-    def _internal_resolve_type(self, function):
-        from_type = self.expr_from.resolve_type(function)
-        to_type = self.expr_to.resolve_type(function)
-        assert from_type == to_type, f"Type mismatch ({from_type} and {to_type})"
-        return VArrayType(from_type)
-
-
-class ExprFloatLiteral(Expr):
-
-    def __init__(self, value: int):
-        super(ExprFloatLiteral, self).__init__()
-        self.value = value
-
-    def __str__(self):
-        return str(self.value)
-
-    def _internal_resolve_type(self, function):
-        return VFloatType(32)
-
-
-class ExprIdentifierLiteral(Expr):
-
-    def __init__(self, name: str):
-        super(ExprIdentifierLiteral, self).__init__()
-        self.name = name
-
-    def __str__(self):
-        return self.name
-
-    def _internal_resolve_type(self, function):
-        res = function.get_var(self.name)
-        assert res is not None, f"Unknown identifier `{self.name}`"
-
-        # This is how we store a variable
-        if isinstance(res, tuple):
-            return res[0]
-
-        # This is how we store interop functions
-        elif isinstance(res, dict):
-            return res
-
-        # Handle constants
-        elif isinstance(res, ConstDecl):
-            return res.get_type(function)
-
-        assert False, f'unknown identifier type {res}'
-
-
-class ExprBinary(Expr):
-
-    TYPE_TABLE = {
-        '+': [VIntegerType, VFloatType],
-        '-': [VIntegerType, VFloatType],
-        '*': [VIntegerType, VFloatType],
-        '/': [VIntegerType, VFloatType],
-        '%': [VIntegerType],
-
-        '&': [VIntegerType],
-        '|': [VIntegerType],
-        '^': [VIntegerType],
-
-        # TODO: restrict with unsigned numbers on the right
-        '<<': [VIntegerType],
-        '>>': [VIntegerType],
-
-        '&&': [VBool],
-        '||': [VBool],
-    }
-
-    def __init__(self, left: Expr, op: str, right: Expr):
-        super(ExprBinary, self).__init__()
-        self.left = left
-        self.right = right
-        self.op = op
-
-    def __str__(self):
-        return f'({self.op} {self.left} {self.right})'
-
-    def _internal_resolve_type(self, function):
-        left_type = self.left.resolve_type(function)
-        right_type = self.right.resolve_type(function)
-        assert left_type == right_type, f"Mismatching types (`{left_type}` and `{right_type}`)"
-
-        # This is part of assignment?
-        if self.op.endswith('='):
-
-            # relational and equality
-            if len(self.op) == 2 and self.op[0] in ['>', '<', '=', '!']:
-                return VBool()
-
-            # Assignment expression
-            else:
-                assert left_type.__class__ in ExprBinary.TYPE_TABLE[self.op[-1]], f'Invalid type `{left_type}` for operator `{self.op[-1]}`'
-                return left_type
-
-        # Normal operators
-        else:
-            assert left_type.__class__ in ExprBinary.TYPE_TABLE[
-                self.op[-1]], f'Invalid type `{left_type}` for operator `{self.op}`'
-            return left_type
-
-
-class ExprUnary(Expr):
-
-    def __init__(self, op: str, right: Expr):
-        super(ExprUnary, self).__init__()
-        self.right = right
-        self.op = op
-
-    def __str__(self):
-        if self.op == '&':
-            return f'(ref {self.right})'
-        elif self.op == '*':
-            return f'(deref {self.right})'
-        else:
-            return f'(prefix {self.op} {self.right})'
-
-    def _internal_resolve_type(self, function):
-        xtype = self.right.resolve_type(function)
-
-        if self.op == '*':
-            assert isinstance(xtype, VPointerType), f"Tried to dereference a none pointer (`{xtype}`)"
-            return xtype.type
-
-        elif self.op == '&':
-            # TODO: check that it is possible to ref the expression
-            return VPointerType(xtype)
-
-        elif self.op == '!':
-            assert isinstance(xtype, VBool), f'Invalid type `{xtype}` for operator `{self.op}`'
-            return xtype
-
-        elif self.op == '~':
-            assert isinstance(xtype, VIntegerType), f'Invalid type `{xtype}` for operator `{self.op}`'
-            return xtype
-
-        else:
-            assert isinstance(xtype, VIntegerType) or isinstance(xtype, VFloatType), f'Invalid type `{xtype}` for operator `{self.op}`'
-            return xtype
-
-
-class ExprImplicitEnum(Expr):
-
-    def __init__(self, name: str):
-        super(ExprImplicitEnum, self).__init__()
-        self.name = name
-
-    def __str__(self):
-        return f'(implicit {self.name})'
-
-    def _internal_resolve_type(self, function):
-        assert False, "Implicit enums are not supported yet"
-
-
-class ExprIn(Expr):
-
-    def __init__(self, left: Expr, right: Expr):
-        super(ExprIn, self).__init__()
-        self.left = left
-        self.right = right
-
-    def __str__(self):
-        return f'(in {self.left} {self.right})'
-
-    def _internal_resolve_type(self, function):
-        left_type = self.left.resolve_type(function)
-        right_type = self.left.resolve_type(function)
-
-        if isinstance(right_type, VMapType):
-            assert left_type == right_type.key_type, f"Type mismatch, expected {right_type.key_type}, got {left_type}"
-
-        elif isinstance(right_type, VArrayType):
-            assert left_type == VIntegerType(32, True), f"Type mismatch, expected {right_type.type}, got {left_type}"
-
-        return VBool()
-
-
-class ExprPostfix(Expr):
-
-    def __init__(self, left: Expr, op: str):
-        super(ExprPostfix, self).__init__()
-        self.op = op
-        self.left = left
-
-    def __str__(self):
-        return f'(postfix {self.left} {self.op})'
-
-    def _internal_resolve_type(self, function):
-        xtype = self.left.resolve_type(function)
-        assert isinstance(xtype, VIntegerType), f'Invalid type `{xtype}` for operator `{self.op}`'
-        return xtype
-
-
-class ExprIf(Expr):
-
-    def __init__(self, condition: Expr, block_true: StmtBlock, block_false: StmtBlock):
-        super(ExprIf, self).__init__()
-        self.condition = condition
-        self.block_true = block_true
-        self.block_false = block_false
-
-    def __str__(self):
-        s = f'(if {self.condition}\n'
-        s += '  ' + str(self.block_true).replace('\n', '\n  ') + '\n'
-        s += '  else\n'
-        s += '  ' + str(self.block_false).replace('\n', '\n  ')
-        s += ')'
-        return s
-
-    def _internal_resolve_type(self, function):
-        self.block_true.type_checking(function)
-        self.block_false.type_checking(function)
-
-        assert len(self.block_true.stmts) != 0 and isinstance(self.block_true.stmts[-1], StmtExpr), f'Last statement of an if expression must be an expression!'
-        assert len(self.block_false.stmts) != 0 and isinstance(self.block_false.stmts[-1], StmtExpr), f'Last statement of an if expression must be an expression!'
-
-        true_type = self.block_true[-1].expr.resolve_type(function)
-        false_type = self.block_true[-1].expr.resolve_type(function)
-        assert true_type == false_type, f'Type mismatch between blocks (got {true_type} and {false_type})'
-
-        return true_type
-
-
-class ExprOr(Expr):
-
-    def __init__(self, expr: Expr, block_error: StmtBlock):
-        super(ExprOr, self).__init__()
-        self.expr = expr
-        self.block_error = block_error
-
-    def __str__(self):
-        s = f'(or {self.expr}\n'
-        s += '  ' + str(self.block_error).replace('\n', '\n  ') + ')'
-        return s
-
-    def _internal_resolve_type(self, function):
-        xtype = self.expr.resolve_type(function)
-        assert isinstance(xtype, VOptionalType), f'expected an optional type, got `{xtype}`'
-
-        # Make sure the block never exits the block
-        # TODO: add check for the panic function (or just add a noreturn attribute?)
-        self.block_error.type_checking(function)
-        assert len(self.block_error.stmts) != 0, f'or block must return!'
-        stmt = self.block_error.stmts[-1]
-        assert isinstance(stmt, StmtReturn), f'or block must return!'
-
-        # Return the underlying type
-        return xtype.type
-
-
-class ExprMemberAccess(Expr):
-
-    def __init__(self, value: Expr, member: str):
-        super(ExprMemberAccess, self).__init__()
-        self.value = value
-        self.member = member
-
-    def __str__(self):
-        return f'(member {self.value} {self.member})'
-
-    def _internal_resolve_type(self, function):
-        value_type = self.value.resolve_type(function)
-
-        # Enum members
-        if isinstance(value_type, EnumDecl):
-            assert self.member in value_type.elements, f'Unknown enum field `{self.member}`'
-
-            # TODO: check pub access
-
-            return value_type
-
-        # Struct members
-        elif isinstance(value_type, StructDecl):
-            for elem in value_type.elements:
-                # TODO: access checks
-                if elem.name == self.member:
-                    return elem.type
-
-            assert False, f"Unknown struct field `{self.member}`"
-
-        # Array type, these are hardcoded
-        elif isinstance(value_type, VArrayType):
-            if self.member == 'data':
-                # TODO: voidptr
-                assert False
-
-            elif self.member == 'len':
-                return VIntegerType(32, True)
-
-            elif self.member == 'cap':
-                return VIntegerType(32, True)
-
-            elif self.member == 'element_size':
-                return VIntegerType(32, True)
-
-            else:
-                assert False, f'Unknown array field `{self.member}`'
-
-        # Map type, these are hardcoded
-        elif isinstance(value_type, VMapType):
-            if self.member == 'size':
-                return VIntegerType(32, True)
-
-            else:
-                assert False, f'Unknown map field `{self.member}`'
-
-        # TODO: string type
-
-        # TODO: Search for methods
-
-        # Interops (should be)
-        elif isinstance(value_type, dict):
-            if self.member in value_type:
-                return value_type[self.member]
-            else:
-                assert False, f'Unknown interop function `{self.member}`'
-
-        # Did not find anything
-        assert False, f'Type `{value_type}` has no members!'
-
-
-class ExprIndexAccess(Expr):
-
-    def __init__(self, value: Expr, index: Expr):
-        super(ExprIndexAccess, self).__init__()
-        self.value = value
-        self.index = index
-
-    def __str__(self):
-        return f'(index {self.value} {self.index})'
-
-    def _internal_resolve_type(self, function):
-        value_type = self.value.resolve_type(function)
-        index_type = self.index.resolve_type(function)
-
-        if isinstance(value_type, VArrayType):
-            assert index_type == VIntegerType(32, True), f'Type mismatch, expected `int`, got `{index_type}`'
-            return value_type.type
-
-        elif isinstance(value_type, VMapType):
-            assert index_type == value_type.key_type, f"Type mistmatch, expected `{value_type.key_type}`, got `{index_type}`"
-            return value_type.value_type
-
-        else:
-            assert False, f"type `{value_type}` is not index-able"
-
-
-class ExprCall(Expr):
-
-    def __init__(self, func: Expr, args: List[Expr]):
-        super(ExprCall, self).__init__()
-        self.func = func
-        self.args = args
-
-    def __str__(self):
-        return f'(call {self.func} ({" ".join(map(str, self.args))}))'
-
-    def _internal_resolve_type(self, function):
-        func_type = self.func.resolve_type(function)
-
-        assert isinstance(func_type, FuncDecl), f'Not a function!'
-        assert len(func_type.args) == len(self.args), f'Function expected {len(func_type.args)} arguments, got {len(self.args)}'
-
-        for i in range(len(func_type.args)):
-            expect_arg_type = func_type.args[i].type
-            arg_type = self.args[i].resolve_type(function)
-            assert arg_type == arg_type, f'Type mismatch, expected `{func_type.args[i]}`, got `{arg_type}`'
-
-        return func_type.ret_type
-
-###################################################################################################################
-# Declarations
-###################################################################################################################
-
-
-class FuncParam:
-
-    def __init__(self, mut: bool, name: str, xtype: VType):
-        self.mut = mut
-        self.name = name
-        self.type = xtype
-
-    def __str__(self):
-        mut = 'mut ' if self.mut else ''
-        return f'({mut}{self.name} {self.type})'
-
-
-class FuncDecl:
-
-    def __init__(self, pub: bool, interop: bool, name: str, method: FuncParam, args: List[FuncParam], ret_value: VType):
-        self.module = None  # type: Module
-        self.pub = pub
-        self.interop = interop
-        self.name = name
-        self.method = method
-        self.args = args
-        self.ret_type = ret_value
-        self.block = None  # type: StmtBlock or None
-        self.frame = []  # type: List[StmtBlock]
-
-    def __str__(self):
-        pub = 'pub ' if self.pub else ''
-        block = str(self.block).replace("\n", "\n  ")
-        ret_val = '' if self.ret_type is None else str(self.ret_type)
-        name = ('C.' if self.interop else '') + self.name
-        if self.block is not None:
-            block = f'\n  {block}'
-        else:
-            block = ''
-        method = str(self.method) + ' ' if self.method is not None else ''
-        return f'(func {pub}{name} {method}({" ".join(map(str, self.args))}) {ret_val}{block})'
-
-    def type_checking(self):
-        if self.block is not None:
-            self.block.type_checking(self)
-
-    def get_module(self):
-        assert self.module is not None
-        return self.module
-
-    def push_frame(self, block):
-        self.frame.append(block)
-
-    def pop_frame(self):
-        self.frame.pop()
-
-    def get_var(self, name):
-        # Check for the stack frames first
-        for frame in self.frame:
-            f = frame.get_var(name, False)
-            if f is not None:
-                return f
-
-        # Then check for the args
-        for arg in self.args:
-            if arg.name == name:
-                return arg.type, arg.mut
-
-        # Lastly check from the module
-        return self.module.get_var(name)
-
-
-class StructMemberAccess(Enum):
-    PRIVATE = 'private'
-    PRIVATE_MUT = 'private mut'
-    PUBLIC = 'public'
-    PUBLIC_PRIV_MUT = 'public, private mut'
-    PUBLIC_MUT = 'public mut'
-
-
-class StructElement:
-
-    def __init__(self, access: StructMemberAccess, name: str, xtype: VType):
-        self.access = access
-        self.name = name
-        self.type = xtype
-
-    def __str__(self):
-        return f'({self.access.value} {self.name} {self.type})'
-
-
-class StructDecl:
-
-    def __init__(self, pub: bool, attribute: dict, name: str, base: StructElement or None, elements: List[StructElement]):
-        self.module = None  # type: Module
-        self.pub = pub
-        self.attribute = attribute
-        self.name = name
-        self.base = base
-        self.elements = elements
-
-    def __str__(self):
-        pub = 'pub ' if self.pub else ''
-
-        s = f'(struct {pub}{self.name}\n'
-
-        if self.base is not None:
-            s += '  ' + str(self.base) + '\n'
-
-        for elem in self.elements:
-            s += '  ' + str(elem) + '\n'
-
-        s = s[:-1]
-        s += ')'
-        return s
-
-
-class ModuleDecl:
-
-    def __init__(self, name: str):
-        self.name = name
-
-    def __str__(self):
-        return f'(module {self.name})'
-
-
-class ImportDecl:
-
-    def __init__(self, name: str):
-        self.name = name
-
-    def __str__(self):
-        return f'(import {self.name})'
-
-
-class EnumDecl:
-
-    def __init__(self, pub: bool, name: str, elements: List[str]):
-        self.module = None  # type: Module
-        self.pub = pub
-        self.name = name
-        self.elements = elements
-
-    def __str__(self):
-        pub = 'pub ' if self.pub else ''
-        s = f'(enum {pub}{self.name}\n'
-        i = 0
-        for elem in self.elements:
-            s += f'  ({i} {elem})\n'
-            i += 1
-        s = s[:-1]
-        s += ')'
-        return s
-
-
-class ConstDecl:
-
-    def __init__(self, pub: bool, name: str, value: Expr):
-        self.module = None  # type: Module
-        self.pub = pub
-        self.name = name
-        self.value = value
-
-    def __str__(self):
-        pub = 'pub ' if self.pub else ''
-        return f'(const {pub}{self.name} {self.value})'
-
-    def type_checking(self):
-        self.value.resolve_type(self.module)
-
-    def get_type(self, function):
-        return self.value.resolve_type(function)
-
-
-class TypeDecl:
-
-    def __init__(self, pub: bool, name: str, xtype: VType):
-        self.pub = pub
-        self.name = name
-        self.type = xtype
-
-    def __str__(self):
-        pub = 'pub ' if self.pub else ''
-        return f'(type {pub}{self.name} {self.type})'
-
-    def type_checking(self):
-        pass
-
-
-class Module:
-
-    def __init__(self):
-        self.workspace = None  # type: Workspace
-        self.name = 'main'
-        self.decls = {}
-
-    def add(self, val):
-        # Make sure not in builtin already
-        assert self._resolve_builtin(val.name) is None, f'duplicate name `{val.name}` in module `{self.name}`'
-
-        # Add the module as long as this is not an import
-        if not isinstance(val, Module):
-            val.module = self
-
-        # Handle interop functions properly
-        if isinstance(val, FuncDecl):
-            if val.interop:
-                assert val.name not in self.decls['C'], f'duplicate name `{val.name}` in module `{self.name}`'
-                self.decls['C'][val.name] = val
-            else:
-                assert val.name not in self.decls, f'duplicate name `{val.name}` in module `{self.name}`'
-                self.decls[val.name] = val
-
-        # On import simply load the module from the workspace
-        elif isinstance(val, ImportDecl):
-            self.add(self.workspace.load_module(val.name))
-
-        # Handle the module declaration
-        elif isinstance(val, ModuleDecl):
-            assert val.name == self.name, f'module declaration and module path mismatch (`{val.name}` and `{self.name}`)!'
-
-        # everything else we just add as is
-        else:
-            self.decls[val.name] = val
-
-    def get_var(self, name):
-        bnval = self._resolve_builtin(name)
-
-        if bnval is not None:
-            return bnval
-
-        if name in self.decls:
-            return self.decls[name]
-
-        return None
-
-    def resolve_type(self, xtype):
-        # Unknown type
-        if isinstance(xtype, VUnknownType):
-            xtype = self.get_var(xtype.name)
-
-        # Array ty[e
-        elif isinstance(xtype, VArrayType):
-            xtype.type = self.resolve_type(xtype.type)
-
-        # Map type
-        elif isinstance(xtype, VMapType):
-            xtype.key_type = self.resolve_type(xtype.key_type)
-            xtype.value_type = self.resolve_type(xtype.value_type)
-
-        # Pointer type
-        elif isinstance(xtype, VPointerType):
-            xtype.type = self.resolve_type(xtype.type)
-
-        # Optional type
-        elif isinstance(xtype, VOptionalType):
-            xtype.type = self.resolve_type(xtype.type)
-
-        # Default types, nothing more to resolve
-        elif isinstance(xtype, VIntegerType) or isinstance(xtype, VFloatType) or isinstance(xtype, VBool):
-            pass
-
-        # Enums and structs are already resovled
-        elif isinstance(xtype, EnumDecl) or isinstance(xtype, StructDecl) or isinstance(xtype, FuncDecl):
-            pass
-
-        # Handle a dictionary
-        elif isinstance(xtype, dict):
-            for key in xtype:
-                xtype[key] = self.resolve_type(xtype[key])
-
-        elif isinstance(xtype, TypeDecl):
-            xtype = self.resolve_type(xtype.type)
-
-        # No return value
-        elif xtype is None:
-            return None
-
-        else:
-            assert False, xtype
-
-        return xtype
-
-    def _resolve_builtin(self, name):
-        if self.name == 'builtin':
-            return None
-
-        bn = self.decls['builtin']
-        assert isinstance(bn, Module), f'error resolving builtin!'
-        return bn.get_var(name)
-
-    def get_module(self):
-        return self
-
-    def type_checking(self):
-        structs = []
-        constants = []
-        functions = []
-
-        # add to lists everything we will need to resolve
-        for r in self.decls:
-            decl = self.decls[r]
-            if isinstance(decl, StructDecl):
-                structs.append(decl)
-            elif isinstance(decl, ConstDecl):
-                constants.append(decl)
-            elif isinstance(decl, FuncDecl):
-                functions.append(decl)
-
-        # TODO: Functions should return a func type!
-
-        # Resolve all the interop stuff
-        for r in self.decls['C']:
-            r = self.decls['C'][r]
-            if isinstance(r, FuncDecl):
-                for arg in r.args:
-                    arg.type = self.resolve_type(arg.type)
-
-                if r.ret_type is not None:
-                    r.ret_type = self.resolve_type(r.ret_type)
-
-        # Resolve all the constants
-        for const in constants:
-            const.type_checking()
-
-        # Resolve all of the types inside of functions
-        for func in functions:
-            for arg in func.args:
-                arg.type = self.resolve_type(arg.type)
-
-            if func.ret_type is not None:
-                func.ret_type = self.resolve_type(func.ret_type)
-
-        # finally do type checking on all functions
-        for func in functions:
-            func.type_checking()
-
-    def __str__(self):
-        s = ''
-        for k in self.decls:
-            decl = self.decls[k]
-            s += str(decl) + '\n'
-        return s[:-1]
-
-
-BOLD = '\033[01m'
-RESET = '\033[0m'
-GREEN = '\033[32m'
-RED = '\033[31m'
-
-
-def load_from_path(module: Module, path: str):
-    if os.path.exists(path):
-        for file in os.listdir(path):
-            if os.path.isfile(file) and file.endswith('.v'):
-                # we do the imports here to avoid recursive imports
-                from vork.parser import Parser
-                from vork.tokenizer import Tokenizer
-                with open(file, 'r') as f:
-                    text = f.read()
-                    lines = text.splitlines()
-                    tokenizer = Tokenizer(text)
-                    parser = Parser(tokenizer)
-
-                    try:
-                        # Parse it and add everything to the module
-                        ast = parser.parse()
-                        for a in ast:
-                            module.add(a)
-                    except Exception as e:
-                        # TODO: syntax error recovering?
-                        pos = tokenizer.token.pos
-
-                        msg = ", ".join(e.args)
-                        if msg == '':
-                            msg = 'Unexpected token'
-
-                        print(
-                            f'{BOLD}{file}:{pos.start_line + 1}:{pos.start_column + 1}:{RESET} {RED}{BOLD}syntax error:{RESET} {msg}')
-
-                        line = lines[pos.start_line]
-                        line = line[:pos.start_column] + BOLD + line[
-                                                                pos.start_column:pos.end_column] + RESET + line[
-                                                                                                           pos.end_column:]
-                        print(line)
-
-                        c = ''
-                        for i in range(pos.start_column):
-                            if lines[pos.start_line][i] == '\t':
-                                c += '\t'
-                            else:
-                                c += ' '
-
-                        print(c + BOLD + RED + '^' + '~' * (pos.end_column - pos.start_column - 1) + RESET)
-                        print()
-
-
-class Workspace:
-
-    def __init__(self, dirs: List[str]):
-        self.modules = {}  # type: Dict[str, Module]
-        self.dirs = dirs
-
-        # Create the builtin module
-        self.builtin = Module()
-        self.builtin.name = 'builtin'
-
-        # Add integer types
-        self.builtin.add(TypeDecl(True, 'byte', VIntegerType(8, False)))
-        self.builtin.add(TypeDecl(True, 'u16', VIntegerType(16, False)))
-        self.builtin.add(TypeDecl(True, 'u32', VIntegerType(32, False)))
-        self.builtin.add(TypeDecl(True, 'u64', VIntegerType(64, False)))
-        self.builtin.add(TypeDecl(True, 'u128', VIntegerType(128, False)))
-        self.builtin.add(TypeDecl(True, 'i8', VIntegerType(8, True)))
-        self.builtin.add(TypeDecl(True, 'i16', VIntegerType(16, True)))
-        self.builtin.add(TypeDecl(True, 'int', VIntegerType(32, True)))
-        self.builtin.add(TypeDecl(True, 'i64', VIntegerType(64, True)))
-        self.builtin.add(TypeDecl(True, 'i128', VIntegerType(128, True)))
-
-        # Add float types
-        self.builtin.add(TypeDecl(True, 'f32', VFloatType(32)))
-        self.builtin.add(TypeDecl(True, 'f64', VFloatType(64)))
-
-        # Add other types
-        self.builtin.add(TypeDecl(True, 'bool', VBool()))
-
-    def load_main(self, path):
-        if 'main' in self.modules:
-            return self.modules['main']
-        module = Module()
-        module.workspace = self
-        module.decls['builtin'] = self.builtin
-        module.decls['C'] = dict()
-        module.name = 'main'
-        self.modules['main'] = module
-        load_from_path(self.modules['main'], path)
-        module.type_checking()
-
-    def load_module(self, name: str):
-        # first make sure we don't have it already
-        if name in self.modules:
-            return self.modules[name]
-
-        # Create it
-        module = Module()
-        module.workspace = self
-        module.decls['builtin'] = self.builtin
-        module.decls['C'] = dict()
-        module.name = name.split('.')[-1]
-        self.modules[name] = module
-
-        # search for all the files related to the module
-        module_path = name.replace('.', '/')
-        for path in self.dirs:
-            load_from_path(module, path)
-
-        # Do the type checking
-        module.type_checking()
-
-        return module
-
-
-
-
+import os
+from typing import *
+from enum import Enum
+from types import GeneratorType
+from io import StringIO, BytesIO
+from types import MappingProxyType, FunctionType
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+import pickle
+import weakref
+
+
+###################################################################################################################
+# Forward declare stmts
+###################################################################################################################
+
+
+# Every type which is still in use, by its class and fields. A type leaves the table once nothing else refers to it,
+# so the table does not keep the declarations the types refer to (like a struct) alive after a module is dropped
+_TYPES = weakref.WeakValueDictionary()  # type: Dict[tuple, VType]
+
+
+class VType:
+    """
+    Types are hash consed: creating a type with the same structure as an existing one gives back the
+    existing object, so types are never modified, and are compared and hashed by identity
+    """
+
+    __slots__ = ('__weakref__',)
+
+    def __new__(cls, *fields):
+        # Fields which are objects are keyed by their identity, referring to them from the key would keep the
+        # type alive through them, and the type keeps them alive as long as it is in the table
+        key = (cls,) + tuple(field if field is None or isinstance(field, (str, int, float)) else id(field)
+                             for field in fields)
+        xtype = _TYPES.get(key)
+        if xtype is None:
+            xtype = _TYPES[key] = super(VType, cls).__new__(cls)
+        return xtype
+
+    def __reduce__(self):
+        # Unpickle through __new__ as well, so we get back the canonical type
+        return type(self), tuple(getattr(self, name) for name in self.__slots__)
+
+
+class Stmt:
+
+    __slots__ = ()
+
+    def __str__(self):
+        return _sexpr(self)
+
+    def _sexpr_parts(self):
+        raise NotImplementedError
+
+    def type_checking(self, function):
+        _check(function, self)
+
+    def _type_checking(self, function):
+        """
+        Yields the statements to type check and expressions to resolve the type of, the type is
+        sent back for expressions
+
+        :type function: FuncDecl
+        """
+        raise NotImplementedError
+
+
+class Expr:
+
+    __slots__ = ('type',)
+
+    def __init__(self):
+        self.type = None  # type: VType
+
+    def __str__(self):
+        return _sexpr(self)
+
+    def _sexpr_parts(self):
+        raise NotImplementedError
+
+    def resolve_type(self, function):
+        """
+        :type function: FuncDecl
+        """
+        if self.type is None:
+            _check(function, self)
+        return self.type
+
+    def _set_type(self, function, xtype):
+        self.type = xtype
+        self.type = function.get_module().resolve_type(self.type)
+
+    def _internal_resolve_type(self, function):
+        """
+        Either returns the type right away, or is a generator just like Stmt._type_checking, in
+        which case the type is what the generator returns
+
+        :type function: FuncDecl
+        """
+        raise NotImplementedError
+
+
+def _check(function, node):
+    """
+    Type checks a statement or resolves the type of an expression
+
+    The nested statements and expressions are kept on an explicit stack, so deeply nested code
+    does not run into the recursion limit
+
+    :type function: FuncDecl
+    """
+    stack = []
+    while True:
+        # Start on the node, leaf expressions are done right away
+        if isinstance(node, Expr):
+            if node.type is None:
+                result = node._internal_resolve_type(function)
+                if isinstance(result, GeneratorType):
+                    stack.append((node, result))
+                else:
+                    node._set_type(function, result)
+            value = node.type
+        else:
+            stack.append((node, node._type_checking(function)))
+            value = None
+
+        # Send the results back until someone needs another node checked
+        while len(stack) != 0:
+            parent, work = stack[-1]
+            try:
+                node = work.send(value)
+                break
+            except StopIteration as e:
+                stack.pop()
+                if isinstance(parent, Expr):
+                    parent._set_type(function, e.value)
+                    value = parent.type
+                else:
+                    value = None
+        else:
+            return value
+
+
+# Markers which a node yields while printing itself, to indent or dedent all the lines after them
+_INDENT = object()
+_DEDENT = object()
+
+
+def write_sexpr(node, stream: TextIO):
+    """
+    Writes a node in the lisp like format to a text stream
+
+    A node describes itself with _sexpr_parts, which yields text, child nodes and indentation
+    markers. The children are kept on an explicit stack, so deeply nested trees do not run into
+    the recursion limit, and the text is written as it is produced with only the indentation
+    level kept around, so it takes time linear in the output and no memory for it
+    """
+    write = stream.write
+    level = 0
+    stack = [node._sexpr_parts()]
+    while len(stack) != 0:
+        for part in stack[-1]:
+            if isinstance(part, str):
+                pass
+            elif part is _INDENT:
+                level += 1
+                continue
+            elif part is _DEDENT:
+                level -= 1
+                continue
+            elif hasattr(part, '_sexpr_parts'):
+                stack.append(part._sexpr_parts())
+                break
+            else:
+                part = str(part)
+
+            if '\n' in part:
+                part = part.replace('\n', '\n' + '  ' * level)
+            write(part)
+        else:
+            stack.pop()
+
+
+def _sexpr(node) -> str:
+    out = StringIO()
+    write_sexpr(node, out)
+    return out.getvalue()
+
+###################################################################################################################
+# Statements
+###################################################################################################################
+
+
+class StmtBlock(Stmt):
+
+    __slots__ = ('vars', 'parent', 'stmts')
+
+    def __init__(self, parent, stmts: List[Stmt]):
+        """
+        :type parent: StmtBlock or FuncDecl
+        """
+        self.vars = {}  # type: Dict[str, Tuple(VType, bool)]
+        self.parent = parent
+        self.stmts = stmts
+
+    def _sexpr_parts(self):
+        yield '(block'
+        yield _INDENT
+        for stmt in self.stmts:
+            yield '\n'
+            yield stmt
+        yield _DEDENT
+        yield ')'
+
+    def _type_checking(self, function):
+        function.push_frame(self)
+        for stmt in self.stmts:
+            yield stmt
+        function.pop_frame()
+
+
+class StmtExpr(Stmt):
+
+    __slots__ = ('expr',)
+
+    def __init__(self, expr):
+        self.expr = expr
+
+    def _sexpr_parts(self):
+        yield self.expr
+
+    def _type_checking(self, function):
+        yield self.expr
+
+
+class StmtReturn(Stmt):
+
+    __slots__ = ('exprs',)
+
+    def __init__(self, exprs: List[Expr]):
+        self.exprs = exprs
+
+    def _sexpr_parts(self):
+        yield '(return '
+        for i, expr in enumerate(self.exprs):
+            if i != 0:
+                yield ' '
+            yield expr
+        yield ')'
+
+    def _type_checking(self, function):
+        assert len(self.exprs) <= 1, f'Multiple return values are not supported yet'
+
+        ret_type = function.get_module().resolve_type(function.ret_type)
+        for expr in self.exprs:
+            yield expr
+            assert expr.type == ret_type, f'Type mismatch, expected `{ret_type}`, got `{expr.type}`'
+
+
+class StmtAssert(Stmt):
+
+    __slots__ = ('expr',)
+
+    def __init__(self, expr: Expr):
+        self.expr = expr
+
+    def _sexpr_parts(self):
+        yield '(assert '
+        yield self.expr
+        yield ')'
+
+    def _type_checking(self, function):
+        assert isinstance((yield self.expr), VBool), f'assert requires a boolean expression'
+
+
+class StmtIf(Stmt):
+
+    __slots__ = ('condition', 'block_true', 'block_false')
+
+    def __init__(self, condition: Expr, block_true: StmtBlock, block_false: StmtBlock or None):
+        self.condition = condition
+        self.block_true = block_true
+        self.block_false = block_false
+
+    def _sexpr_parts(self):
+        yield '(if '
+        yield self.condition
+        yield _INDENT
+        yield '\n'
+        yield self.block_true
+        if self.block_false is not None:
+            yield '\nelse\n'
+            yield self.block_false
+        yield _DEDENT
+        yield ')'
+
+    def _type_checking(self, function):
+        assert isinstance((yield self.condition), VBool), f'if condition must be a boolean expression'
+        yield self.block_true
+        if self.block_false is not None:
+            yield self.block_false
+
+
+class StmtVarDecl(Stmt):
+
+    __slots__ = ('mut', 'names', 'expr')
+
+    def __init__(self, mut: bool, names: List[str], expr: Expr):
+        self.mut = mut
+        self.names = names
+        self.expr = expr
+
+    def _sexpr_parts(self):
+        mut = 'mut ' if self.mut else ''
+        yield f'(var {mut}({" ".join(self.names)}) '
+        yield self.expr
+        yield ')'
+
+    def _type_checking(self, function):
+        # TODO: support multiple return
+        xtype = yield self.expr
+        function.add_var(function.frame[-1], self.names[0], xtype, self.mut)
+
+
+class StmtForeach(Stmt):
+
+    __slots__ = ('index', 'name', 'list', 'block')
+
+    def __init__(self, index: str or None, name: str, list: Expr, block: StmtBlock):
+        self.index = index
+        self.name = name
+        self.list = list
+        self.block = block
+
+    def _sexpr_parts(self):
+        name = ''
+        if self.index is not None:
+            name += self.index + ' '
+        name += self.name
+        yield f'(foreach {name} '
+        yield self.list
+        yield _INDENT
+        yield '\n'
+        yield self.block
+        yield _DEDENT
+        yield ')'
+
+    def _type_checking(self, function):
+        list_type = yield self.list
+
+        if isinstance(list_type, VArrayType):
+            function.add_var(self.block, self.name, list_type.type, False)
+            if self.index is not None:
+                function.add_var(self.block, self.index, VIntegerType(32, True), False)
+
+        elif isinstance(list_type, VMapType):
+            function.add_var(self.block, self.name, list_type.value_type, False)
+            if self.index is not None:
+                function.add_var(self.block, self.index, list_type.key_type, False)
+
+        else:
+            assert False, f'Can not iterate over type `{list_type}`'
+
+        yield self.block
+
+
+class StmtFor(Stmt):
+
+    __slots__ = ('value', 'condition', 'next', 'block')
+
+    def __init__(self, value: Expr or StmtVarDecl or None, condition: Expr or None, next: Expr or None, block: StmtBlock):
+        self.value = value
+        self.condition = condition
+        self.next = next
+        self.block = block
+
+    def _sexpr_parts(self):
+        yield '(for '
+        yield self.value if self.value is not None else '()'
+        yield ' '
+        yield self.condition if self.condition is not None else '()'
+        yield ' '
+        yield self.next if self.next is not None else '()'
+        yield _INDENT
+        yield '\n'
+        yield self.block
+        yield _DEDENT
+        yield ')'
+
+    def _type_checking(self, function):
+        if self.value is not None:
+
+            if isinstance(self.value, Expr) or isinstance(self.value, StmtVarDecl):
+                yield self.value
+
+            else:
+                assert False
+
+        if self.condition is not None:
+            condition_type = yield self.condition
+            assert isinstance(condition_type, VBool), f'Condition of a for loop must be a boolean expression (got `{condition_type}`)'
+
+        if self.next is not None:
+            yield self.next
+
+        yield self.block
+
+
+class StmtUnsafe(Stmt):
+
+    __slots__ = ('block',)
+
+    def __init__(self, block: StmtBlock):
+        self.block = block
+
+    def _sexpr_parts(self):
+        yield '(unsafe'
+        yield _INDENT
+        yield '\n'
+        yield self.block
+        yield _DEDENT
+        yield ')'
+
+    def _type_checking(self, function):
+        yield self.block
+
+
+class StmtDefer(Stmt):
+
+    __slots__ = ('block',)
+
+    def __init__(self, block: StmtBlock):
+        self.block = block
+
+    def _sexpr_parts(self):
+        yield '(defer'
+        yield _INDENT
+        yield '\n'
+        yield self.block
+        yield _DEDENT
+        yield ')'
+
+    def _type_checking(self, function):
+        yield self.block
+
+
+class StmtError(Stmt):
+    """
+    Stands in for a statement which had a syntax error, when the parser recovers from errors
+    """
+
+    __slots__ = ('message',)
+
+    def __init__(self, message: str):
+        self.message = message
+
+    def _sexpr_parts(self):
+        yield f'(error {self.message!r})'
+
+    def _type_checking(self, function):
+        return
+        yield
+
+###################################################################################################################
+# Types
+###################################################################################################################
+
+
+class VUnknownType(VType):
+
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __str__(self):
+        # Declarations keep their types as written, so print them the way they were written
+        return self.name
+
+
+class VIntegerType(VType):
+
+    __slots__ = ('bits', 'signed')
+
+    def __init__(self, bits: int, signed: bool):
+        self.bits = bits
+        self.signed = signed
+
+    def __str__(self):
+        # Special cases
+        if self.signed and self.bits == 32:
+            return 'int'
+        elif not self.signed and self.bits == 8:
+            return 'byte'
+        elif self.signed:
+            return f'i{self.bits}'
+        else:
+            return f'u{self.bits}'
+
+
+class VFloatType(VType):
+
+    __slots__ = ('bits',)
+
+    def __init__(self, bits: int):
+        self.bits = bits
+
+    def __str__(self):
+        return f'f{self.bits}'
+
+
+class VBool(VType):
+
+    __slots__ = ()
+
+    def __init__(self):
+        pass
+
+    def __str__(self):
+        return 'bool'
+
+#
+# class VFuncType(VType):
+#
+#     def __init__(self, args: List[Tuple[VType, bool]], ret: VType or None):
+#         self.args = args
+#         self.ret = ret
+#
+#     def __str__(self):
+#         args = []
+#         for arg in self.args:
+#             a = ''
+#             if arg[1]:
+#                 a += 'mut '
+#             a += arg[0]
+#             args.append(a)
+#
+#         s = f'fn ({args})'
+#
+#         if self.ret is not None:
+#             s += ' ' + self.ret
+#
+#         return s
+#
+#     def __eq__(self, other):
+#         if isinstance(other, VFuncType):
+#             return self.args == other.args and self.ret == other.ret
+#         return False
+#
+
+class VArrayType(VType):
+
+    __slots__ = ('type',)
+
+    def __init__(self, xtype: VType):
+        self.type = xtype
+
+    def __str__(self):
+        return f'[]{self.type}'
+
+
+class VMapType(VType):
+
+    __slots__ = ('key_type', 'value_type')
+
+    def __init__(self, key_type: VType, value_type: VType):
+        self.key_type = key_type
+        self.value_type = value_type
+
+    def __str__(self):
+        return f'map[{self.key_type}]{self.value_type}'
+
+
+class VOptionalType(VType):
+
+    __slots__ = ('type',)
+
+    def __init__(self, xtype: VType):
+        self.type = xtype
+
+    def __str__(self):
+        return f'?{self.type}'
+
+
+class VPointerType(VType):
+
+    __slots__ = ('type',)
+
+    def __init__(self, xtype: VType):
+        self.type = xtype
+
+    def __str__(self):
+        return f'&{self.type}'
+
+
+###################################################################################################################
+# Expressions
+###################################################################################################################
+
+
+class ExprIntegerLiteral(Expr):
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: int):
+        super(ExprIntegerLiteral, self).__init__()
+        self.value = value
+
+    def _sexpr_parts(self):
+        yield str(self.value)
+
+    def _internal_resolve_type(self, function):
+        # Always an int
+        return VIntegerType(32, True)
+
+
+class ExprArrayLiteral(Expr):
+
+    __slots__ = ('values',)
+
+    def __init__(self, values: List[Expr]):
+        super(ExprArrayLiteral, self).__init__()
+        self.values = values
+
+    def _sexpr_parts(self):
+        yield '(array'
+        yield _INDENT
+        yield '\n'
+        yield str(self.values)
+        yield _DEDENT
+        yield ')'
+
+    def _internal_resolve_type(self, function):
+        array_type = None
+        for element in self.values:
+            type = yield element
+            if array_type is None:
+                array_type = type
+            else:
+                assert type == array_type, f"Type mismatch in array literal, expected `{array_type}`, got `{type}`"
+        return VArrayType(array_type)
+
+
+class ExprRange(Expr):
+
+    __slots__ = ('expr_from', 'expr_to')
+
+    def __init__(self, expr_from: Expr, expr_to: Expr):
+        super(ExprRange, self).__init__()
+        self.expr_from = expr_from
+        self.expr_to = expr_to
+
+    def _sexpr_parts(self):
+        yield '(range '
+        yield self.expr_from
+        yield ' '
+        yield self.expr_to
+        yield ')'
+
+    def _internal_resolve_type(self, function):
+        from_type = yield self.expr_from
+        to_type = yield self.expr_to
+        assert from_type == to_type, f"Type mismatch ({from_type} and {to_type})"
+        return VArrayType(from_type)
+
+
+class ExprFloatLiteral(Expr):
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: int):
+        super(ExprFloatLiteral, self).__init__()
+        self.value = value
+
+    def _sexpr_parts(self):
+        yield str(self.value)
+
+    def _internal_resolve_type(self, function):
+        return VFloatType(32)
+
+
+class ExprIdentifierLiteral(Expr):
+
+    __slots__ = ('name', 'slot')
+
+    def __init__(self, name: str):
+        super(ExprIdentifierLiteral, self).__init__()
+        self.name = name
+
+        # The slot of the local variable or parameter this refers to, once type checked
+        self.slot = None  # type: int or None
+
+    def _sexpr_parts(self):
+        yield self.name
+
+    def _internal_resolve_type(self, function):
+        # Locals are found by their slot
+        slot = function.get_slot(self.name)
+        if slot is not None:
+            self.slot = slot
+            return function.locals[slot][0]
+
+        res = function.get_var(self.name)
+        assert res is not None, f"Unknown identifier `{self.name}`"
+
+        # This is how we store a variable
+        if isinstance(res, tuple):
+            return res[0]
+
+        # This is how we store interop functions
+        elif isinstance(res, dict):
+            return res
+
+        # Handle constants
+        elif isinstance(res, ConstDecl):
+            return res.get_type(function)
+
+        assert False, f'unknown identifier type {res}'
+
+
+class ExprBinary(Expr):
+
+    __slots__ = ('left', 'right', 'op')
+
+    TYPE_TABLE = {
+        '+': [VIntegerType, VFloatType],
+        '-': [VIntegerType, VFloatType],
+        '*': [VIntegerType, VFloatType],
+        '/': [VIntegerType, VFloatType],
+        '%': [VIntegerType],
+
+        '&': [VIntegerType],
+        '|': [VIntegerType],
+        '^': [VIntegerType],
+
+        # TODO: restrict with unsigned numbers on the right
+        '<<': [VIntegerType],
+        '>>': [VIntegerType],
+
+        '&&': [VBool],
+        '||': [VBool],
+    }
+
+    def __init__(self, left: Expr, op: str, right: Expr):
+        super(ExprBinary, self).__init__()
+        self.left = left
+        self.right = right
+        self.op = op
+
+    def _sexpr_parts(self):
+        yield f'({self.op} '
+        yield self.left
+        yield ' '
+        yield self.right
+        yield ')'
+
+    def _internal_resolve_type(self, function):
+        left_type = yield self.left
+        right_type = yield self.right
+        assert left_type == right_type, f"Mismatching types (`{left_type}` and `{right_type}`)"
+
+        # This is part of assignment?
+        if self.op.endswith('='):
+
+            # relational and equality
+            if len(self.op) == 2 and self.op[0] in ['>', '<', '=', '!']:
+                return VBool()
+
+            # Assignment expression
+            else:
+                assert left_type.__class__ in ExprBinary.TYPE_TABLE[self.op[-1]], f'Invalid type `{left_type}` for operator `{self.op[-1]}`'
+                return left_type
+
+        # Normal operators
+        else:
+            assert left_type.__class__ in ExprBinary.TYPE_TABLE[
+                self.op[-1]], f'Invalid type `{left_type}` for operator `{self.op}`'
+            return left_type
+
+
+class ExprUnary(Expr):
+
+    __slots__ = ('right', 'op')
+
+    def __init__(self, op: str, right: Expr):
+        super(ExprUnary, self).__init__()
+        self.right = right
+        self.op = op
+
+    def _sexpr_parts(self):
+        if self.op == '&':
+            yield '(ref '
+        elif self.op == '*':
+            yield '(deref '
+        else:
+            yield f'(prefix {self.op} '
+        yield self.right
+        yield ')'
+
+    def _internal_resolve_type(self, function):
+        xtype = yield self.right
+
+        if self.op == '*':
+            assert isinstance(xtype, VPointerType), f"Tried to dereference a none pointer (`{xtype}`)"
+            return xtype.type
+
+        elif self.op == '&':
+            # TODO: check that it is possible to ref the expression
+            return VPointerType(xtype)
+
+        elif self.op == '!':
+            assert isinstance(xtype, VBool), f'Invalid type `{xtype}` for operator `{self.op}`'
+            return xtype
+
+        elif self.op == '~':
+            assert isinstance(xtype, VIntegerType), f'Invalid type `{xtype}` for operator `{self.op}`'
+            return xtype
+
+        else:
+            assert isinstance(xtype, VIntegerType) or isinstance(xtype, VFloatType), f'Invalid type `{xtype}` for operator `{self.op}`'
+            return xtype
+
+
+class ExprImplicitEnum(Expr):
+
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        super(ExprImplicitEnum, self).__init__()
+        self.name = name
+
+    def _sexpr_parts(self):
+        yield f'(implicit {self.name})'
+
+    def _internal_resolve_type(self, function):
+        # TODO: use the type expected where this is used, for now the field has to be in a single enum
+        enums = function.get_module().get_enums(self.name)
+        assert len(enums) != 0, f'Unknown enum field `{self.name}`'
+        assert len(enums) == 1, f'Ambiguous enum field `{self.name}` (in {", ".join(e.name for e in enums)})'
+        return enums[0]
+
+
+class ExprIn(Expr):
+
+    __slots__ = ('left', 'right')
+
+    def __init__(self, left: Expr, right: Expr):
+        super(ExprIn, self).__init__()
+        self.left = left
+        self.right = right
+
+    def _sexpr_parts(self):
+        yield '(in '
+        yield self.left
+        yield ' '
+        yield self.right
+        yield ')'
+
+    def _internal_resolve_type(self, function):
+        left_type = yield self.left
+        right_type = yield self.left
+
+        if isinstance(right_type, VMapType):
+            assert left_type == right_type.key_type, f"Type mismatch, expected {right_type.key_type}, got {left_type}"
+
+        elif isinstance(right_type, VArrayType):
+            assert left_type == VIntegerType(32, True), f"Type mismatch, expected {right_type.type}, got {left_type}"
+
+        return VBool()
+
+
+class ExprPostfix(Expr):
+
+    __slots__ = ('op', 'left')
+
+    def __init__(self, left: Expr, op: str):
+        super(ExprPostfix, self).__init__()
+        self.op = op
+        self.left = left
+
+    def _sexpr_parts(self):
+        yield '(postfix '
+        yield self.left
+        yield f' {self.op})'
+
+    def _internal_resolve_type(self, function):
+        xtype = yield self.left
+        assert isinstance(xtype, VIntegerType), f'Invalid type `{xtype}` for operator `{self.op}`'
+        return xtype
+
+
+class ExprIf(Expr):
+
+    __slots__ = ('condition', 'block_true', 'block_false')
+
+    def __init__(self, condition: Expr, block_true: StmtBlock, block_false: StmtBlock):
+        super(ExprIf, self).__init__()
+        self.condition = condition
+        self.block_true = block_true
+        self.block_false = block_false
+
+    def _sexpr_parts(self):
+        yield '(if '
+        yield self.condition
+        yield _INDENT
+        yield '\n'
+        yield self.block_true
+        yield '\nelse\n'
+        yield self.block_false
+        yield _DEDENT
+        yield ')'
+
+    def _internal_resolve_type(self, function):
+        yield self.block_true
+        yield self.block_false
+
+        assert len(self.block_true.stmts) != 0 and isinstance(self.block_true.stmts[-1], StmtExpr), f'Last statement of an if expression must be an expression!'
+        assert len(self.block_false.stmts) != 0 and isinstance(self.block_false.stmts[-1], StmtExpr), f'Last statement of an if expression must be an expression!'
+
+        true_type = yield self.block_true[-1].expr
+        false_type = yield self.block_true[-1].expr
+        assert true_type == false_type, f'Type mismatch between blocks (got {true_type} and {false_type})'
+
+        return true_type
+
+
+class ExprOr(Expr):
+
+    __slots__ = ('expr', 'block_error')
+
+    def __init__(self, expr: Expr, block_error: StmtBlock):
+        super(ExprOr, self).__init__()
+        self.expr = expr
+        self.block_error = block_error
+
+    def _sexpr_parts(self):
+        yield '(or '
+        yield self.expr
+        yield _INDENT
+        yield '\n'
+        yield self.block_error
+        yield _DEDENT
+        yield ')'
+
+    def _internal_resolve_type(self, function):
+        xtype = yield self.expr
+        assert isinstance(xtype, VOptionalType), f'expected an optional type, got `{xtype}`'
+
+        # Make sure the block never exits the block
+        # TODO: add check for the panic function (or just add a noreturn attribute?)
+        yield self.block_error
+        assert len(self.block_error.stmts) != 0, f'or block must return!'
+        stmt = self.block_error.stmts[-1]
+        assert isinstance(stmt, StmtReturn), f'or block must return!'
+
+        # Return the underlying type
+        return xtype.type
+
+
+class ExprMemberAccess(Expr):
+
+    __slots__ = ('value', 'member')
+
+    def __init__(self, value: Expr, member: str):
+        super(ExprMemberAccess, self).__init__()
+        self.value = value
+        self.member = member
+
+    def _sexpr_parts(self):
+        yield '(member '
+        yield self.value
+        yield f' {self.member})'
+
+    def _internal_resolve_type(self, function):
+        value_type = yield self.value
+
+        # Methods
+        method = function.get_module().get_method(value_type, self.member)
+        if method is not None:
+            return method
+
+        # Enum members
+        if isinstance(value_type, EnumDecl):
+            assert self.member in value_type.values, f'Unknown enum field `{self.member}`'
+
+            # TODO: check pub access
+
+            return value_type
+
+        # Struct members
+        elif isinstance(value_type, StructDecl):
+            # TODO: access checks
+            elem = value_type.fields.get(self.member)
+            assert elem is not None, f"Unknown struct field `{self.member}`"
+            return elem.type
+
+        # Array type, these are hardcoded
+        elif isinstance(value_type, VArrayType):
+            if self.member == 'data':
+                # TODO: voidptr
+                assert False
+
+            elif self.member == 'len':
+                return VIntegerType(32, True)
+
+            elif self.member == 'cap':
+                return VIntegerType(32, True)
+
+            elif self.member == 'element_size':
+                return VIntegerType(32, True)
+
+            else:
+                assert False, f'Unknown array field `{self.member}`'
+
+        # Map type, these are hardcoded
+        elif isinstance(value_type, VMapType):
+            if self.member == 'size':
+                return VIntegerType(32, True)
+
+            else:
+                assert False, f'Unknown map field `{self.member}`'
+
+        # TODO: string type
+
+        # Interops (should be)
+        elif isinstance(value_type, dict):
+            if self.member in value_type:
+                return value_type[self.member]
+            else:
+                assert False, f'Unknown interop function `{self.member}`'
+
+        # Did not find anything
+        assert False, f'Type `{value_type}` has no members!'
+
+
+class ExprIndexAccess(Expr):
+
+    __slots__ = ('value', 'index')
+
+    def __init__(self, value: Expr, index: Expr):
+        super(ExprIndexAccess, self).__init__()
+        self.value = value
+        self.index = index
+
+    def _sexpr_parts(self):
+        yield '(index '
+        yield self.value
+        yield ' '
+        yield self.index
+        yield ')'
+
+    def _internal_resolve_type(self, function):
+        value_type = yield self.value
+        index_type = yield self.index
+
+        if isinstance(value_type, VArrayType):
+            assert index_type == VIntegerType(32, True), f'Type mismatch, expected `int`, got `{index_type}`'
+            return value_type.type
+
+        elif isinstance(value_type, VMapType):
+            assert index_type == value_type.key_type, f"Type mistmatch, expected `{value_type.key_type}`, got `{index_type}`"
+            return value_type.value_type
+
+        else:
+            assert False, f"type `{value_type}` is not index-able"
+
+
+class ExprCall(Expr):
+
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func: Expr, args: List[Expr]):
+        super(ExprCall, self).__init__()
+        self.func = func
+        self.args = args
+
+    def _sexpr_parts(self):
+        yield '(call '
+        yield self.func
+        yield ' ('
+        for i, arg in enumerate(self.args):
+            if i != 0:
+                yield ' '
+            yield arg
+        yield '))'
+
+    def _internal_resolve_type(self, function):
+        func_type = yield self.func
+
+        assert isinstance(func_type, FuncDecl), f'Not a function!'
+        assert len(func_type.args) == len(self.args), f'Function expected {len(func_type.args)} arguments, got {len(self.args)}'
+
+        for i in range(len(func_type.args)):
+            expect_arg_type = func_type.args[i].type
+            arg_type = yield self.args[i]
+            assert arg_type == arg_type, f'Type mismatch, expected `{func_type.args[i]}`, got `{arg_type}`'
+
+        # The return type is resolved where the function is declared
+        return func_type.get_module().resolve_type(func_type.ret_type)
+
+###################################################################################################################
+# Declarations
+###################################################################################################################
+
+
+class FuncParam:
+
+    __slots__ = ('mut', 'name', 'type')
+
+    def __init__(self, mut: bool, name: str, xtype: VType):
+        self.mut = mut
+        self.name = name
+        self.type = xtype
+
+    def __str__(self):
+        mut = 'mut ' if self.mut else ''
+        return f'({mut}{self.name} {self.type})'
+
+
+class FuncDecl:
+
+    __slots__ = ('module', 'pub', 'interop', 'name', 'method', 'args', 'ret_type', 'frame', 'locals', 'scope',
+                 '_block', 'parse_body')
+
+    def __init__(self, pub: bool, interop: bool, name: str, method: FuncParam, args: List[FuncParam], ret_value: VType):
+        self.module = None  # type: Module
+        self.pub = pub
+        self.interop = interop
+        self.name = name
+        self.method = method
+        self.args = args
+        self.ret_type = ret_value
+        self.frame = []  # type: List[StmtBlock]
+
+        # Every parameter and local variable gets a slot, the receiver and the parameters come first. The scope
+        # has the slots of the variables which can be seen from the block being type checked
+        self.locals = []  # type: List[Tuple[VType, bool]]
+        self.scope = {}  # type: Dict[str, int]
+
+        # The body, when the function was skimmed it is only parsed once it is first needed
+        self._block = None  # type: StmtBlock or None
+        self.parse_body = None  # type: Callable[[], StmtBlock] or None
+
+    @property
+    def block(self):
+        # Only forget how to parse the body once it was parsed, so a body which failed
+        # to parse raises again on the next access instead of looking empty
+        if self.parse_body is not None:
+            self._block = self.parse_body()
+            self.parse_body = None
+        return self._block
+
+    @block.setter
+    def block(self, block):
+        self._block = block
+        self.parse_body = None
+
+    def __str__(self):
+        return _sexpr(self)
+
+    def _sexpr_parts(self):
+        pub = 'pub ' if self.pub else ''
+        ret_val = '' if self.ret_type is None else str(self.ret_type)
+        name = ('C.' if self.interop else '') + self.name
+        method = str(self.method) + ' ' if self.method is not None else ''
+        yield f'(func {pub}{name} {method}({" ".join(map(str, self.args))}) {ret_val}'
+        if self.block is not None:
+            yield _INDENT
+            yield '\n'
+            yield self.block
+            yield _DEDENT
+        yield ')'
+
+    def type_checking(self):
+        module = self.get_module()
+        params = self.args if self.method is None else [self.method] + self.args
+        self.locals = [(module.resolve_type(param.type), param.mut) for param in params]
+        self.scope = {param.name: slot for slot, param in enumerate(params)}
+        if self.block is not None:
+            self.block.type_checking(self)
+
+    def get_module(self):
+        assert self.module is not None
+        return self.module
+
+    def push_frame(self, block):
+        self.frame.append(block)
+
+    def pop_frame(self):
+        # The variables of the block go out of scope with it
+        block = self.frame.pop()
+        for name in block.vars:
+            self.scope.pop(name, None)
+
+    def add_var(self, block: StmtBlock, name: str, type: VType, mut: bool) -> int:
+        """
+        Declare a variable in a block of the function, giving it the next slot
+        """
+        assert name not in self.scope and self.module.get_var(name) is None, f"variable {name} already exists in scope"
+        slot = self.scope[name] = len(self.locals)
+        self.locals.append((type, mut))
+        block.vars[name] = type, mut
+        return slot
+
+    def get_slot(self, name) -> int or None:
+        return self.scope.get(name)
+
+    def get_var(self, name):
+        # Check for the parameters and the variables in scope first
+        slot = self.scope.get(name)
+        if slot is not None:
+            return self.locals[slot]
+
+        # Lastly check from the module
+        return self.module.get_var(name)
+
+
+class StructMemberAccess(Enum):
+    PRIVATE = 'private'
+    PRIVATE_MUT = 'private mut'
+    PUBLIC = 'public'
+    PUBLIC_PRIV_MUT = 'public, private mut'
+    PUBLIC_MUT = 'public mut'
+
+
+class StructElement:
+
+    __slots__ = ('access', 'name', 'type')
+
+    def __init__(self, access: StructMemberAccess, name: str, xtype: VType):
+        self.access = access
+        self.name = name
+        self.type = xtype
+
+    def __str__(self):
+        return f'({self.access.value} {self.name} {self.type})'
+
+
+class StructDecl:
+
+    __slots__ = ('module', 'pub', 'attribute', 'name', 'base', 'elements', 'fields')
+
+    def __init__(self, pub: bool, attribute: dict, name: str, base: StructElement or None, elements: List[StructElement]):
+        self.module = None  # type: Module
+        self.pub = pub
+        self.attribute = attribute
+        self.name = name
+        self.base = base
+        self.elements = elements
+
+        # The elements by their name
+        self.fields = {}  # type: Dict[str, StructElement]
+        for elem in elements:
+            assert elem.name not in self.fields, f'duplicate field `{elem.name}` in struct `{name}`'
+            self.fields[elem.name] = elem
+
+    def __str__(self):
+        pub = 'pub ' if self.pub else ''
+
+        s = f'(struct {pub}{self.name}\n'
+
+        if self.base is not None:
+            s += '  ' + str(self.base) + '\n'
+
+        for elem in self.elements:
+            s += '  ' + str(elem) + '\n'
+
+        s = s[:-1]
+        s += ')'
+        return s
+
+
+class ModuleDecl:
+
+    __slots__ = ('module', 'name')
+
+    def __init__(self, name: str):
+        self.module = None  # type: Module
+        self.name = name
+
+    def __str__(self):
+        return f'(module {self.name})'
+
+
+class ImportDecl:
+
+    __slots__ = ('module', 'name')
+
+    def __init__(self, name: str):
+        self.module = None  # type: Module
+        self.name = name
+
+    def __str__(self):
+        return f'(import {self.name})'
+
+
+class EnumDecl:
+
+    __slots__ = ('module', 'pub', 'name', 'elements', 'values')
+
+    def __init__(self, pub: bool, name: str, elements: List[str]):
+        self.module = None  # type: Module
+        self.pub = pub
+        self.name = name
+        self.elements = elements
+
+        # The value of every element, by its name
+        self.values = {}  # type: Dict[str, int]
+        for elem in elements:
+            assert elem not in self.values, f'duplicate field `{elem}` in enum `{name}`'
+            self.values[elem] = len(self.values)
+
+    def __str__(self):
+        pub = 'pub ' if self.pub else ''
+        s = f'(enum {pub}{self.name}\n'
+        for elem, i in self.values.items():
+            s += f'  ({i} {elem})\n'
+        s = s[:-1]
+        s += ')'
+        return s
+
+
+class ConstDecl:
+
+    __slots__ = ('module', 'pub', 'name', 'value')
+
+    def __init__(self, pub: bool, name: str, value: Expr):
+        self.module = None  # type: Module
+        self.pub = pub
+        self.name = name
+        self.value = value
+
+    def __str__(self):
+        return _sexpr(self)
+
+    def _sexpr_parts(self):
+        pub = 'pub ' if self.pub else ''
+        yield f'(const {pub}{self.name} '
+        yield self.value
+        yield ')'
+
+    def type_checking(self):
+        self.value.resolve_type(self.module)
+
+    def get_type(self, function):
+        return self.value.resolve_type(function)
+
+
+class TypeDecl:
+
+    __slots__ = ('module', 'pub', 'name', 'type')
+
+    def __init__(self, pub: bool, name: str, xtype: VType):
+        self.module = None  # type: Module
+        self.pub = pub
+        self.name = name
+        self.type = xtype
+
+    def __str__(self):
+        pub = 'pub ' if self.pub else ''
+        return f'(type {pub}{self.name} {self.type})'
+
+    def type_checking(self):
+        pass
+
+
+class Module:
+    """
+    The declarations of a module are kept in separate namespaces, which are merged into a single symbol
+    table the first time a name is looked up after they changed
+    """
+
+    __slots__ = ('workspace', 'name', 'builtin', 'interop', 'imports', 'decls', 'methods', 'order', '_symbols',
+                 '_enums', '_method_table', 'lookups', '_resolved')
+
+    def __init__(self):
+        self.workspace = None  # type: Workspace
+        self.name = 'main'
+
+        # The builtin module, the interop functions (the `C.` ones), the imported modules and the
+        # declarations of the module itself
+        self.builtin = None  # type: Module or None
+        self.interop = {}  # type: Dict[str, FuncDecl]
+        self.imports = {}  # type: Dict[str, Module]
+        self.decls = {}
+
+        # The methods by the type of their receiver as it is written and their name
+        self.methods = {}  # type: Dict[Tuple[VType, str], FuncDecl]
+
+        # The declarations of the module and its methods in the order they were added in, by their id
+        self.order = {}  # type: Dict[int, object]
+
+        # All of the namespaces merged, the enums of the module by the names of their members and the
+        # methods by the resolved type of their receiver (see receiver_type), None when they have to be
+        # built again
+        self._symbols = None  # type: Dict[str, object] or None
+        self._enums = None  # type: Dict[str, List[EnumDecl]] or None
+        self._method_table = None  # type: Dict[Tuple[object, str], FuncDecl] or None
+
+        # How many names were looked up in the module
+        self.lookups = 0
+
+        # What every type resolved to, cleared along with the symbols
+        self._resolved = {}  # type: Dict[VType, object]
+
+    @property
+    def symbols(self) -> Mapping[str, object]:
+        """
+        Every name which can be used in the module and what it refers to, builtins come first, then the
+        interop namespace (`C`), the imports and the declarations of the module
+        """
+        if self._symbols is None:
+            self._build_symbols()
+        return MappingProxyType(self._symbols)
+
+    def _build_symbols(self):
+        symbols = {}
+        symbols.update(self.decls)
+        symbols.update(self.imports)
+        symbols['C'] = self.interop
+        if self.builtin is not None:
+            symbols['builtin'] = self.builtin
+            symbols.update(self.builtin.decls)
+
+        enums = {}
+        for decl in self.decls.values():
+            if isinstance(decl, EnumDecl):
+                for member in decl.values:
+                    enums.setdefault(member, []).append(decl)
+
+        self._symbols = symbols
+        self._enums = enums
+
+        # Resolving the receivers needs the symbols, a receiver written in two ways which resolve
+        # to the same type keeps the method which was added first
+        method_table = {}
+        for (receiver, name), method in self.methods.items():
+            method_table.setdefault((self.receiver_type(receiver), name), method)
+
+        # Methods on a pointer can be called on the value and the other way around, unless the other
+        # one has a method of its own by that name: a lookup on &T falls back to the methods of T, and
+        # one on a value T to the methods of &T
+        for (receiver, name), method in list(method_table.items()):
+            method_table.setdefault((VPointerType(receiver), name), method)
+            if isinstance(receiver, VPointerType) and not isinstance(receiver.type, VPointerType):
+                method_table.setdefault((receiver.type, name), method)
+        self._method_table = method_table
+
+        return symbols
+
+    def add(self, val):
+        # Make sure not in builtin already
+        assert self.builtin is None or self.builtin.get_var(val.name) is None, \
+            f'duplicate name `{val.name}` in module `{self.name}`'
+        self._symbols = None
+        self._enums = None
+        self._method_table = None
+        self._resolved = {}
+
+        # Add the module as long as this is not an import
+        if not isinstance(val, Module):
+            val.module = self
+
+        # The declarations of the module itself, they are dumped in this order
+        if not isinstance(val, Module) and not isinstance(val, ImportDecl) and not isinstance(val, ModuleDecl):
+            self.order[id(val)] = val
+
+        # Handle interop functions properly
+        if isinstance(val, FuncDecl):
+            if val.method is not None:
+                key = val.method.type, val.name
+                assert key not in self.methods, f'duplicate method `{val.name}` of `{key[0]}` in module `{self.name}`'
+                self.methods[key] = val
+            elif val.interop:
+                assert val.name not in self.interop, f'duplicate name `{val.name}` in module `{self.name}`'
+                self.interop[val.name] = val
+            else:
+                assert val.name not in self.decls, f'duplicate name `{val.name}` in module `{self.name}`'
+                self.decls[val.name] = val
+
+        # On import simply load the module from the workspace
+        elif isinstance(val, ImportDecl):
+            self.add(self.workspace.load_module(val.name))
+
+        # The module which was imported
+        elif isinstance(val, Module):
+            self.imports[val.name] = val
+
+        # Handle the module declaration
+        elif isinstance(val, ModuleDecl):
+            assert val.name == self.name, f'module declaration and module path mismatch (`{val.name}` and `{self.name}`)!'
+
+        # everything else we just add as is
+        else:
+            self.decls[val.name] = val
+
+    def remove(self, val):
+        """
+        Undo adding the given declaration
+        """
+        self._symbols = None
+        self._enums = None
+        self._method_table = None
+        self._resolved = {}
+        self.order.pop(id(val), None)
+
+        if isinstance(val, FuncDecl) and val.method is not None:
+            del self.methods[val.method.type, val.name]
+
+        elif isinstance(val, FuncDecl) and val.interop:
+            del self.interop[val.name]
+
+        elif isinstance(val, ImportDecl):
+            del self.imports[val.name.split('.')[-1]]
+
+        elif not isinstance(val, ModuleDecl):
+            del self.decls[val.name]
+
+    def update(self, added: list, removed: list, changed: List[tuple]):
+        """
+        Apply a diff of the declarations, as returned by IncrementalParser.edit
+        """
+        for val in removed:
+            self.remove(val)
+
+        for old, new in changed:
+            self.remove(old)
+            self.add(new)
+
+        for val in added:
+            self.add(val)
+
+    def get_var(self, name):
+        self.lookups += 1
+        symbols = self._symbols
+        if symbols is None:
+            symbols = self._build_symbols()
+        return symbols.get(name)
+
+    def get_enums(self, member: str) -> List[EnumDecl]:
+        """
+        The enums of the module which have a member with the given name
+        """
+        if self._symbols is None:
+            self._build_symbols()
+        return self._enums.get(member, [])
+
+    def receiver_type(self, xtype):
+        """
+        The type methods of the given receiver type are looked up by, the type may be resolved or not. Names
+        are resolved to what they refer to, so structs and enums are their declaration and builtin types the
+        type they stand for, and a name which can't be resolved is kept as it is.
+        """
+        if isinstance(xtype, VUnknownType):
+            resolved = self.resolve_type(xtype)
+            return xtype if resolved is None else resolved
+
+        elif isinstance(xtype, StructDecl) or isinstance(xtype, EnumDecl):
+            return xtype
+
+        elif isinstance(xtype, VArrayType):
+            return VArrayType(self.receiver_type(xtype.type))
+
+        elif isinstance(xtype, VMapType):
+            return VMapType(self.receiver_type(xtype.key_type), self.receiver_type(xtype.value_type))
+
+        elif isinstance(xtype, VPointerType):
+            return VPointerType(self.receiver_type(xtype.type))
+
+        elif isinstance(xtype, VOptionalType):
+            return VOptionalType(self.receiver_type(xtype.type))
+
+        elif isinstance(xtype, VType):
+            return xtype
+
+        # Not something which can have methods
+        return None
+
+    def get_method(self, xtype, name: str):
+        """
+        Find a method of a type, the type may be resolved or not. The methods of a struct or an enum
+        are found in the module which declares it.
+        """
+        receiver = self.receiver_type(xtype)
+        if receiver is None:
+            return None
+
+        decl = receiver.type if isinstance(receiver, VPointerType) else receiver
+        if (isinstance(decl, StructDecl) or isinstance(decl, EnumDecl)) and decl.module is not None and \
+                decl.module is not self:
+            return decl.module.get_method(receiver, name)
+
+        if self._method_table is None:
+            self._build_symbols()
+        method_table = self._method_table
+
+        return method_table.get((receiver, name))
+
+    def resolve_type(self, xtype):
+        """
+        Resolve the names in a type to what they refer to. Types are never changed by this, so what every
+        type resolves to is remembered until the declarations of the module change.
+        """
+        # The interop namespace, its functions are resolved on their own
+        if isinstance(xtype, dict):
+            return xtype
+
+        try:
+            return self._resolved[xtype]
+        except KeyError:
+            pass
+        resolved = self._resolved[xtype] = self._resolve_type(xtype)
+        return resolved
+
+    def _resolve_type(self, xtype):
+        # Unknown type, a builtin type gives its canonical type
+        if isinstance(xtype, VUnknownType):
+            xtype = self.get_var(xtype.name)
+            if isinstance(xtype, TypeDecl):
+                xtype = self.resolve_type(xtype)
+
+        # Array ty[e
+        elif isinstance(xtype, VArrayType):
+            xtype = VArrayType(self.resolve_type(xtype.type))
+
+        # Map type
+        elif isinstance(xtype, VMapType):
+            xtype = VMapType(self.resolve_type(xtype.key_type), self.resolve_type(xtype.value_type))
+
+        # Pointer type
+        elif isinstance(xtype, VPointerType):
+            xtype = VPointerType(self.resolve_type(xtype.type))
+
+        # Optional type
+        elif isinstance(xtype, VOptionalType):
+            xtype = VOptionalType(self.resolve_type(xtype.type))
+
+        # Default types, nothing more to resolve
+        elif isinstance(xtype, VIntegerType) or isinstance(xtype, VFloatType) or isinstance(xtype, VBool):
+            pass
+
+        # Enums and structs are already resovled
+        elif isinstance(xtype, EnumDecl) or isinstance(xtype, StructDecl) or isinstance(xtype, FuncDecl):
+            pass
+
+        elif isinstance(xtype, TypeDecl):
+            xtype = self.resolve_type(xtype.type)
+
+        # No return value
+        elif xtype is None:
+            return None
+
+        else:
+            assert False, xtype
+
+        return xtype
+
+    def get_module(self):
+        return self
+
+    def get_slot(self, name):
+        # A module has no local variables
+        return None
+
+    def type_checking(self, workers: int or None = None, batch_size: int or None = None):
+        """
+        Type check the module, with the given amount of worker processes the function bodies are checked in
+        parallel, in batches of functions (by default every worker gets 4 batches)
+        """
+        structs = []
+        constants = []
+        functions = []
+
+        # add to lists everything we will need to resolve
+        for decl in self.decls.values():
+            if isinstance(decl, StructDecl):
+                structs.append(decl)
+            elif isinstance(decl, ConstDecl):
+                constants.append(decl)
+            elif isinstance(decl, FuncDecl):
+                functions.append(decl)
+        functions += self.methods.values()
+
+        # TODO: Functions should return a func type!
+
+        # Resolve all the constants
+        for const in constants:
+            const.type_checking()
+
+        # finally do type checking on all functions
+        if workers is None:
+            for func in functions:
+                func.type_checking()
+        else:
+            _type_check_parallel(self, functions, workers, batch_size)
+
+    def dump(self, stream: TextIO):
+        """
+        Write all the declarations to a text stream, one after the other
+        """
+        # The declarations of the module and its methods are in the order they were added in, the
+        # interop functions are in the interop namespace
+        decls = [decl for decl in self.order.values() if not isinstance(decl, FuncDecl) or not decl.interop]
+        namespaces = list(self.imports.values()) + decls
+        if self.builtin is not None:
+            namespaces[:0] = [self.builtin, self.interop]
+
+        for i, decl in enumerate(namespaces):
+            if i != 0:
+                stream.write('\n')
+            if isinstance(decl, Module):
+                decl.dump(stream)
+            elif hasattr(decl, '_sexpr_parts'):
+                write_sexpr(decl, stream)
+            else:
+                stream.write(str(decl))
+
+    def __str__(self):
+        out = StringIO()
+        self.dump(out)
+        return out.getvalue()
+
+
+###################################################################################################################
+# Parallel type checking
+#
+# Once the constants are resolved function bodies can be checked independently of each other. Every worker gets
+# the module once, when the workers are forked they already have it and nothing is sent at all, and then ranges
+# of the functions to check. What the checking found is sent back instead of the bodies themselves, as ints which
+# index a table of the types and names which were found, and applied to the bodies in the order of the functions.
+#
+# Both the worker and the main process number the declarations of the modules the same way, so when the table
+# refers to a declaration (a struct type for example) only its number is sent.
+#
+# Workers which are not forked have to load the declarations of the modules first, which takes longer than checking
+# the bodies does, so checking in parallel is only faster where the workers are forked.
+###################################################################################################################
+
+
+def _references(module: Module) -> List[object]:
+    # The objects which are sent by number: the modules, their namespaces and their declarations
+    refs = []
+    modules = [module]
+    seen = set()
+    while len(modules) != 0:
+        mod = modules.pop(0)
+        if id(mod) in seen:
+            continue
+        seen.add(id(mod))
+
+        refs += [mod, mod.interop]
+        refs += mod.decls.values()
+        refs += mod.interop.values()
+        refs += mod.methods.values()
+
+        if mod.builtin is not None:
+            modules.append(mod.builtin)
+        modules += mod.imports.values()
+        modules += [decl for decl in mod.decls.values() if isinstance(decl, Module)]
+    return refs
+
+
+class _Pickler(pickle.Pickler):
+
+    def __init__(self, file, refs: List[object]):
+        super(_Pickler, self).__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.refs = {id(obj): index for index, obj in enumerate(refs)}
+
+    def persistent_id(self, obj):
+        index = self.refs.get(id(obj))
+        if index is not None:
+            return index
+
+        # The workers have no use for the workspace, or for functions which would parse bodies
+        if isinstance(obj, Workspace) or isinstance(obj, FunctionType):
+            return 'strip'
+
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+
+    def __init__(self, file, refs: List[object]):
+        super(_Unpickler, self).__init__(file)
+        self.refs = refs
+
+    def persistent_load(self, pid):
+        if pid == 'strip':
+            return None
+        return self.refs[pid]
+
+
+def _dumps(obj, refs: List[object]) -> bytes:
+    out = BytesIO()
+    _Pickler(out, refs).dump(obj)
+    return out.getvalue()
+
+
+def _loads(data: bytes, refs: List[object]):
+    return _Unpickler(BytesIO(data), refs).load()
+
+
+class _Context:
+    """
+    The module and its functions, as the workers get it
+    """
+
+    def __init__(self, module: Module, functions: List[FuncDecl]):
+        self.module = module
+        self.functions = functions
+        self.reduced = None
+
+    def __reduce__(self):
+        # Only pickled when the workers are not forked, which happens once for every worker, so the declarations
+        # are only converted the first time. Pickling the declarations would recurse as deep as the bodies nest,
+        # so every module is sent as an arena of its declarations instead, which the worker adds to a new module
+        # in the same order, and the functions as their index in the declarations
+        if self.reduced is None:
+            self.reduced = self._reduce()
+        return self.reduced
+
+    def _reduce(self):
+        from vork.arena import dump_decls
+
+        modules = _modules(self.module)
+        numbers = {id(mod): number for number, mod in enumerate(modules)}
+        sent = []
+        for mod in modules:
+            stream = BytesIO()
+            dump_decls(list(mod.order.values()), stream, mod)
+            builtin = -1 if mod.builtin is None else numbers[id(mod.builtin)]
+            imports = [numbers[id(imported)] for imported in mod.imports.values()]
+            sent.append((mod.name, builtin, imports, stream.getvalue()))
+
+        positions = {id(decl): position for position, decl in enumerate(self.module.order.values())}
+        return _load_context, (sent, [positions[id(func)] for func in self.functions])
+
+
+def _modules(module: Module) -> List[Module]:
+    # The module and every module it uses, a module comes after the ones it uses so what its declarations
+    # refer to is there once they are loaded
+    modules = []
+    seen = set()
+    stack = [(module, False)]
+    while len(stack) != 0:
+        mod, leaving = stack.pop()
+        if leaving:
+            modules.append(mod)
+            continue
+        if id(mod) in seen:
+            continue
+        seen.add(id(mod))
+
+        stack.append((mod, True))
+        stack += [(imported, False) for imported in reversed(list(mod.imports.values()))]
+        if mod.builtin is not None:
+            stack.append((mod.builtin, False))
+    return modules
+
+
+def _load_context(sent: list, functions: List[int]) -> _Context:
+    from vork.arena import load_decls
+
+    # Link the modules first, the imports are added before the declarations like they are when loading
+    modules = [Module() for _ in sent]
+    for module, (name, builtin, imports, data) in zip(modules, sent):
+        module.name = name
+        module.builtin = None if builtin == -1 else modules[builtin]
+        for number in imports:
+            module.add(modules[number])
+
+    for module, (name, builtin, imports, data) in zip(modules, sent):
+        for decl in load_decls(BytesIO(data), module):
+            module.add(decl)
+
+    module = modules[-1]
+    decls = list(module.order.values())
+    return _Context(module, [decls[position] for position in functions])
+
+
+def _annotated_nodes(block: StmtBlock) -> list:
+    from vork.arena import CHILD_FIELDS
+
+    # Both sides walk the bodies the same way, so the annotations line up with the nodes
+    nodes = []
+    stack = [block]
+    while len(stack) != 0:
+        node = stack.pop()
+        if isinstance(node, Expr) or isinstance(node, StmtBlock):
+            nodes.append(node)
+        for name, many in CHILD_FIELDS[type(node)]:
+            value = getattr(node, name)
+            if value is None:
+                continue
+            if many:
+                stack += value
+            else:
+                stack.append(value)
+    return nodes
+
+
+# The context of the worker process, and its references
+_worker = None  # type: Tuple[_Context, List[object]] or None
+
+
+def _init_worker(context: _Context):
+    global _worker
+    _worker = context, _references(context.module)
+
+
+def _check_batch(start: int, end: int) -> bytes:
+    context, refs = _worker
+
+    # The types and names which were found, which are referred to by their index in the table
+    table = []
+    indices = {}
+
+    def index(value) -> int:
+        if value is None:
+            return -1
+        i = indices.get(id(value))
+        if i is None:
+            i = indices[id(value)] = len(table)
+            table.append(value)
+        return i
+
+    # For every function the slots of its locals, and then what was found for every node of its body
+    annotations = []
+    add = annotations.append
+    errors = {}
+    for position in range(start, min(end, len(context.functions))):
+        func = context.functions[position]
+        if func.block is None:
+            continue
+
+        try:
+            func.type_checking()
+        except Exception as e:
+            errors[position] = e
+            break
+
+        add(len(func.locals))
+        for xtype, mut in func.locals:
+            add(index(xtype))
+            add(mut)
+
+        for node in _annotated_nodes(func.block):
+            if isinstance(node, StmtBlock):
+                add(len(node.vars))
+                for name, (xtype, mut) in node.vars.items():
+                    add(index(name))
+                    add(index(xtype))
+                    add(mut)
+            else:
+                add(index(node.type))
+                if isinstance(node, ExprIdentifierLiteral):
+                    add(-1 if node.slot is None else node.slot)
+
+    return _dumps((table, array('i', annotations), errors), refs)
+
+
+def _type_check_parallel(module: Module, functions: List[FuncDecl], workers: int, batch_size: int or None):
+    if batch_size is None:
+        batch_size = max(1, -(-len(functions) // (workers * 4)))
+
+    # Parse skimmed bodies now, so the workers do not parse them again
+    for func in functions:
+        func.block
+
+    refs = _references(module)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(_Context(module, functions),)) as executor:
+        batches = []
+        for start in range(0, len(functions), batch_size):
+            batches.append((start, executor.submit(_check_batch, start, start + batch_size)))
+
+        # Walk the bodies while the workers check them
+        nodes = [None if func.block is None else _annotated_nodes(func.block) for func in functions]
+
+        # Apply the results in order, so the first error is the one checking them one by one would give
+        for start, future in batches:
+            table, annotations, errors = _loads(future.result(), refs)
+            # So the index -1 gives None
+            table.append(None)
+
+            i = 0
+            for position in range(start, min(start + batch_size, len(functions))):
+                func = functions[position]
+                if func.block is None:
+                    continue
+                if position in errors:
+                    raise errors[position]
+
+                count = annotations[i]
+                func.locals = [(table[annotations[j]], annotations[j + 1] != 0) for j in range(i + 1, i + 1 + count * 2, 2)]
+                i += 1 + count * 2
+
+                for node in nodes[position]:
+                    if isinstance(node, StmtBlock):
+                        count = annotations[i]
+                        node.vars = {table[annotations[j]]: (table[annotations[j + 1]], annotations[j + 2] != 0)
+                                     for j in range(i + 1, i + 1 + count * 3, 3)}
+                        i += 1 + count * 3
+                    else:
+                        node.type = table[annotations[i]]
+                        i += 1
+                        if isinstance(node, ExprIdentifierLiteral):
+                            node.slot = None if annotations[i] == -1 else annotations[i]
+                            i += 1
+
+                # Checking a function leaves only its parameters in scope
+                params = func.args if func.method is None else [func.method] + func.args
+                func.scope = {param.name: slot for slot, param in enumerate(params)}
+
+
+BOLD = '\033[01m'
+RESET = '\033[0m'
+GREEN = '\033[32m'
+RED = '\033[31m'
+
+
+def _print_syntax_error(tokenizer, file: str, pos, msg: str):
+    """
+    :type tokenizer: vork.tokenizer.Tokenizer
+    :type pos: vork.tokenizer.CodePosition
+    """
+    print(f'{BOLD}{file}:{pos.start_line + 1}:{pos.start_column + 1}:{RESET} {RED}{BOLD}syntax error:{RESET} {msg}')
+
+    source_line = tokenizer.get_line(pos.start_line)
+    line = source_line
+    line = line[:pos.start_column] + BOLD + line[
+                                            pos.start_column:pos.end_column] + RESET + line[
+                                                                                       pos.end_column:]
+    print(line)
+
+    c = ''
+    for i in range(pos.start_column):
+        if source_line[i] == '\t':
+            c += '\t'
+        else:
+            c += ' '
+
+    print(c + BOLD + RED + '^' + '~' * (pos.end_column - pos.start_column - 1) + RESET)
+    print()
+
+
+def load_from_path(module: Module, path: str):
+    if os.path.exists(path):
+        for file in os.listdir(path):
+            if os.path.isfile(file) and file.endswith('.v'):
+                # we do the imports here to avoid recursive imports
+                from vork.parser import Parser
+                from vork.tokenizer import Tokenizer
+                with open(file, 'r') as f:
+                    tokenizer = Tokenizer(f)
+                    parser = Parser(tokenizer, recover=True)
+
+                    try:
+                        # Parse it, reporting all the syntax errors in it
+                        ast = parser.parse()
+                        error = None
+                    except Exception as e:
+                        # Errors we can't recover from, like malformed numbers
+                        ast = None
+                        error = e
+
+                    for diagnostic in parser.diagnostics:
+                        _print_syntax_error(tokenizer, file, diagnostic.pos, diagnostic.message)
+
+                    # The errors found before it are still reported
+                    if error is not None:
+                        msg = ", ".join(map(str, error.args))
+                        if msg == '':
+                            msg = 'Unexpected token'
+                        _print_syntax_error(tokenizer, file, tokenizer.get_position(tokenizer.token), msg)
+                        continue
+
+                    # Only add everything to the module if the file is correct
+                    if len(parser.diagnostics) == 0:
+                        for a in ast:
+                            module.add(a)
+
+
+class Workspace:
+
+    def __init__(self, dirs: List[str], workers: int or None = None):
+        """
+        :param dirs: The directories modules are searched in
+        :param workers: The amount of worker processes the modules are type checked with, see Module.type_checking
+        """
+        self.modules = {}  # type: Dict[str, Module]
+        self.dirs = dirs
+        self.workers = workers
+
+        # Create the builtin module
+        self.builtin = Module()
+        self.builtin.name = 'builtin'
+
+        # Add integer types
+        self.builtin.add(TypeDecl(True, 'byte', VIntegerType(8, False)))
+        self.builtin.add(TypeDecl(True, 'u16', VIntegerType(16, False)))
+        self.builtin.add(TypeDecl(True, 'u32', VIntegerType(32, False)))
+        self.builtin.add(TypeDecl(True, 'u64', VIntegerType(64, False)))
+        self.builtin.add(TypeDecl(True, 'u128', VIntegerType(128, False)))
+        self.builtin.add(TypeDecl(True, 'i8', VIntegerType(8, True)))
+        self.builtin.add(TypeDecl(True, 'i16', VIntegerType(16, True)))
+        self.builtin.add(TypeDecl(True, 'int', VIntegerType(32, True)))
+        self.builtin.add(TypeDecl(True, 'i64', VIntegerType(64, True)))
+        self.builtin.add(TypeDecl(True, 'i128', VIntegerType(128, True)))
+
+        # Add float types
+        self.builtin.add(TypeDecl(True, 'f32', VFloatType(32)))
+        self.builtin.add(TypeDecl(True, 'f64', VFloatType(64)))
+
+        # Add other types
+        self.builtin.add(TypeDecl(True, 'bool', VBool()))
+
+    def load_main(self, path):
+        if 'main' in self.modules:
+            return self.modules['main']
+        module = Module()
+        module.workspace = self
+        module.builtin = self.builtin
+        module.name = 'main'
+        self.modules['main'] = module
+        load_from_path(self.modules['main'], path)
+        module.type_checking(self.workers)
+
+    def load_module(self, name: str):
+        # first make sure we don't have it already
+        if name in self.modules:
+            return self.modules[name]
+
+        # Create it
+        module = Module()
+        module.workspace = self
+        module.builtin = self.builtin
+        module.name = name.split('.')[-1]
+        self.modules[name] = module
+
+        # search for all the files related to the module
+        module_path = name.replace('.', '/')
+        for path in self.dirs:
+            load_from_path(module, path)
+
+        # Do the type checking
+        module.type_checking(self.workers)
+
+        return module
+
+
+
+
@@ -1,697 +1,1077 @@
-from vork.tokenizer import *
-from vork.ast import *
-
-
-class Parser:
-
-    def __init__(self, tokenizer: Tokenizer):
-        self.t = tokenizer
-        self.t.next_token()
-
-        self.frame = []
-
-    ###################################################################################################################
-    # Expression parsing
-    #
-    # See https://www.tutorialspoint.com/go/go_operators_precedence.htm for the table that I used as reference
-    ###################################################################################################################
-
-    def _parse_literal(self, check_range=True):
-
-        # Integer literal
-        if self.t.is_token(IntToken):
-            val = self.t.token.value
-            self.t.next_token()
-            return ExprIntegerLiteral(val)
-
-        # Float literal
-        elif self.t.is_token(FloatToken):
-            val = self.t.token.value
-            self.t.next_token()
-            return ExprFloatLiteral(val)
-
-        # Identifier
-        elif self.t.is_token(IdentToken):
-            val = self.t.token.value
-            self.t.next_token()
-            return ExprIdentifierLiteral(val)
-
-        # Array literal
-        elif self.t.match_token('['):
-            exprs = []
-            while not self.t.match_token(']'):
-                exprs.append(self.parse_expr())
-            # TODO: I remember there were some array attributes, will need to look it up
-            return ExprArrayLiteral(exprs)
-
-        # Parens
-        elif self.t.match_token('('):
-            expr = self.parse_expr()
-            self.t.expect_token(')')
-            return expr
-
-        else:
-            assert False, f'Unexpected token {self.t.token}'
-
-    def _parse_postfix(self):
-        expr = self._parse_literal()
-
-        # Postfix operators
-        if self.t.is_token('++') or self.t.is_token('--'):
-            pass
-
-        else:
-            # Top level expressions
-            while True:
-                # Member access
-                if self.t.match_token('.'):
-                    assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-                    expr = ExprMemberAccess(expr, self.t.token.value)
-                    self.t.next_token()
-
-                # Function call
-                elif self.t.match_token('('):
-                    args = []
-                    if not self.t.is_token(')'):
-                        args = [self.parse_expr()]
-                        while self.t.match_token(','):
-                            args.append(self.parse_expr())
-                    self.t.expect_token(')')
-                    expr = ExprCall(expr, args)
-
-                # Array access
-                elif self.t.match_token('['):
-                    expr = ExprIndexAccess(expr, self.parse_expr())
-                    self.t.expect_token(']')
-
-                # In expression
-                elif self.t.match_keyword('in'):
-                    expr = ExprIn(expr, self.parse_expr())
-
-                # Nothing more, so we probably done
-                else:
-                    break
-
-        return expr
-
-    # TODO: deref (*), need to figure how to handle the ambiguity with multiplications
-    def _parse_unary(self):
-
-        # this can be done only one time
-        if self.t.is_token('-') or self.t.is_token('--') or self.t.is_token('++') or self.t.is_token('&'):
-            op = self.t.token.value
-            self.t.next_token()
-            expr = ExprUnary(op, self._parse_postfix())
-
-        # These can be done multiple times
-        elif self.t.is_token('!') or self.t.is_token('~') or self.t.is_token('*'):
-            op = self.t.token.value
-            self.t.next_token()
-            expr = ExprUnary(op, self._parse_unary())
-
-        # Implicit enum member access
-        elif self.t.match_token('.'):
-            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-            name = self.t.token.value
-            self.t.next_token()
-            return ExprImplicitEnum(name)
-
-        else:
-            self.t.push()
-            self.t.next_token()
-
-            # Check for ranged array literal
-            # TODO: for now we only allow for literals
-            #       to be used in the ranged array, is
-            #       that what we really want?
-            if self.t.is_token('..'):
-                self.t.pop()
-                expr_from = self._parse_literal()
-                self.t.expect_token('..')
-                expr_to = self._parse_literal()
-                return ExprRange(expr_from, expr_to)
-
-            self.t.pop()
-
-            expr = self._parse_postfix()
-
-        return expr
-
-    def _parse_multiplicative(self):
-        expr = self._parse_unary()
-
-        while self.t.is_token('*') or self.t.is_token('/') or self.t.is_token('%'):
-            op = self.t.token.value
-            self.t.next_token()
-            expr = ExprBinary(expr, op, self._parse_unary())
-
-        return expr
-
-    def _parse_additive(self):
-        expr = self._parse_multiplicative()
-
-        while self.t.is_token('+') or self.t.is_token('-'):
-            op = self.t.token.value
-            self.t.next_token()
-            expr = ExprBinary(expr, op, self._parse_multiplicative())
-
-        return expr
-
-    def _parse_shift(self):
-        expr = self._parse_additive()
-
-        while self.t.is_token('<<') or self.t.is_token('>>'):
-            op = self.t.token.value
-            self.t.next_token()
-            expr = ExprBinary(expr, op, self._parse_additive())
-
-        return expr
-
-    def _parse_relational(self):
-        expr = self._parse_shift()
-
-        while self.t.is_token('<') or self.t.is_token('>') or self.t.is_token('<=') or self.t.is_token('>='):
-            op = self.t.token.value
-            self.t.next_token()
-            expr = ExprBinary(expr, op, self._parse_shift())
-
-        return expr
-
-    def _parse_equality(self):
-        expr = self._parse_relational()
-
-        while self.t.is_token('==') or self.t.is_token('!='):
-            op = self.t.token.value
-            self.t.next_token()
-            expr = ExprBinary(expr, op, self._parse_relational())
-
-        return expr
-
-    def _parse_bitwise_and(self):
-        expr = self._parse_equality()
-
-        while self.t.match_token('&'):
-            expr = ExprBinary(expr, '&', self._parse_equality())
-
-        return expr
-
-    def _parse_bitwise_xor(self):
-        expr = self._parse_bitwise_and()
-
-        while self.t.match_token('^'):
-            expr = ExprBinary(expr, '^', self._parse_bitwise_and())
-
-        return expr
-
-    def _parse_bitwise_or(self):
-        expr = self._parse_bitwise_xor()
-
-        while self.t.match_token('|'):
-            expr = ExprBinary(expr, '|', self._parse_bitwise_xor())
-
-        return expr
-
-    def _parse_logical_and(self):
-        expr = self._parse_bitwise_or()
-
-        while self.t.match_token('&&'):
-            expr = ExprBinary(expr, '&&', self._parse_bitwise_or())
-
-        return expr
-
-    def _parse_logical_or(self):
-        expr = self._parse_logical_and()
-
-        while self.t.match_token('||'):
-            expr = ExprBinary(expr, '||', self._parse_logical_and())
-
-        return expr
-
-    def _parse_conditional(self):
-
-        # If expression
-        if self.t.match_keyword('if'):
-            condition = self.parse_expr()
-            block_true = self.parse_stmt_block()
-
-            assert self.t.match_keyword('else')
-            block_false = self.parse_stmt_block()
-
-            return ExprIf(condition, block_true, block_false)
-        else:
-            expr = self._parse_logical_or()
-
-            # Or expression
-            if self.t.match_keyword('or'):
-                block = self.parse_stmt_block()
-                return ExprOr(expr, block)
-
-            return expr
-
-    def _parse_assignment(self):
-        expr = self._parse_conditional()
-
-        while self.t.is_token('=') or self.t.is_token('+=') or self.t.is_token('-=') or self.t.is_token('*=') or \
-                self.t.is_token('/=') or self.t.is_token('%=') or self.t.is_token('>>=') or self.t.is_token('<<=') or \
-                self.t.is_token('&=') or self.t.is_token('^=') or self.t.is_token('|='):
-            op = self.t.token.value
-            self.t.next_token()
-
-            if isinstance(expr, ExprBinary):
-                expr = ExprBinary(expr.left, expr.op, ExprBinary(expr.right, op, self._parse_conditional()))
-            else:
-                expr = ExprBinary(expr, op, self._parse_conditional())
-
-        return expr
-
-    def parse_expr(self):
-        return self._parse_assignment()
-
-    # def parse_mut_expr(self):
-    #     mut = False
-    #     if self.t.match_keyword('mut'):
-    #         mut = True
-    #     return self.parse_expr(), mut
-
-    ###################################################################################################################
-    # Statement parsing
-    ###################################################################################################################
-
-    def _parse_var_decl(self):
-        # Mutable optional
-        mut = False
-        if self.t.match_keyword('mut'):
-            mut = True
-
-        # Get the names
-        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-        names = [self.t.token.value]
-        self.t.next_token()
-
-        while self.t.match_token(','):
-            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-            names.append(self.t.token.value)
-            self.t.next_token()
-
-        # The :=
-        self.t.expect_token(':=')
-
-        # The assigned expression
-        expr = self.parse_expr()
-
-        return StmtVarDecl(mut, names, expr)
-
-    def parse_stmt(self):
-        # Return statement
-        if self.t.match_keyword('return'):
-            exprs = []
-
-            # Return should always be before an end of block so that tells us we have no arguments
-            if not self.t.is_token('}'):
-                exprs.append(self.parse_expr())
-                while self.t.match_token(','):
-                    exprs.append(self.parse_expr())
-
-            return StmtReturn(exprs)
-
-        # Assert statement
-        elif self.t.match_keyword('assert'):
-            return StmtAssert(self.parse_expr())
-
-        # Parse if
-        elif self.t.match_keyword('if'):
-            condition = self.parse_expr()
-            block_true = self.parse_stmt_block()
-            block_false = None
-
-            # Else part
-            if self.t.match_keyword('else'):
-                # We support `else if` without block before
-                if self.t.is_keyword('if'):
-                    block_false = StmtBlock(self.frame[-1], [self.parse_stmt()])
-
-                # The block
-                else:
-                    block_false = self.parse_stmt_block()
-
-            return StmtIf(condition, block_true, block_false)
-
-        # Block
-        if self.t.is_token('{'):
-            return self.parse_stmt_block()
-
-        # For statement
-        if self.t.match_keyword('for'):
-            # Check if a foreach
-            # will match (for name, name in test) and (for name in test)
-            self.t.push()
-            self.t.next_token()
-            if self.t.is_token(','):
-                self.t.pop()
-
-                assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-                index = self.t.token.value
-                self.t.next_token()
-
-                self.t.expect_token(',')
-
-                assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-                name = self.t.token.value
-                self.t.next_token()
-
-                self.t.expect_keyword('in')
-
-                expr = self.parse_expr()
-                block = self.parse_stmt_block()
-                return StmtForeach(index, name, expr, block)
-
-            elif self.t.is_keyword('in'):
-                self.t.pop()
-
-                assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-                name = self.t.token.value
-                self.t.next_token()
-
-                self.t.expect_keyword('in')
-
-                expr = self.parse_expr()
-                block = self.parse_stmt_block()
-                return StmtForeach(None, name, expr, block)
-
-            self.t.pop()
-
-            # Check a forever loop
-            if self.t.is_token('{'):
-                block = self.parse_stmt_block()
-                return StmtFor(None, None, None, block)
-
-            # This is probably a normal c like loop
-            else:
-                val = None
-                cond = None
-                next = None
-
-                # TODO: support `for condition` loops
-
-                if not self.t.match_token(';'):
-                    # TODO: variable declaration inside this argument
-                    val = self.parse_expr()
-                    self.t.expect_token(';')
-
-                if not self.t.match_token(';'):
-                    cond = self.parse_expr()
-                    self.t.expect_token(';')
-
-                if not self.t.is_token('{'):
-                    next = self.parse_expr()
-
-                block = self.parse_stmt_block()
-                return StmtFor(val, cond, next, block)
-
-        # Unsafe block
-        if self.t.match_keyword('unsafe'):
-            return StmtUnsafe(self.parse_stmt_block())
-
-        # Defer block
-        if self.t.match_keyword('defer'):
-            return StmtDefer(self.parse_stmt_block())
-
-        # Variable declaration
-        if self.t.is_keyword('mut'):
-            return self._parse_var_decl()
-
-        # Might be variable declaration
-        if self.t.is_token(IdentToken):
-            self.t.push()
-            self.t.next_token()
-
-            # This verifies we got a variable declaration (a := ) or (a, b, c := )
-            if self.t.is_token(':=') or self.t.is_token(','):
-                self.t.pop()
-                return self._parse_var_decl()
-            else:
-                self.t.pop()
-
-        # Fallback on expression parsing
-        return StmtExpr(self.parse_expr())
-
-    def parse_stmt_block(self):
-        self.t.expect_token('{')
-        stmts = []
-        block = StmtBlock(self.frame[-1], stmts)
-
-        self.frame.append(block)
-        while not self.t.match_token('}'):
-            stmts.append(self.parse_stmt())
-        self.frame.pop()
-
-        return block
-
-    ###################################################################################################################
-    # Declaration parsing
-    ###################################################################################################################
-
-    def parse_type(self):
-        # Map
-        if self.t.match_keyword('map'):
-            self.t.expect_token('[')
-            key_type = self.parse_type()
-            self.t.expect_token(']')
-            value_type = self.parse_type()
-            return VMapType(key_type, value_type)
-
-        # Array
-        if self.t.match_token('['):
-            self.t.expect_token(']')
-            value_type = self.parse_type()
-            return VArrayType(value_type)
-
-        # Optional type
-        if self.t.match_token('?'):
-            return VOptionalType(self.parse_type())
-
-        # Pointer type
-        if self.t.match_token('&'):
-            return VPointerType(self.parse_type())
-
-        # Basic type
-        # TODO: support types from other modules
-        elif self.t.is_token(IdentToken):
-            t = VUnknownType(self.t.token.value)
-            self.t.next_token()
-            return t
-
-        else:
-            assert False, "Invalid type"
-
-    def _parse_func_param(self):
-        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-        name = self.t.token.value
-        self.t.next_token()
-
-        mut = False
-        if self.t.match_keyword('mut'):
-            mut = True
-
-        xtype = self.parse_type()
-
-        return FuncParam(mut, name, xtype)
-
-    def _parse_func(self, pub):
-
-        # Method (optional)
-        method = None
-        if self.t.match_token('('):
-            method = self._parse_func_param()
-            self.t.expect_token(')')
-
-        # Name
-        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-        name = self.t.token.value
-        self.t.next_token()
-
-        interop = False
-        if self.t.match_token('.'):
-            assert name == 'C'
-            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-            assert not pub, f'Interop functions can not be public!'
-            interop = True
-            name = self.t.token.value
-            self.t.next_token()
-
-        # Parameters
-        self.t.expect_token('(')
-
-        args = []
-
-        # Parse arguments if any
-        if not self.t.is_token(')'):
-            args.append(self._parse_func_param())
-            while self.t.match_token(','):
-                args.append(self._parse_func_param())
-
-        self.t.expect_token(')')
-
-        # the return value
-        ret_type = None
-        if not self.t.is_token('{') and not self.t.is_token(KeywordToken):
-            ret_type = self.parse_type()
-
-        func = FuncDecl(pub, interop, name, method, args, ret_type)
-
-        # The code
-        if not interop:
-            self.frame.append(func)
-            func.block = self.parse_stmt_block()
-            self.frame.pop()
-        else:
-            func.block = None
-
-        return func
-
-    def _parse_struct_element(self, access: StructMemberAccess):
-        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-        name = self.t.token.value
-        self.t.next_token()
-        xtype = self.parse_type()
-        return StructElement(access, name, xtype)
-
-    def _parse_struct(self, pub):
-        # Name
-        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-        name = self.t.token.value
-        self.t.next_token()
-
-        self.t.expect_token('{')
-
-        access = StructMemberAccess.PRIVATE
-        elements = []
-        while not self.t.match_token('}'):
-            # This is an access type
-            if self.t.match_keyword('pub'):
-
-                if self.t.match_keyword('mut'):
-                    access = StructMemberAccess.PUBLIC_PRIV_MUT
-                else:
-                    access = StructMemberAccess.PUBLIC
-                self.t.expect_token(':')
-
-            elif self.t.match_keyword('mut'):
-                access = StructMemberAccess.PRIVATE_MUT
-                self.t.expect_token(':')
-
-            elif self.t.match_keyword('__global'):
-                access = StructMemberAccess.PUBLIC_MUT
-                self.t.expect_token(':')
-
-            # Probably just a member
-            else:
-                elements.append(self._parse_struct_element(access))
-
-        return StructDecl(pub, name, None, elements)
-
-    def _parse_import_name(self):
-        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-        name = self.t.token.value
-        self.t.next_token()
-
-        while self.t.match_token('.'):
-            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-            name += '.' + self.t.token.value
-            self.t.next_token()
-
-        return name
-
-    def _parse_const(self, pub):
-        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-        name = self.t.token.value
-        self.t.next_token()
-        self.t.expect_token('=')
-        expr = self.parse_expr()
-        return ConstDecl(pub, name, expr)
-
-    def _parse_enum(self, pub):
-        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-        name = self.t.token.value
-        self.t.next_token()
-
-        elements = []
-
-        self.t.expect_token('{')
-        while not self.t.match_token('}'):
-            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-            elements.append(self.t.token.value)
-            self.t.next_token()
-
-        return EnumDecl(pub, name, elements)
-
-    def parse_decl(self, pub):
-        # Anything which may be public
-        if self.t.match_keyword('pub'):
-            return self.parse_decl(True)
-
-        # Parse function
-        elif self.t.match_keyword('fn'):
-            return self._parse_func(pub)
-
-        # Struct declaration
-        elif self.t.match_keyword('struct'):
-            return self._parse_struct(pub)
-
-        elif self.t.match_keyword('enum'):
-            return self._parse_enum(pub)
-
-        # Module declaration
-        elif self.t.is_keyword('module'):
-            assert not pub, "pub may not be used on module"
-            self.t.next_token()
-
-            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
-            mod = ModuleDecl(self.t.token.value)
-            self.t.next_token()
-            return mod
-
-        # Import
-        elif self.t.is_keyword('import'):
-            assert not pub, "pub may not be used on import"
-            self.t.next_token()
-
-            # Multi import
-            if self.t.match_token('('):
-                imports = []
-                while not self.t.match_token(')'):
-                    imports.append(ImportDecl(self._parse_import_name()))
-                return imports
-
-            # Single import
-            else:
-                return ImportDecl(self._parse_import_name())
-
-        # Constants
-        elif self.t.match_keyword('const'):
-            # Multi const decl
-            if self.t.match_token('('):
-                constants = []
-                while not self.t.match_token(')'):
-                    constants.append(self._parse_const(pub))
-                return constants
-
-            # Single const decl
-            else:
-                return self._parse_const(pub)
-
-        else:
-            assert False
-
-    def parse(self):
-        decls = []
-
-        while not self.t.is_token(EofToken):
-            res = self.parse_decl(False)
-            if isinstance(res, list):
-                for r in res:
-                    decls.append(r)
-            else:
-                decls.append(res)
-
-        return decls
\ No newline at end of file
+from vork.tokenizer import *
+from vork.ast import *
+from collections import Counter
+from vork.tokenizer import _LOOKAHEAD
+from bisect import bisect_left, bisect_right
+
+# How strong each binary operator binds, higher binds stronger
+_BINARY_POWER = {
+    '||': 1,
+    '&&': 2,
+    '|': 3,
+    '^': 4,
+    '&': 5,
+    '==': 6, '!=': 6,
+    '<': 7, '>': 7, '<=': 7, '>=': 7,
+    '<<': 8, '>>': 8,
+    '+': 9, '-': 9,
+    '*': 10, '/': 10, '%': 10,
+}
+
+# Assignment operators, these bind the weakest of all
+_ASSIGNMENT_OPS = frozenset(['=', '+=', '-=', '*=', '/=', '%=', '>>=', '<<=', '&=', '^=', '|='])
+
+# Prefix operators which can only be applied once, and the ones that can be repeated
+_PREFIX_ONCE = frozenset(['-', '--', '++', '&'])
+_PREFIX_REPEAT = frozenset(['!', '~', '*'])
+
+
+class Diagnostic:
+
+    def __init__(self, message: str, token: Token, pos: CodePosition):
+        self.message = message
+        self.token = token
+        self.pos = pos
+
+    def __repr__(self):
+        return f'{self.pos.start_line + 1}:{self.pos.start_column + 1}: {self.message}'
+
+
+class Parser:
+
+    def __init__(self, tokenizer: Tokenizer, skim: bool = False, recover: bool = False):
+        """
+        :param skim: Only find where function bodies start and end, and parse each body once
+                     it is first accessed, requires the tokenizer to be over a string
+        :param recover: Collect syntax errors in diagnostics and keep parsing after them, instead
+                        of failing on the first one, unknown characters are reported and skipped.
+                        Function bodies are never skimmed when recovering, so the errors in them
+                        are reported as well
+        """
+        self.t = tokenizer
+        if recover and self.t.errors is None:
+            self.t.errors = []
+        self.t.next_token()
+        self.skim = skim and not recover
+
+        # The source skimmed bodies are parsed from, only fetched once for every parse since an edited
+        # source has to be joined from its chunks
+        self.source = None  # type: str or None
+
+        self.frame = []
+
+        # The syntax errors found so far when recovering, and where we last resynchronized after one
+        self.diagnostics = [] if recover else None  # type: List[Diagnostic] or None
+        self.resync = None  # type: int or None
+
+        # How many times each statement and declaration production was used
+        self.hits = Counter()
+
+    ###################################################################################################################
+    # Productions
+    #
+    # Everything which can nest (expressions, statements and blocks) is parsed by a production, a production is a
+    # generator which yields the productions it needs parsed and gets the parsed node sent back to it. The productions
+    # are driven by _run, which keeps them on an explicit stack, so deeply nested code never runs into the recursion
+    # limit and only costs memory on the heap
+    ###################################################################################################################
+
+    def _run(self, production):
+        stack = []
+        value = None
+        error = None
+        while True:
+            try:
+                if error is None:
+                    child = production.send(value)
+                else:
+                    # Raise the error in the production which asked for the one which failed, just like
+                    # a recursive call would, so it gets a chance to handle it
+                    child = production.throw(error)
+                    error = None
+            except StopIteration as e:
+                if len(stack) == 0:
+                    return e.value
+                value = e.value
+                error = None
+                production = stack.pop()
+            except Exception as e:
+                if len(stack) == 0:
+                    raise
+                error = e
+                production = stack.pop()
+            else:
+                stack.append(production)
+                production = child
+                value = None
+
+    ###################################################################################################################
+    # Expression parsing
+    #
+    # See https://www.tutorialspoint.com/go/go_operators_precedence.htm for the table that I used as reference
+    ###################################################################################################################
+
+    def _parse_literal(self):
+        token = self.t.token
+
+        # Integer literal
+        if isinstance(token, IntToken):
+            self.t.next_token()
+            return ExprIntegerLiteral(token.value)
+
+        # Float literal
+        elif isinstance(token, FloatToken):
+            self.t.next_token()
+            return ExprFloatLiteral(token.value)
+
+        # Identifier
+        elif isinstance(token, IdentToken):
+            self.t.next_token()
+            return ExprIdentifierLiteral(token.value)
+
+        # Array literal
+        elif self.t.match_token('['):
+            exprs = []
+            while not self.t.match_token(']'):
+                exprs.append((yield self._parse_expr()))
+            # TODO: I remember there were some array attributes, will need to look it up
+            return ExprArrayLiteral(exprs)
+
+        # Parens
+        elif self.t.match_token('('):
+            expr = yield self._parse_expr()
+            self.t.expect_token(')')
+            return expr
+
+        else:
+            assert False, f'Unexpected token {self.t.token}'
+
+    # TODO: deref (*), need to figure how to handle the ambiguity with multiplications
+    def _parse_unary(self):
+        """
+        Parses a single operand of a binary expression, that is the prefix operators, the literal
+        and the postfix operators which come after it
+        """
+        token = self.t.token
+
+        # These can be done multiple times, they are applied once the operand is parsed
+        prefix = []
+        while isinstance(token, SymbolToken) and token.value in _PREFIX_REPEAT:
+            prefix.append(token.value)
+            token = self.t.next_token()
+
+        # this can be done only one time
+        once = None
+        if isinstance(token, SymbolToken) and token.value in _PREFIX_ONCE:
+            once = token.value
+            token = self.t.next_token()
+
+        # Implicit enum member access
+        elif isinstance(token, SymbolToken) and token.value == '.':
+            self.t.next_token()
+            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+            expr = ExprImplicitEnum(self.t.token.value)
+            self.t.next_token()
+            return self._apply_prefix(prefix, expr)
+
+        # Check for ranged array literal
+        # TODO: for now we only allow for literals
+        #       to be used in the ranged array, is
+        #       that what we really want?
+        elif self.t.is_next_token('..'):
+            expr_from = yield from self._parse_literal()
+            self.t.expect_token('..')
+            expr_to = yield from self._parse_literal()
+            return self._apply_prefix(prefix, ExprRange(expr_from, expr_to))
+
+        # The literal, the common ones are handled right here
+        if isinstance(token, IdentToken):
+            self.t.next_token()
+            expr = ExprIdentifierLiteral(token.value)
+        elif isinstance(token, IntToken):
+            self.t.next_token()
+            expr = ExprIntegerLiteral(token.value)
+        else:
+            expr = yield from self._parse_literal()
+
+        # Postfix operators
+        token = self.t.token
+        if isinstance(token, SymbolToken) and (token.value == '++' or token.value == '--'):
+            pass
+
+        else:
+            # Top level expressions
+            while True:
+                if isinstance(token, SymbolToken):
+                    # Member access
+                    if token.value == '.':
+                        self.t.next_token()
+                        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+                        expr = ExprMemberAccess(expr, self.t.token.value)
+                        self.t.next_token()
+
+                    # Function call
+                    elif token.value == '(':
+                        self.t.next_token()
+                        args = []
+                        if not self.t.is_token(')'):
+                            args = [(yield self._parse_expr())]
+                            while self.t.match_token(','):
+                                args.append((yield self._parse_expr()))
+                        self.t.expect_token(')')
+                        expr = ExprCall(expr, args)
+
+                    # Array access
+                    elif token.value == '[':
+                        self.t.next_token()
+                        expr = ExprIndexAccess(expr, (yield self._parse_expr()))
+                        self.t.expect_token(']')
+
+                    else:
+                        break
+
+                # In expression
+                elif isinstance(token, KeywordToken) and token.value == 'in':
+                    self.t.next_token()
+                    expr = ExprIn(expr, (yield self._parse_expr()))
+
+                # Nothing more, so we probably done
+                else:
+                    break
+
+                token = self.t.token
+
+        if once is not None:
+            expr = ExprUnary(once, expr)
+
+        return self._apply_prefix(prefix, expr)
+
+    def _apply_prefix(self, prefix: List[str], expr):
+        for op in reversed(prefix):
+            expr = ExprUnary(op, expr)
+        return expr
+
+    def _parse_expr(self):
+        expr = None
+        assign = None
+        while True:
+            # If expression
+            if self.t.match_keyword('if'):
+                condition = yield self._parse_expr()
+                block_true = yield self._parse_stmt_block()
+
+                assert self.t.match_keyword('else')
+                block_false = yield self._parse_stmt_block()
+
+                value = ExprIf(condition, block_true, block_false)
+
+            else:
+                # Binary operators, this is precedence climbing with an operator stack, so
+                # everything is left associative: an operator first completes all of the
+                # operators to its left which bind at least as strong as it does
+                operands = []
+                operators = []
+                while True:
+                    operands.append((yield from self._parse_unary()))
+
+                    token = self.t.token
+                    power = _BINARY_POWER.get(token.value, 0) if isinstance(token, SymbolToken) else 0
+
+                    while len(operators) != 0 and operators[-1][0] >= power:
+                        right = operands.pop()
+                        operands[-1] = ExprBinary(operands[-1], operators.pop()[1], right)
+
+                    if power == 0:
+                        break
+
+                    self.t.next_token()
+                    operators.append((power, token.value))
+
+                value = operands[0]
+
+                # Or expression
+                if self.t.match_keyword('or'):
+                    value = ExprOr(value, (yield self._parse_stmt_block()))
+
+            # Assignment, the right side of the last binary expression is the one assigned to
+            if assign is None:
+                expr = value
+            elif isinstance(expr, ExprBinary):
+                expr = ExprBinary(expr.left, expr.op, ExprBinary(expr.right, assign, value))
+            else:
+                expr = ExprBinary(expr, assign, value)
+
+            token = self.t.token
+            if not isinstance(token, SymbolToken) or token.value not in _ASSIGNMENT_OPS:
+                return expr
+
+            assign = token.value
+            self.t.next_token()
+
+    def parse_expr(self):
+        return self._run(self._parse_expr())
+
+    # def parse_mut_expr(self):
+    #     mut = False
+    #     if self.t.match_keyword('mut'):
+    #         mut = True
+    #     return self.parse_expr(), mut
+
+
+    ###################################################################################################################
+    # Statement parsing
+    ###################################################################################################################
+
+    def _parse_var_decl(self):
+        # Mutable optional
+        mut = False
+        if self.t.match_keyword('mut'):
+            mut = True
+
+        # Get the names
+        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+        names = [self.t.token.value]
+        self.t.next_token()
+
+        while self.t.match_token(','):
+            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+            names.append(self.t.token.value)
+            self.t.next_token()
+
+        # The :=
+        self.t.expect_token(':=')
+
+        # The assigned expression
+        expr = yield self._parse_expr()
+
+        return StmtVarDecl(mut, names, expr)
+
+    def _parse_return_stmt(self):
+        self.t.next_token()
+        exprs = []
+
+        # Return should always be before an end of block so that tells us we have no arguments
+        if not self.t.is_token('}'):
+            exprs.append((yield self._parse_expr()))
+            while self.t.match_token(','):
+                exprs.append((yield self._parse_expr()))
+
+        return StmtReturn(exprs)
+
+    def _parse_assert_stmt(self):
+        self.t.next_token()
+        return StmtAssert((yield self._parse_expr()))
+
+    def _parse_if_stmt(self):
+        self.t.next_token()
+        condition = yield self._parse_expr()
+        block_true = yield self._parse_stmt_block()
+        block_false = None
+
+        # Else part
+        if self.t.match_keyword('else'):
+            # We support `else if` without block before
+            if self.t.is_keyword('if'):
+                block_false = StmtBlock(self.frame[-1], [(yield self._parse_stmt())])
+
+            # The block
+            else:
+                block_false = yield self._parse_stmt_block()
+
+        return StmtIf(condition, block_true, block_false)
+
+    def _parse_for_stmt(self):
+        self.t.next_token()
+
+        # Check if a foreach
+        # will match (for name, name in test) and (for name in test)
+        if self.t.is_next_token(','):
+            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+            index = self.t.token.value
+            self.t.next_token()
+
+            self.t.expect_token(',')
+
+            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+            name = self.t.token.value
+            self.t.next_token()
+
+            self.t.expect_keyword('in')
+
+            expr = yield self._parse_expr()
+            block = yield self._parse_stmt_block()
+            return StmtForeach(index, name, expr, block)
+
+        elif self.t.is_next_keyword('in'):
+            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+            name = self.t.token.value
+            self.t.next_token()
+
+            self.t.expect_keyword('in')
+
+            expr = yield self._parse_expr()
+            block = yield self._parse_stmt_block()
+            return StmtForeach(None, name, expr, block)
+
+        # Check a forever loop
+        if self.t.is_token('{'):
+            block = yield self._parse_stmt_block()
+            return StmtFor(None, None, None, block)
+
+        # This is probably a normal c like loop
+        else:
+            val = None
+            cond = None
+            next = None
+
+            # TODO: support `for condition` loops
+
+            if not self.t.match_token(';'):
+                # TODO: variable declaration inside this argument
+                val = yield self._parse_expr()
+                self.t.expect_token(';')
+
+            if not self.t.match_token(';'):
+                cond = yield self._parse_expr()
+                self.t.expect_token(';')
+
+            if not self.t.is_token('{'):
+                next = yield self._parse_expr()
+
+            block = yield self._parse_stmt_block()
+            return StmtFor(val, cond, next, block)
+
+    def _parse_unsafe_stmt(self):
+        self.t.next_token()
+        return StmtUnsafe((yield self._parse_stmt_block()))
+
+    def _parse_defer_stmt(self):
+        self.t.next_token()
+        return StmtDefer((yield self._parse_stmt_block()))
+
+    def _parse_expr_stmt(self):
+        return StmtExpr((yield from self._parse_expr()))
+
+    def _parse_stmt(self):
+        """
+        Picks the production which parses the current statement
+        """
+        token = self.t.token
+
+        # Statements which start with a keyword or a symbol
+        production = _STMT_PRODUCTIONS.get((type(token), token.value))
+        if production is not None:
+            name, handler = production
+            self.hits[name] += 1
+            return handler(self)
+
+        # Might be variable declaration
+        if isinstance(token, IdentToken):
+            # This verifies we got a variable declaration (a := ) or (a, b, c := )
+            if self.t.is_next_token(':=') or self.t.is_next_token(','):
+                self.hits['var'] += 1
+                return self._parse_var_decl()
+
+        # Fallback on expression parsing
+        self.hits['expr'] += 1
+        return self._parse_expr_stmt()
+
+    def parse_stmt(self):
+        return self._run(self._parse_stmt())
+
+    def _parse_stmt_block(self):
+        self.t.expect_token('{')
+        stmts = []
+        block = StmtBlock(self.frame[-1], stmts)
+
+        self.frame.append(block)
+        depth = len(self.frame)
+        while not self.t.match_token('}'):
+            try:
+                stmts.append((yield self._parse_stmt()))
+            except AssertionError as e:
+                if self.diagnostics is None:
+                    raise
+
+                # The blocks inside the statement never got to pop themselves
+                del self.frame[depth:]
+                stmt = self._recover_stmt(e)
+                if stmt is not None:
+                    stmts.append(stmt)
+
+                # The rest of the block is missing, let the declaration which follows be parsed
+                if self.t.is_token(EofToken) or self._at_decl():
+                    break
+        self.frame.pop()
+
+        return block
+
+    def parse_stmt_block(self):
+        return self._run(self._parse_stmt_block())
+
+    ###################################################################################################################
+    # Declaration parsing
+    ###################################################################################################################
+
+    def parse_type(self):
+        # Map
+        if self.t.match_keyword('map'):
+            self.t.expect_token('[')
+            key_type = self.parse_type()
+            self.t.expect_token(']')
+            value_type = self.parse_type()
+            return VMapType(key_type, value_type)
+
+        # Array
+        if self.t.match_token('['):
+            self.t.expect_token(']')
+            value_type = self.parse_type()
+            return VArrayType(value_type)
+
+        # Optional type
+        if self.t.match_token('?'):
+            return VOptionalType(self.parse_type())
+
+        # Pointer type
+        if self.t.match_token('&'):
+            return VPointerType(self.parse_type())
+
+        # Basic type
+        # TODO: support types from other modules
+        elif self.t.is_token(IdentToken):
+            t = VUnknownType(self.t.token.value)
+            self.t.next_token()
+            return t
+
+        else:
+            assert False, "Invalid type"
+
+    def _parse_func_param(self):
+        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+        name = self.t.token.value
+        self.t.next_token()
+
+        mut = False
+        if self.t.match_keyword('mut'):
+            mut = True
+
+        xtype = self.parse_type()
+
+        return FuncParam(mut, name, xtype)
+
+    def _parse_func(self, pub):
+        self.t.next_token()
+
+        # Method (optional)
+        method = None
+        if self.t.match_token('('):
+            method = self._parse_func_param()
+            self.t.expect_token(')')
+
+        # Name
+        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+        name = self.t.token.value
+        self.t.next_token()
+
+        interop = False
+        if self.t.match_token('.'):
+            assert name == 'C'
+            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+            assert not pub, f'Interop functions can not be public!'
+            interop = True
+            name = self.t.token.value
+            self.t.next_token()
+
+        # Parameters
+        self.t.expect_token('(')
+
+        args = []
+
+        # Parse arguments if any
+        if not self.t.is_token(')'):
+            args.append(self._parse_func_param())
+            while self.t.match_token(','):
+                args.append(self._parse_func_param())
+
+        self.t.expect_token(')')
+
+        # the return value
+        ret_type = None
+        if not self.t.is_token('{') and not self.t.is_token(KeywordToken):
+            ret_type = self.parse_type()
+
+        func = FuncDecl(pub, interop, name, method, args, ret_type)
+
+        # The code
+        if interop:
+            func.block = None
+        elif self.skim:
+            func.parse_body = self._skim_body(func)
+        else:
+            self.frame.append(func)
+            func.block = self.parse_stmt_block()
+            self.frame.pop()
+
+        return func
+
+    def _skim_body(self, func):
+        """
+        Skips over a function body by matching the braces, returns a function which parses it
+        """
+        assert self.t.file is None, 'Function bodies can only be skimmed when tokenizing a string'
+        assert self.t.is_token('{'), f"Expected {{, got {self.t.token}"
+        if self.source is None:
+            self.source = self.t.get_source()
+        stream = self.source
+        start = self.t.token.start
+
+        depth = 0
+        while True:
+            token = self.t.token
+            if isinstance(token, SymbolToken):
+                if token.value == '{':
+                    depth += 1
+                elif token.value == '}':
+                    depth -= 1
+                    if depth == 0:
+                        break
+            elif isinstance(token, EofToken):
+                assert False, 'Unexpected end of file in function body'
+            self.t.next_token()
+        self.t.next_token()
+
+        def parse_body():
+            parser = Parser(Tokenizer(stream, offset=start))
+            parser.frame.append(func)
+            return parser.parse_stmt_block()
+
+        return parse_body
+
+    def _parse_struct_element(self, access: StructMemberAccess):
+        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+        name = self.t.token.value
+        self.t.next_token()
+        xtype = self.parse_type()
+        return StructElement(access, name, xtype)
+
+    def _parse_struct(self, pub):
+        self.t.next_token()
+
+        # Name
+        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+        name = self.t.token.value
+        self.t.next_token()
+
+        self.t.expect_token('{')
+
+        access = StructMemberAccess.PRIVATE
+        elements = []
+        while not self.t.match_token('}'):
+            # This is an access type
+            if self.t.match_keyword('pub'):
+
+                if self.t.match_keyword('mut'):
+                    access = StructMemberAccess.PUBLIC_PRIV_MUT
+                else:
+                    access = StructMemberAccess.PUBLIC
+                self.t.expect_token(':')
+
+            elif self.t.match_keyword('mut'):
+                access = StructMemberAccess.PRIVATE_MUT
+                self.t.expect_token(':')
+
+            elif self.t.match_keyword('__global'):
+                access = StructMemberAccess.PUBLIC_MUT
+                self.t.expect_token(':')
+
+            # Probably just a member
+            else:
+                elements.append(self._parse_struct_element(access))
+
+        return StructDecl(pub, None, name, None, elements)
+
+    def _parse_import_name(self):
+        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+        name = self.t.token.value
+        self.t.next_token()
+
+        while self.t.match_token('.'):
+            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+            name += '.' + self.t.token.value
+            self.t.next_token()
+
+        return name
+
+    def _parse_const(self, pub):
+        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+        name = self.t.token.value
+        self.t.next_token()
+        self.t.expect_token('=')
+        expr = self.parse_expr()
+        return ConstDecl(pub, name, expr)
+
+    def _parse_enum(self, pub):
+        self.t.next_token()
+
+        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+        name = self.t.token.value
+        self.t.next_token()
+
+        elements = []
+
+        self.t.expect_token('{')
+        while not self.t.match_token('}'):
+            assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+            elements.append(self.t.token.value)
+            self.t.next_token()
+
+        return EnumDecl(pub, name, elements)
+
+    def _parse_pub_decl(self, pub):
+        self.t.next_token()
+        return self.parse_decl(True)
+
+    def _parse_module(self, pub):
+        assert not pub, "pub may not be used on module"
+        self.t.next_token()
+
+        assert self.t.is_token(IdentToken), f"Expected name, got {self.t.token}"
+        mod = ModuleDecl(self.t.token.value)
+        self.t.next_token()
+        return mod
+
+    def _parse_import(self, pub):
+        assert not pub, "pub may not be used on import"
+        self.t.next_token()
+
+        # Multi import
+        if self.t.match_token('('):
+            imports = []
+            while not self.t.match_token(')'):
+                imports.append(ImportDecl(self._parse_import_name()))
+            return imports
+
+        # Single import
+        else:
+            return ImportDecl(self._parse_import_name())
+
+    def _parse_consts(self, pub):
+        self.t.next_token()
+
+        # Multi const decl
+        if self.t.match_token('('):
+            constants = []
+            while not self.t.match_token(')'):
+                constants.append(self._parse_const(pub))
+            return constants
+
+        # Single const decl
+        else:
+            return self._parse_const(pub)
+
+    def parse_decl(self, pub):
+        token = self.t.token
+        production = _DECL_PRODUCTIONS.get((type(token), token.value))
+        assert production is not None, f'Unexpected token {token}'
+
+        name, handler = production
+        self.hits[name] += 1
+        return handler(self, pub)
+
+    def parse(self):
+        decls = []
+        self.source = None
+
+        try:
+            while not self.t.is_token(EofToken):
+                try:
+                    res = self.parse_decl(False)
+                except AssertionError as e:
+                    if self.diagnostics is None:
+                        raise
+                    self.frame = []
+                    self._recover_decl(e)
+                    continue
+
+                if isinstance(res, list):
+                    for r in res:
+                        decls.append(r)
+                else:
+                    decls.append(res)
+
+        finally:
+            # The unknown characters the tokenizer skipped, in order with the rest of the errors,
+            # even if we failed on an error we can't recover from
+            if self.diagnostics is not None and len(self.t.errors) != 0:
+                for offset, msg in self.t.errors:
+                    token = Token(offset, offset + 1)
+                    self.diagnostics.append(Diagnostic(msg, token, self.t.get_position(token)))
+                self.diagnostics.sort(key=lambda diagnostic: diagnostic.token.start)
+
+        return decls
+
+
+    ###################################################################################################################
+    # Error recovery
+    #
+    # When recovering, a syntax error is recorded as a diagnostic, and the tokens are skipped until the start of the
+    # next statement or declaration (panic mode), a statement which failed to parse is replaced by a StmtError. An
+    # error right where we resynchronized is the same error showing up again, so it is not reported twice.
+    ###################################################################################################################
+
+    def _report(self, error: AssertionError) -> bool:
+        """
+        Record a diagnostic for an error at the current token, returns False if it was already reported
+        """
+        token = self.t.token
+        if token.start == self.resync:
+            return False
+
+        msg = ", ".join(map(str, error.args))
+        if msg == '':
+            msg = 'Unexpected token'
+        self.diagnostics.append(Diagnostic(msg, token, self.t.get_position(token)))
+        return True
+
+    def _at_decl(self) -> bool:
+        """
+        Does the current token start a declaration, the access modifiers of a struct don't
+        """
+        token = self.t.token
+        if not isinstance(token, KeywordToken) or token.value not in _DECL_KEYWORDS:
+            return False
+        return token.value != 'pub' or not (self.t.is_next_token(':') or self.t.is_next_keyword('mut'))
+
+    def _recover_stmt(self, error: AssertionError) -> StmtError or None:
+        """
+        Skip to the start of the next statement, the end of the block, or the next declaration
+        """
+        reported = self._report(error)
+        line = self.t.get_position(self.t.token).start_line
+
+        depth = 0
+        first = True
+        while not self.t.is_token(EofToken) and not self._at_decl():
+            token = self.t.token
+            if depth == 0:
+                if token.value == '}' and isinstance(token, SymbolToken):
+                    break
+
+                # If we already failed here once we have to skip at least one token
+                if reported or not first:
+                    if isinstance(token, KeywordToken) and (KeywordToken, token.value) in _STMT_PRODUCTIONS:
+                        break
+                    if self.t.get_position(token).start_line != line:
+                        break
+
+            if isinstance(token, SymbolToken):
+                if token.value in _OPENING:
+                    depth += 1
+                elif token.value in _CLOSING and depth != 0:
+                    depth -= 1
+
+            self.t.next_token()
+            first = False
+
+        self.resync = self.t.token.start
+        return StmtError(self.diagnostics[-1].message) if reported else None
+
+    def _recover_decl(self, error: AssertionError):
+        """
+        Skip to the start of the next declaration
+        """
+        if not self._report(error) or not self._at_decl():
+            self.t.next_token()
+        while not self.t.is_token(EofToken) and not self._at_decl():
+            self.t.next_token()
+        self.resync = self.t.token.start
+
+
+# Which production handles a statement, by the kind and value of its first token,
+# along with the name the production is counted under in Parser.hits
+_STMT_PRODUCTIONS = {
+    (KeywordToken, 'return'): ('return', Parser._parse_return_stmt),
+    (KeywordToken, 'assert'): ('assert', Parser._parse_assert_stmt),
+    (KeywordToken, 'if'): ('if', Parser._parse_if_stmt),
+    (SymbolToken, '{'): ('block', Parser._parse_stmt_block),
+    (KeywordToken, 'for'): ('for', Parser._parse_for_stmt),
+    (KeywordToken, 'unsafe'): ('unsafe', Parser._parse_unsafe_stmt),
+    (KeywordToken, 'defer'): ('defer', Parser._parse_defer_stmt),
+    (KeywordToken, 'mut'): ('var', Parser._parse_var_decl),
+}
+
+# Same as above, but for the declarations
+_DECL_PRODUCTIONS = {
+    (KeywordToken, 'pub'): ('pub', Parser._parse_pub_decl),
+    (KeywordToken, 'fn'): ('fn', Parser._parse_func),
+    (KeywordToken, 'struct'): ('struct', Parser._parse_struct),
+    (KeywordToken, 'enum'): ('enum', Parser._parse_enum),
+    (KeywordToken, 'module'): ('module', Parser._parse_module),
+    (KeywordToken, 'import'): ('import', Parser._parse_import),
+    (KeywordToken, 'const'): ('const', Parser._parse_consts),
+}
+
+# Keywords which start a top level declaration, and the brackets which nest
+_DECL_KEYWORDS = frozenset(value for kind, value in _DECL_PRODUCTIONS)
+_OPENING = frozenset('([{')
+_CLOSING = frozenset(')]}')
+
+
+class IncrementalParser:
+    """
+    Keeps a source parsed at the granularity of top level declarations
+
+    The source is split into spans at the declaration keywords which are not inside of any
+    brackets, and each span is parsed on its own. On an edit only the source from the span
+    before the edit and up to where the spans line up with the old ones again is tokenized,
+    and a span whose tokens are the same as the ones of a span it replaces reuses its
+    declarations instead of being parsed again, every replaced span is reused at most once.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+
+        # For every span where it starts in the source, the kinds and values of its tokens,
+        # the declarations parsed from it and the error parsing it raised, if any
+        self.starts = []  # type: List[int]
+        self.keys = []  # type: List[tuple]
+        self.decls = []  # type: List[list]
+        self.errors = []  # type: List[Exception or None]
+
+        self._update(0, 0, 0, 0)
+
+    def get_decls(self) -> list:
+        return [decl for decls in self.decls for decl in decls]
+
+    def edit(self, offset: int, removed: int, inserted: str) -> Tuple[list, list, List[tuple]]:
+        """
+        Apply an edit to the source and reparse what it changed
+
+        :param offset: Where the edit starts
+        :param removed: How many characters were removed from there
+        :param inserted: The text inserted in their place
+        :return: The declarations which were added, the ones which were removed, and (old, new)
+                 pairs of the ones which were changed, matched by their name
+        """
+        old_source = self.source
+        self.source = old_source[:offset] + inserted + old_source[offset + removed:]
+
+        # Scanning the tokens right before the edit might have looked into it, and the
+        # span they are in might now continue into the edited text, so start from there
+        first = max(bisect_right(self.starts, offset - _LOOKAHEAD) - 1, 0)
+        try:
+            return self._update(first, offset + removed, len(inserted) - removed, offset + len(inserted))
+        except:
+            # The tokenizer could not scan the new source, keep the old one
+            self.source = old_source
+            raise
+
+    def _update(self, first: int, old_end: int, delta: int, new_end: int) -> Tuple[list, list, List[tuple]]:
+        """
+        Split and parse the source from the start of the first span, until a span starts where
+        an old span which started after old_end did, once moved by delta. The new source is the
+        same as the old one from new_end and on.
+        """
+        # The first span starts at the first token, and what is before it may have been edited
+        t = Tokenizer(self.source, buffered=True, offset=self.starts[first] if first != 0 else 0)
+        parser = Parser(t)
+
+        # The first old span which is after the edit, we stop once we line up with one of those
+        last = bisect_left(self.starts, old_end)
+
+        # Where the new spans start in the token buffer and in the source
+        indices = []
+        starts = []
+        depth = 0
+        previous = None
+        while True:
+            token = t.token
+            if isinstance(token, EofToken):
+                last = len(self.starts)
+                break
+
+            # A declaration keyword outside of any brackets starts a new span, unless it comes right after pub
+            if previous is None or depth == 0 and isinstance(token, KeywordToken) and token.value in _DECL_KEYWORDS and \
+                    not (isinstance(previous, KeywordToken) and previous.value == 'pub'):
+                while last < len(self.starts) and self.starts[last] + delta < token.start:
+                    last += 1
+                if token.start >= new_end and last < len(self.starts) and self.starts[last] + delta == token.start:
+                    break
+                indices.append(t.index)
+                starts.append(token.start)
+
+            if isinstance(token, SymbolToken):
+                if token.value in _OPENING:
+                    depth += 1
+                elif token.value in _CLOSING and depth != 0:
+                    depth -= 1
+
+            previous = token
+            t.next_token()
+        indices.append(t.index)
+
+        # The spans we replace by their tokens, the same tokens might be in several of them
+        replaced = {}
+        for i in range(first, last):
+            replaced.setdefault(self.keys[i], []).append((self.decls[i], self.errors[i]))
+
+        keys = []
+        decls = []
+        errors = []
+        for i in range(len(starts)):
+            key = tuple((type(token), token.value) for token in t.tokens[indices[i]:indices[i + 1]])
+            spans = replaced.get(key)
+            if spans:
+                span_decls, error = spans.pop(0)
+            else:
+                span_decls, error = self._parse_span(parser, indices[i], indices[i + 1])
+            keys.append(key)
+            decls.append(span_decls)
+            errors.append(error)
+
+        # Diff the declarations, the ones which were removed and added under the same name were changed
+        old = [decl for span_decls in self.decls[first:last] for decl in span_decls]
+        new = [decl for span_decls in decls for decl in span_decls]
+        kept = set(map(id, old)) & set(map(id, new))
+        removed = [decl for decl in old if id(decl) not in kept]
+        added = [decl for decl in new if id(decl) not in kept]
+
+        changed = []
+        removed_names = {decl.name: decl for decl in removed}
+        for decl in list(added):
+            if decl.name in removed_names:
+                old_decl = removed_names.pop(decl.name)
+                removed.remove(old_decl)
+                added.remove(decl)
+                changed.append((old_decl, decl))
+
+        # Move the spans after the edit to where they are now
+        if delta != 0:
+            for i in range(last, len(self.starts)):
+                self.starts[i] += delta
+
+        self.starts[first:last] = starts
+        self.keys[first:last] = keys
+        self.decls[first:last] = decls
+        self.errors[first:last] = errors
+
+        return added, removed, changed
+
+    def _parse_span(self, parser: Parser, start: int, end: int) -> Tuple[list, Exception or None]:
+        """
+        Parse all the declarations in the given range of the token buffer
+        """
+        decls = []
+        parser.t.seek(start)
+        parser.frame = []
+        try:
+            while parser.t.index < end:
+                res = parser.parse_decl(False)
+                if isinstance(res, list):
+                    decls += res
+                else:
+                    decls.append(res)
+            assert parser.t.index == end, f'Unexpected token {parser.t.token}'
+        except AssertionError as e:
+            return [], e
+        return decls, None
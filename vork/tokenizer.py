@@ -1,332 +1,942 @@
-from enum import Enum
-
-
-class UnknownCharacter(Exception):
-    pass
-
-
-class CodePosition:
-
-    def __init__(self, start_line, end_line, start_column, end_column):
-        self.start_line = start_line
-        self.end_line = end_line
-        self.start_column = start_column
-        self.end_column = end_column
-
-
-class Token:
-
-    def __init__(self, pos: CodePosition):
-        self.pos = pos
-
-    def __repr__(self):
-        raise NotImplementedError
-
-
-class EofToken(Token):
-
-    def __init__(self):
-        super(EofToken, self).__init__(None)
-
-    def __repr__(self):
-        return f'<EofToken>'
-
-
-class IntToken(Token):
-
-    def __init__(self, pos: CodePosition, value: int):
-        super(IntToken, self).__init__(pos)
-        self.value = value
-
-    def __repr__(self):
-        return f'<IntToken: value={repr(self.value)}>'
-
-
-class FloatToken(Token):
-
-    def __init__(self, pos: CodePosition, value: float):
-        super(FloatToken, self).__init__(pos)
-        self.value = value
-
-    def __repr__(self):
-        return f'<FloatToken: value={repr(self.value)}>'
-
-
-class IdentToken(Token):
-
-    def __init__(self, pos: CodePosition, value: str):
-        super(IdentToken, self).__init__(pos)
-        self.value = value
-
-    def __repr__(self):
-        return f'<IdentToken: value={repr(self.value)}>'
-
-
-class KeywordToken(Token):
-
-    def __init__(self, pos: CodePosition, value: str):
-        super(KeywordToken, self).__init__(pos)
-        self.value = value
-
-    def __repr__(self):
-        return f'<KeywordToken: value={repr(self.value)}>'
-
-
-class SymbolToken(Token):
-
-    def __init__(self, pos: CodePosition, value: str):
-        super(SymbolToken, self).__init__(pos)
-        self.value = value
-
-    def __repr__(self):
-        return f'<SymbolToken: value={repr(self.value)}>'
-
-
-class Tokenizer:
-
-    def __init__(self, stream: str):
-        self.stream = stream
-        self.line = 0
-        self.column = 0
-        self.token = Token(None)
-
-        self.before = []
-        self.pushes = []
-
-    def _inc_stream(self, times=1):
-        # Increment the first thing
-        while times > 0:
-            was = self.stream[0]
-            self.stream = self.stream[1:]
-            if was == '\n':
-                self.line += 1
-                self.column = 0
-            else:
-                self.column += 1
-            times -= 1
-
-    def push(self):
-        self.pushes.append([self.token])
-
-    def pop(self):
-        """
-        Will take all the parsed elements since the push and
-        add them back
-        """
-        items = self.pushes.pop()
-        self.token = items[0]
-        self.before = items[1:] + self.before
-
-    def discard(self):
-        """
-        Remove the last push
-        """
-        self.pushes.pop()
-
-    def is_token(self, kind) -> bool:
-        if isinstance(kind, str):
-            return isinstance(self.token, SymbolToken) and self.token.value == kind
-        elif isinstance(self.token, kind):
-            return True
-
-    def is_keyword(self, ident) -> bool:
-        if self.is_token(KeywordToken) and self.token.value == ident:
-            return True
-        else:
-            return False
-
-    def match_keyword(self, ident) -> bool:
-        if self.is_keyword(ident):
-            self.next_token()
-            return True
-        else:
-            return False
-
-    def match_token(self, kind) -> bool:
-        if self.is_token(kind):
-            self.next_token()
-            return True
-        else:
-            return False
-
-    def expect_token(self, kind):
-        if self.is_token(kind):
-            self.next_token()
-        else:
-            assert False, kind
-
-    def expect_keyword(self, kind):
-        if self.is_keyword(kind):
-            self.next_token()
-        else:
-            assert False, kind
-
-    def next_token(self):
-        # We have items that have been saved
-        if len(self.before) != 0:
-            self.token = self.before[0]
-            self.before = self.before[1:]
-
-        # Parse a new item
-        else:
-            # Clear unneeded stuff
-            while True:
-                # Consume spaces
-                if len(self.stream) > 0 and self.stream[0].isspace():
-                    self._inc_stream()
-
-                # Consume multiline comment
-                elif len(self.stream) > 2 and self.stream[:2] == '/*':
-                    self._inc_stream(2)
-                    nesting = 1
-                    while nesting > 0 and len(self.stream) > 0:
-                        # Nested comment
-                        if len(self.stream) > 2 and self.stream[:2] == '/*':
-                            nesting += 1
-                            self._inc_stream(2)
-                        elif len(self.stream) > 1 and self.stream[:2] == '*/':
-                            nesting -= 1
-                            self._inc_stream(2)
-                        self._inc_stream()
-
-                # Consume one line comments
-                elif len(self.stream) > 2 and self.stream[:2] == '//':
-                    self._inc_stream(2)
-                    while len(self.stream) > 0:
-                        if self.stream[0] == '\n':
-                            self._inc_stream()
-                            break
-                        self._inc_stream()
-
-                # Nothing left to clear
-                else:
-                    break
-
-            pos = CodePosition(self.line, self.line, self.column, self.column)
-
-            # End of file
-            if len(self.stream) == 0:
-                self.token = EofToken()
-
-            # Integers
-            elif self.stream[0].isdigit():
-                # Figure the base
-                base = 10
-                chars = '0123456789'
-                if self.stream[0] == '0' and len(self.stream) > 3:
-                    if self.stream[1].lower() == 'x':
-                        base = 16
-                        chars = '0123456789abcdefABCDEF'
-                        self._inc_stream(2)
-                    elif self.stream[1].lower() == 'b':
-                        base = 2
-                        chars = '01'
-                        self._inc_stream(2)
-
-                # TODO: octal numbers
-
-                # Get the value and parse it
-                value = ''
-                while len(self.stream) > 0 and self.stream[0] in chars:
-                    value += self.stream[0]
-                    self._inc_stream()
-
-                # Check if this will actually be a float
-                # Only if the base is 10
-                # TODO: more complete float expressions with e or whatever
-                if base == 10 and len(self.stream) > 1 and self.stream[0] == '.' and self.stream[1].isdigit():
-                    self._inc_stream()
-                    after_dot = ''
-                    while len(self.stream) > 0 and self.stream[0].isdigit():
-                        after_dot += self.stream[0]
-                        self._inc_stream()
-                    self.token = FloatToken(pos, float(value + '.' + after_dot))
-                else:
-                    self.token = IntToken(pos, int(value, base))
-
-            # Identifier token or keywords
-            elif self.stream[0].isalpha() or self.stream[0] == '_':
-                value = ''
-                while len(self.stream) > 0 and (self.stream[0].isalnum() or self.stream[0] == '_'):
-                    value += self.stream[0]
-                    self._inc_stream()
-
-                # Check if a keyword
-                if value in [
-                    'fn',
-                    'pub',
-                    'mut',
-                    '__global',
-                    'if',
-                    'else',
-                    'assert',
-                    'for',
-                    'in',
-                    'match',
-                    'enum',
-                    'struct',
-                    'interface',
-                    'return',
-                    'const',
-                    'module',
-                    'import',
-                    'defer',
-                    'go',
-                    'or',
-                    'continue',
-                    'break',
-                    'goto',
-                    'type',
-                    'unsafe',
-                ]:
-                    self.token = KeywordToken(pos, value)
-                else:
-                    self.token = IdentToken(pos, value)
-
-            # Special characters
-            elif self.stream[0] in '()[]{};\'",.:/*-+!%&<>=~^|?':
-
-                # Two character symbols
-                if len(self.stream) > 1 and self.stream[:2] in [
-                    '<<',
-                    '>>',
-                    '&&',
-                    '||',
-                    '!=',
-                    '==',
-                    '<=',
-                    '>=',
-                    '+=',
-                    '-=',
-                    '*=',
-                    '/=',
-                    '%=',
-                    '&=',
-                    '|=',
-                    '^=',
-                    '++',
-                    '--',
-                    ':=',
-                    '..',
-                ]:
-                    self.token = SymbolToken(pos, self.stream[:2])
-                    self._inc_stream(2)
-
-                # Simple symbols
-                else:
-                    self.token = SymbolToken(pos, self.stream[0])
-                    self._inc_stream()
-
-            # Unknown
-            else:
-                assert False, f'Unknown character {self.stream[0]}'
-
-            pos.end_column = self.column
-            pos.end_line = self.line
-
-        # Check if need to add to current save
-        if len(self.pushes) != 0:
-            self.pushes[-1].append(self.token)
-
-        return self.token
-
+import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import *
+from enum import Enum
+
+
+# Patterns used to match a whole lexeme at once from the cursor
+_SPACES = re.compile(r'\s+')
+_COMMENT_MARKS = re.compile(r'/\*|\*/')
+_IDENT = re.compile(r'\w+')
+_FRACTION = re.compile(r'\d*')
+_DIGITS = {
+    2: re.compile(r'[01]*'),
+    10: re.compile(r'[0-9]*'),
+    16: re.compile(r'[0-9a-fA-F]*'),
+}
+
+# The keywords of the language
+KEYWORDS = frozenset([
+    'fn',
+    'pub',
+    'mut',
+    '__global',
+    'if',
+    'else',
+    'assert',
+    'for',
+    'in',
+    'match',
+    'enum',
+    'struct',
+    'interface',
+    'return',
+    'const',
+    'module',
+    'import',
+    'defer',
+    'go',
+    'or',
+    'continue',
+    'break',
+    'goto',
+    'type',
+    'unsafe',
+])
+
+# Characters which start a symbol, and the symbols which are two characters long
+_SYMBOL_CHARS = frozenset('()[]{};\'",.:/*-+!%&<>=~^|?')
+_TWO_CHAR_SYMBOLS = frozenset([
+    '<<',
+    '>>',
+    '&&',
+    '||',
+    '!=',
+    '==',
+    '<=',
+    '>=',
+    '+=',
+    '-=',
+    '*=',
+    '/=',
+    '%=',
+    '&=',
+    '|=',
+    '^=',
+    '++',
+    '--',
+    ':=',
+    '..',
+])
+
+# Keywords and symbols always use these same string objects as their value, and
+# identifiers are interned, so comparing and hashing the values is cheap
+_INTERNED = {value: sys.intern(value) for value in KEYWORDS | _SYMBOL_CHARS | _TWO_CHAR_SYMBOLS}
+
+# How many consumed tokens an unbuffered tokenizer keeps around before dropping them
+_MAX_UNBUFFERED = 256
+
+# How far past the end of a lexeme the scanner may look, when reading from a file
+# we make sure we have at least that much after the lexeme before accepting it
+_LOOKAHEAD = 4
+
+# About how much of the source every chunk of an EditBuffer holds
+_EDIT_CHUNK_SIZE = 2048
+
+
+class UnknownCharacter(Exception):
+    pass
+
+
+class CodePosition:
+
+    __slots__ = ('start_line', 'end_line', 'start_column', 'end_column')
+
+    def __init__(self, start_line, end_line, start_column, end_column):
+        self.start_line = start_line
+        self.end_line = end_line
+        self.start_column = start_column
+        self.end_column = end_column
+
+
+class LineIndex:
+    """
+    Maps offsets in the source to lines and columns, the start of every
+    line is found once and then looked up with a binary search
+    """
+
+    def __init__(self, stream: str = ''):
+        self.starts = array('I', [0])
+        self.add(stream, 0)
+
+    def add(self, text: str, base: int):
+        """
+        Add the lines starting inside a part of the source which starts at the given offset
+        """
+        offset = text.find('\n')
+        while offset != -1:
+            self.starts.append(base + offset + 1)
+            offset = text.find('\n', offset + 1)
+
+    def position(self, start: int, end: int) -> CodePosition:
+        start_line = bisect_right(self.starts, start) - 1
+        end_line = bisect_right(self.starts, end) - 1
+        return CodePosition(start_line, end_line, start - self.starts[start_line], end - self.starts[end_line])
+
+
+class Token:
+
+    __slots__ = ('start', 'end')
+
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        raise NotImplementedError
+
+
+class EofToken(Token):
+
+    __slots__ = ()
+
+    # So every token can be looked up by its kind and value
+    value = None
+
+    def __repr__(self):
+        return f'<EofToken>'
+
+
+class IntToken(Token):
+
+    __slots__ = ('value',)
+
+    def __init__(self, start: int, end: int, value: int):
+        super(IntToken, self).__init__(start, end)
+        self.value = value
+
+    def __repr__(self):
+        return f'<IntToken: value={repr(self.value)}>'
+
+
+class FloatToken(Token):
+
+    __slots__ = ('value',)
+
+    def __init__(self, start: int, end: int, value: float):
+        super(FloatToken, self).__init__(start, end)
+        self.value = value
+
+    def __repr__(self):
+        return f'<FloatToken: value={repr(self.value)}>'
+
+
+class IdentToken(Token):
+
+    __slots__ = ('value',)
+
+    def __init__(self, start: int, end: int, value: str):
+        super(IdentToken, self).__init__(start, end)
+        self.value = value
+
+    def __repr__(self):
+        return f'<IdentToken: value={repr(self.value)}>'
+
+
+class KeywordToken(Token):
+
+    __slots__ = ('value',)
+
+    def __init__(self, start: int, end: int, value: str):
+        super(KeywordToken, self).__init__(start, end)
+        self.value = value
+
+    def __repr__(self):
+        return f'<KeywordToken: value={repr(self.value)}>'
+
+
+class SymbolToken(Token):
+
+    __slots__ = ('value',)
+
+    def __init__(self, start: int, end: int, value: str):
+        super(SymbolToken, self).__init__(start, end)
+        self.value = value
+
+    def __repr__(self):
+        return f'<SymbolToken: value={repr(self.value)}>'
+
+
+# The kinds of tokens, a token kind is stored as its index in this list
+_TOKEN_KINDS = [EofToken, IntToken, FloatToken, IdentToken, KeywordToken, SymbolToken]
+_TOKEN_KIND_INDEX = {kind: i for i, kind in enumerate(_TOKEN_KINDS)}
+
+
+def _decode_value(kind, text: str):
+    """
+    Get the value of a token from its text
+    """
+    if kind is IntToken:
+        prefix = text[:2].lower()
+        if prefix == '0x':
+            return int(text[2:], 16)
+        elif prefix == '0b':
+            return int(text[2:], 2)
+        else:
+            return int(text, 10)
+
+    elif kind is FloatToken:
+        return float(text)
+
+    elif kind is IdentToken:
+        return sys.intern(text)
+
+    else:
+        return _INTERNED[text]
+
+
+class TokenBuffer:
+    """
+    Compact token storage, only the kind and the offsets of each token are
+    stored and the token itself is created from the source when accessed
+    """
+
+    def __init__(self, stream: str):
+        self.stream = stream
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index: int) -> Token:
+        kind = _TOKEN_KINDS[self.kinds[index]]
+        start = self.starts[index]
+        end = self.ends[index]
+        if kind is EofToken:
+            return EofToken(start, end)
+        return kind(start, end, _decode_value(kind, self.stream[start:end]))
+
+    def __delitem__(self, index: slice):
+        del self.kinds[index]
+        del self.starts[index]
+        del self.ends[index]
+
+    def append(self, kind, start: int, end: int):
+        self.kinds.append(_TOKEN_KIND_INDEX[kind])
+        self.starts.append(start)
+        self.ends.append(end)
+
+
+class _Chunk:
+
+    __slots__ = ('text', 'kinds', 'starts', 'ends')
+
+    def __init__(self, text: str, kinds: array, starts: array, ends: array):
+        self.text = text
+        self.kinds = kinds
+        self.starts = starts
+        self.ends = ends
+
+
+class EditBuffer:
+    """
+    Token storage which can be edited in time proportional to the edit
+
+    The source is split into chunks at token boundaries, and the offsets of every token
+    are stored relative to the start of its chunk. An edit only rebuilds the chunks it
+    touches, the chunks after it are moved by changing where they start, so the tokens
+    in them are never visited. Tokens are created from the source when accessed.
+    """
+
+    def __init__(self, stream: str, kinds: array, starts: array, ends: array, chunk_size: int = _EDIT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+        # Where every chunk starts in the source and in the buffer
+        self.chunks = []  # type: List[_Chunk]
+        self.bases = []  # type: List[int]
+        self.firsts = []  # type: List[int]
+        self.length = len(kinds)
+        self.chunks, self.bases, self.firsts = self._split(stream, 0, 0, kinds, starts, ends)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        chunk_index = bisect_right(self.firsts, index) - 1
+        chunk = self.chunks[chunk_index]
+        local = index - self.firsts[chunk_index]
+        kind = _TOKEN_KINDS[chunk.kinds[local]]
+        start = chunk.starts[local]
+        end = chunk.ends[local]
+        base = self.bases[chunk_index]
+        if kind is EofToken:
+            return EofToken(base + start, base + end)
+        return kind(base + start, base + end, _decode_value(kind, chunk.text[start:end]))
+
+    def end(self, index: int) -> int:
+        """
+        Where the token at the given index ends, without creating it
+        """
+        chunk_index = bisect_right(self.firsts, index) - 1
+        return self.bases[chunk_index] + self.chunks[chunk_index].ends[index - self.firsts[chunk_index]]
+
+    def chunk_of(self, index: int) -> int:
+        """
+        The index of the chunk the token at the given index is in
+        """
+        return bisect_right(self.firsts, index) - 1
+
+    def _split(self, text: str, base: int, first: int, kinds: array, starts: array,
+               ends: array) -> Tuple[List[_Chunk], List[int], List[int]]:
+        """
+        Split a run of tokens into chunks, the text starts at base in the source and the first token is at first
+        in the buffer, the offsets of the tokens are relative to the start of the text
+        """
+        chunks = []
+        bases = []
+        firsts = []
+        count = len(kinds)
+        i = 0
+        chunk_start = 0
+        while i < count:
+            # A chunk ends after the first token which ends chunk_size past its start
+            j = min(bisect_left(ends, chunk_start + self.chunk_size, i) + 1, count)
+            chunk_end = ends[j - 1] if j != count else len(text)
+            chunks.append(_Chunk(
+                text[chunk_start:chunk_end],
+                kinds[i:j],
+                array('I', [start - chunk_start for start in starts[i:j]]),
+                array('I', [end - chunk_start for end in ends[i:j]]),
+            ))
+            bases.append(base + chunk_start)
+            firsts.append(first + i)
+            chunk_start = chunk_end
+            i = j
+        return chunks, bases, firsts
+
+    def replace(self, first_chunk: int, last_chunk: int, text: str, kinds: array, starts: array, ends: array,
+                delta: int):
+        """
+        Replace the chunks in [first_chunk, last_chunk) with a run of tokens, which starts where the first of them
+        did, and move the chunks after them by delta characters
+        """
+        chunks, bases, firsts = self._split(text, self.bases[first_chunk], self.firsts[first_chunk], kinds, starts, ends)
+        old_count = (self.firsts[last_chunk] if last_chunk < len(self.chunks) else self.length) - self.firsts[first_chunk]
+        count_delta = len(kinds) - old_count
+
+        self.chunks[first_chunk:last_chunk] = chunks
+        self.bases[first_chunk:last_chunk] = bases
+        self.firsts[first_chunk:last_chunk] = firsts
+        self.length += count_delta
+
+        for i in range(first_chunk + len(chunks), len(self.chunks)):
+            self.bases[i] += delta
+            self.firsts[i] += count_delta
+
+
+def _starts_token(char: str) -> bool:
+    """
+    Can a token start with the given character
+    """
+    return char.isdigit() or char.isalpha() or char == '_' or char in _SYMBOL_CHARS
+
+
+def _first_ending_after(tokens: List[Token], offset: int) -> int:
+    """
+    Binary search for the first token which ends after the given offset
+    """
+    low = 0
+    high = len(tokens)
+    while low < high:
+        middle = (low + high) // 2
+        if tokens[middle].end <= offset:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class Tokenizer:
+
+    def __init__(self, stream: str or TextIO, buffered: bool = False, compact: bool = False, chunk_size: int = 1 << 16,
+                 offset: int = 0):
+        """
+        :param stream: The source, either as a string or as a file to read it from
+        :param buffered: Keep every scanned token in the token buffer, otherwise tokens which
+                         can not be backtracked to anymore are dropped as we go
+        :param compact: Store the tokens in a TokenBuffer instead of as token objects
+        :param chunk_size: How much to read from the file at a time
+        :param offset: Where in the source to start tokenizing, only for string sources
+        """
+        # When reading from a file only a window of the source is kept in `stream`,
+        # `base` is the offset of the window in the file
+        if isinstance(stream, str):
+            self.file = None
+            self.stream = stream
+        else:
+            assert not compact, 'Compact tokens can not be used when reading from a file'
+            self.file = stream
+            self.stream = ''
+        self.base = 0
+        self.chunk_size = chunk_size
+        self.read_all = self.file is None
+
+        self.buffered = buffered
+        self.compact = compact
+        assert offset == 0 or self.file is None, 'Can only start from an offset when tokenizing a string'
+        self.offset = offset
+        self.lines = None  # type: LineIndex
+        self.token = Token(0, 0)
+
+        # Every token scanned so far, the current token is at `index`
+        self.tokens = TokenBuffer(stream) if compact else []  # type: List[Token] or TokenBuffer
+        self.index = -1
+        self.pushes = []  # type: List[int]
+        self.scanned_eof = False
+
+        # When not None unknown characters are skipped instead of failing, and where
+        # each of them is along with the error is added to this list
+        self.errors = None  # type: List[Tuple[int, str]] or None
+
+    def get_position(self, token: Token) -> CodePosition:
+        """
+        Get the line and column a token starts and ends at
+        """
+        return self._get_lines().position(token.start, token.end)
+
+    def get_line(self, line: int) -> str:
+        """
+        Get the text of a line in the source, without the new line
+        """
+        starts = self._get_lines().starts
+        start = starts[line]
+        end = starts[line + 1] - 1 if line + 1 < len(starts) else None
+
+        if self._is_whole():
+            return self.stream[start:end]
+
+        text = ''
+        for base, chunk in self._reread():
+            if (end is None or base < end) and base + len(chunk) > start:
+                text += chunk[max(start - base, 0):None if end is None else end - base]
+        return text
+
+    def get_source(self) -> str:
+        """
+        Get the whole source
+        """
+        if self._is_whole():
+            return self.stream
+        return ''.join(chunk for base, chunk in self._reread())
+
+    def _is_whole(self) -> bool:
+        # When reading from a file or once the source was edited `stream` is only a part of it
+        return self.file is None and not isinstance(self.tokens, EditBuffer)
+
+    def _get_lines(self) -> LineIndex:
+        if self.lines is None:
+            if self._is_whole():
+                self.lines = LineIndex(self.stream)
+            else:
+                self.lines = LineIndex()
+                for base, chunk in self._reread():
+                    self.lines.add(chunk, base)
+        return self.lines
+
+    def _reread(self) -> Iterator[Tuple[int, str]]:
+        """
+        Read the whole file again from the start, yields every chunk with the offset it starts at
+
+        An edited source is read from the chunks of its token buffer
+        """
+        if self.file is None:
+            yield from zip(self.tokens.bases, (chunk.text for chunk in self.tokens.chunks))
+            return
+
+        position = self.file.tell()
+        self.file.seek(0)
+        base = 0
+        chunk = self.file.read(self.chunk_size)
+        while chunk != '':
+            yield base, chunk
+            base += len(chunk)
+            chunk = self.file.read(self.chunk_size)
+        self.file.seek(position)
+
+    def _read_more(self) -> bool:
+        """
+        Read the next chunk of the file into the window, dropping what was already scanned
+        """
+        if self.read_all:
+            return False
+
+        # Read at least as much as we have left, so a really long lexeme is
+        # not scanned over and over again
+        chunk = self.file.read(max(self.chunk_size, len(self.stream) - self.offset))
+        if chunk == '':
+            self.read_all = True
+            return False
+
+        self.base += self.offset
+        self.stream = self.stream[self.offset:] + chunk
+        self.offset = 0
+        return True
+
+    def _skip(self) -> int:
+        """
+        Skip all the spaces and comments after the cursor, returns the offset of the next lexeme
+        """
+        stream = self.stream
+        end = len(stream)
+        offset = self.offset
+        errors = self.errors
+
+        while True:
+            # Consume spaces
+            match = _SPACES.match(stream, offset)
+            if match is not None:
+                offset = match.end()
+
+            # Consume multiline comment
+            elif end - offset > 2 and stream.startswith('/*', offset):
+                offset += 2
+                nesting = 1
+                while nesting > 0 and offset < end:
+                    match = _COMMENT_MARKS.search(stream, offset)
+                    if match is None:
+                        offset = end
+
+                    # Nested comment
+                    elif match.group() == '/*':
+                        if end - match.start() > 2:
+                            nesting += 1
+                            offset = match.start() + 3
+                        else:
+                            offset = end
+
+                    else:
+                        nesting -= 1
+                        offset = match.start() + 3
+
+                # The character right after the end of the comment is consumed
+                # as well, so make sure we did not run past the end of the file
+                offset = min(offset, end)
+
+            # Consume one line comments
+            elif end - offset > 2 and stream.startswith('//', offset):
+                offset = stream.find('\n', offset + 2)
+                offset = end if offset == -1 else offset + 1
+
+            # Skip characters which can not start a token when recovering, a lexeme might be
+            # scanned again once more of the file is read so each one is only reported once
+            elif errors is not None and offset < end and not _starts_token(stream[offset]):
+                if len(errors) == 0 or errors[-1][0] < self.base + offset:
+                    errors.append((self.base + offset, f'Unknown character {stream[offset]}'))
+                offset += 1
+
+            # Nothing left to clear
+            else:
+                return offset
+
+    def push(self):
+        self.pushes.append(self.index)
+
+    def pop(self):
+        """
+        Will go back to the token we were at when we pushed
+        """
+        self.index = self.pushes.pop()
+        self.token = self.tokens[self.index]
+
+    def discard(self):
+        """
+        Remove the last push
+        """
+        self.pushes.pop()
+
+    def seek(self, index: int):
+        """
+        Make the token at the given index of the buffer the current one
+        """
+        assert self.buffered and len(self.pushes) == 0, 'Can only seek in a buffered tokenizer'
+        self.index = index
+        self.token = self.tokens[index]
+
+    def peek(self, ahead=1) -> Token:
+        """
+        Get the token which is the given amount of tokens after the current one, without moving to it
+        """
+        index = self.index + ahead
+        while index >= len(self.tokens):
+            # Never scan past the end of the file
+            if self.scanned_eof:
+                return self.tokens[-1]
+            self._scan_token()
+        return self.tokens[index]
+
+    def tokenize(self) -> List[Token]:
+        """
+        Scan the whole stream into the token buffer at once, returns the buffer
+
+        Should be used with a buffered tokenizer, otherwise the consumed tokens
+        will be dropped from the buffer once parsing starts
+        """
+        while not self.scanned_eof:
+            self._scan_token()
+        return self.tokens
+
+    def retokenize(self, tokens: List[Token] or TokenBuffer or EditBuffer, offset: int, removed: int,
+                   inserted: str) -> Tuple[EditBuffer, int, int, int]:
+        """
+        Apply an edit to the source and update a fully scanned token buffer of it to match
+
+        Only the tokens from the last one the edit can not affect and up to where the
+        new tokens line up with the old ones again are scanned. The first edit moves the
+        tokens into an EditBuffer, after that only the chunks of it which the edit touches
+        are rebuilt. The tokenizer is rewound to the start of the updated buffer so it can
+        be parsed again.
+
+        :param tokens: The token buffer of the source before the edit
+        :param offset: Where the edit starts
+        :param removed: How many characters were removed from there
+        :param inserted: The text inserted in their place
+        :return: The updated buffer, and the range of tokens which changed, the new tokens
+                 are at [start, new_end) and they replaced what used to be at [start, old_end)
+        """
+        assert self.file is None and self.buffered, 'Can only retokenize a buffered tokenizer of a string'
+        assert len(tokens) != 0 and isinstance(tokens[-1], EofToken), 'The token buffer must be fully scanned'
+
+        if not isinstance(tokens, EditBuffer):
+            if isinstance(tokens, TokenBuffer):
+                kinds, starts, ends = tokens.kinds, tokens.starts, tokens.ends
+            else:
+                kinds = array('B', [_TOKEN_KIND_INDEX[type(token)] for token in tokens])
+                starts = array('I', [token.start for token in tokens])
+                ends = array('I', [token.end for token in tokens])
+            tokens = EditBuffer(self.stream, kinds, starts, ends)
+        chunks = tokens.chunks
+
+        edit_end = offset + removed
+        delta = len(inserted) - removed
+
+        # Scanning a token might have looked a bit past its end, so start from
+        # the last token which ends far enough before the edit
+        start = _first_ending_after(tokens, offset - _LOOKAHEAD)
+        first_chunk = tokens.chunk_of(start)
+        base = tokens.bases[first_chunk]
+
+        # Scan a window of the source which starts at the first chunk, and is made of the
+        # chunks the edit is in, and more of the following ones as the scanning needs them
+        next_chunk = max(bisect_right(tokens.bases, edit_end), first_chunk + 1)
+        text = ''.join(chunk.text for chunk in chunks[first_chunk:next_chunk])
+        window = text[:offset - base] + inserted + text[edit_end - base:]
+
+        # Scan until a token ends exactly where an old token which is after the
+        # edit ended, from there on the source is the same and so are the tokens
+        kinds = array('B')
+        starts = array('I')
+        ends = array('I')
+        scan_offset = tokens.end(start - 1) - base if start != 0 else 0
+        old_end = start
+        old_stream = self.stream
+        while True:
+            self.stream = window
+            self.offset = scan_offset
+            try:
+                kind, token_start, token_end = self._scan()
+
+                # Make sure the lexeme was not cut by the end of the window
+                if len(window) - token_end < _LOOKAHEAD and next_chunk < len(chunks):
+                    needed = max(tokens.chunk_size, len(window) - scan_offset)
+                    more = []
+                    while needed > 0 and next_chunk < len(chunks):
+                        more.append(chunks[next_chunk].text)
+                        needed -= len(more[-1])
+                        next_chunk += 1
+                    window += ''.join(more)
+                    continue
+
+                if kind is not EofToken:
+                    _decode_value(kind, window[token_start:token_end])
+            except:
+                # Leave everything as it was before the edit
+                self.stream = old_stream
+                raise
+
+            scan_offset = token_end
+            kinds.append(_TOKEN_KIND_INDEX[kind])
+            starts.append(token_start)
+            ends.append(token_end)
+
+            if kind is EofToken:
+                old_end = len(tokens)
+                break
+
+            # The end of file token is never lined up with, we always scan it again
+            token_end += base
+            while old_end < len(tokens) - 1 and (tokens.end(old_end) < edit_end or tokens.end(old_end) + delta < token_end):
+                old_end += 1
+
+            if old_end < len(tokens) - 1 and tokens.end(old_end) + delta == token_end:
+                old_end += 1
+                break
+
+        new_end = start + len(kinds)
+
+        # The chunks we replace are the ones the window covers, and the last replaced token
+        # might be in a chunk after them, their tokens before and after the change are kept
+        while next_chunk <= tokens.chunk_of(old_end - 1):
+            window += chunks[next_chunk].text
+            next_chunk += 1
+
+        local = start - tokens.firsts[first_chunk]
+        chunk = chunks[first_chunk]
+        kinds[:0] = chunk.kinds[:local]
+        starts[:0] = chunk.starts[:local]
+        ends[:0] = chunk.ends[:local]
+
+        if old_end < len(tokens):
+            for i in range(tokens.chunk_of(old_end), next_chunk):
+                local = max(old_end - tokens.firsts[i], 0)
+                chunk = chunks[i]
+                shift = tokens.bases[i] + delta - base
+                kinds += chunk.kinds[local:]
+                starts += array('I', [token_start + shift for token_start in chunk.starts[local:]])
+                ends += array('I', [token_end + shift for token_end in chunk.ends[local:]])
+
+        tokens.replace(first_chunk, next_chunk, window, kinds, starts, ends, delta)
+
+        # The source is now only kept in the chunks, the window is what we scanned last
+        self.stream = window
+        self.base = base
+        self.lines = None
+        self.tokens = tokens
+        self.index = -1
+        self.token = Token(0, 0)
+        self.pushes = []
+        self.scanned_eof = True
+
+        return tokens, start, old_end, new_end
+
+    def __iter__(self) -> Iterator[Token]:
+        """
+        Iterate the tokens of the source, they are only scanned as they are needed
+        """
+        while True:
+            token = self.next_token()
+            yield token
+            if isinstance(token, EofToken):
+                break
+
+    def is_token(self, kind) -> bool:
+        if isinstance(kind, str):
+            return isinstance(self.token, SymbolToken) and self.token.value == kind
+        elif isinstance(self.token, kind):
+            return True
+
+    def is_keyword(self, ident) -> bool:
+        if isinstance(self.token, KeywordToken) and self.token.value == ident:
+            return True
+        else:
+            return False
+
+    def is_next_token(self, kind, ahead=1) -> bool:
+        """
+        Same as is_token, but checks the token which is the given amount of tokens after the current one
+        """
+        token = self.peek(ahead)
+        if isinstance(kind, str):
+            return isinstance(token, SymbolToken) and token.value == kind
+        else:
+            return isinstance(token, kind)
+
+    def is_next_keyword(self, ident, ahead=1) -> bool:
+        """
+        Same as is_keyword, but checks the token which is the given amount of tokens after the current one
+        """
+        token = self.peek(ahead)
+        return isinstance(token, KeywordToken) and token.value == ident
+
+    def match_keyword(self, ident) -> bool:
+        if self.is_keyword(ident):
+            self.next_token()
+            return True
+        else:
+            return False
+
+    def match_token(self, kind) -> bool:
+        if self.is_token(kind):
+            self.next_token()
+            return True
+        else:
+            return False
+
+    def expect_token(self, kind):
+        if self.is_token(kind):
+            self.next_token()
+        else:
+            assert False, kind
+
+    def expect_keyword(self, kind):
+        if self.is_keyword(kind):
+            self.next_token()
+        else:
+            assert False, kind
+
+    def next_token(self):
+        if self.index + 1 == len(self.tokens):
+            # Stay on the end of file once we got to it
+            if isinstance(self.token, EofToken):
+                return self.token
+
+            self._scan_token()
+
+        self.index += 1
+        self.token = self.tokens[self.index]
+
+        # Drop the tokens we can not get back to anymore
+        if not self.buffered and self.index >= _MAX_UNBUFFERED and len(self.pushes) == 0:
+            del self.tokens[:self.index]
+            self.index = 0
+
+        return self.token
+
+    def _scan_token(self):
+        """
+        Scan the next token from the stream into the token buffer
+        """
+        kind, start, end = self._scan()
+
+        # Make sure the lexeme was not cut by the end of what we read so far
+        while len(self.stream) - end < _LOOKAHEAD and self._read_more():
+            kind, start, end = self._scan()
+
+        value = None if kind is EofToken else _decode_value(kind, self.stream[start:end])
+        self.offset = end
+        start += self.base
+        end += self.base
+
+        if kind is EofToken:
+            self.scanned_eof = True
+
+        if self.compact:
+            self.tokens.append(kind, start, end)
+        elif kind is EofToken:
+            self.tokens.append(EofToken(start, end))
+        else:
+            self.tokens.append(kind(start, end, value))
+
+    def _scan(self) -> Tuple[type, int, int]:
+        """
+        Scan the next token from the stream, returns the kind of the token and where it starts and ends
+        """
+        stream = self.stream
+        start = self._skip()
+        offset = start
+        remaining = len(stream) - offset
+
+        # End of file
+        if remaining == 0:
+            kind = EofToken
+
+        # Integers
+        elif stream[offset].isdigit():
+            # Figure the base
+            base = 10
+            if stream[offset] == '0' and remaining > 3:
+                if stream[offset + 1].lower() == 'x':
+                    base = 16
+                    offset += 2
+                elif stream[offset + 1].lower() == 'b':
+                    base = 2
+                    offset += 2
+
+            # TODO: octal numbers
+
+            # Get the value
+            offset = _DIGITS[base].match(stream, offset).end()
+
+            # Check if this will actually be a float
+            # Only if the base is 10
+            # TODO: more complete float expressions with e or whatever
+            if base == 10 and len(stream) - offset > 1 and stream[offset] == '.' and stream[offset + 1].isdigit():
+                offset = _FRACTION.match(stream, offset + 1).end()
+                kind = FloatToken
+            else:
+                kind = IntToken
+
+        # Identifier token or keywords
+        elif stream[offset].isalpha() or stream[offset] == '_':
+            offset = _IDENT.match(stream, offset).end()
+
+            # Check if a keyword
+            if stream[start:offset] in KEYWORDS:
+                kind = KeywordToken
+            else:
+                kind = IdentToken
+
+        # Special characters
+        elif stream[offset] in _SYMBOL_CHARS:
+            kind = SymbolToken
+
+            # Two character symbols
+            if stream[offset:offset + 2] in _TWO_CHAR_SYMBOLS:
+                offset += 2
+
+            # Simple symbols
+            else:
+                offset += 1
+
+        # Unknown
+        else:
+            assert False, f'Unknown character {stream[offset]}'
+
+        return kind, start, offset
@@ -0,0 +1,199 @@
+from vork.ast import *
+from vork.arena import CHILD_FIELDS
+from typing import *
+
+###################################################################################################################
+# Children
+#
+# The children of a node are the ones in its child fields, which come from the arena schema so both agree on what
+# the children of a node are
+###################################################################################################################
+
+def iter_children(node) -> Iterator:
+    """
+    The children of a node, in order
+    """
+    for name, many in CHILD_FIELDS[type(node)]:
+        value = getattr(node, name)
+        if value is None:
+            continue
+        if many:
+            yield from value
+        else:
+            yield value
+
+
+def _find_handler(visitor, prefix: str, cls: type):
+    # The handler of the closest base class, so visit_Expr handles every expression without its own handler
+    for base in cls.__mro__:
+        handler = getattr(visitor, prefix + base.__name__, None)
+        if handler is not None:
+            return handler
+    return None
+
+
+###################################################################################################################
+# Visitor
+###################################################################################################################
+
+class Visitor:
+    """
+    Walks a tree of nodes without recursion
+
+    visit_<node class name>(node) is called before the children of a node, returning False from it skips the
+    children, and leave_<node class name>(node) after them. A node without a handler of its own uses the one of
+    its closest base class (like visit_Expr or visit_Stmt). The handler of every class is only looked up once.
+    """
+
+    def __init__(self):
+        self._visit_handlers = {}  # type: Dict[type, Callable or None]
+        self._leave_handlers = {}  # type: Dict[type, Callable or None]
+
+    def _visit_handler(self, cls: type):
+        try:
+            return self._visit_handlers[cls]
+        except KeyError:
+            handler = self._visit_handlers[cls] = _find_handler(self, 'visit_', cls)
+            return handler
+
+    def _leave_handler(self, cls: type):
+        try:
+            return self._leave_handlers[cls]
+        except KeyError:
+            handler = self._leave_handlers[cls] = _find_handler(self, 'leave_', cls)
+            return handler
+
+    def visit(self, node):
+        """
+        Visit a node and everything under it
+        """
+        walk(node, self)
+
+
+def walk(node, *visitors: Visitor):
+    """
+    Run several visitors over a tree in a single traversal, every node is visited by all of them in the order
+    they were given in. A visitor which skips the children of a node only skips them for itself.
+    """
+    # Every entry is a node, the visitors which still visit it, and whether it is being left
+    stack = [(node, visitors, False)]
+    pop = stack.pop
+    push = stack.append
+    while len(stack) != 0:
+        node, active, leaving = pop()
+        cls = type(node)
+
+        if leaving:
+            for visitor in active:
+                handler = visitor._leave_handler(cls)
+                if handler is not None:
+                    handler(node)
+            continue
+
+        entered = []
+        for visitor in active:
+            handler = visitor._visit_handler(cls)
+            if handler is None or handler(node) is not False:
+                entered.append(visitor)
+        if len(entered) == 0:
+            continue
+        entered = tuple(entered)
+
+        for visitor in entered:
+            if visitor._leave_handler(cls) is not None:
+                push((node, entered, True))
+                break
+
+        children = []
+        for name, many in CHILD_FIELDS[cls]:
+            value = getattr(node, name)
+            if value is None:
+                continue
+            if many:
+                children += value
+            else:
+                children.append(value)
+        for child in reversed(children):
+            push((child, entered, False))
+
+
+###################################################################################################################
+# Transformer
+###################################################################################################################
+
+class Transformer(Visitor):
+    """
+    Rebuilds a tree bottom up without recursion
+
+    transform_<node class name>(node) is called after the children of a node were transformed and returns what
+    replaces the node, which may be the node itself. Handlers are looked up like the ones of a Visitor.
+
+    Types are shared by every node which uses them, so a type is never changed in place, if any of its children
+    were replaced a new type is created instead.
+    """
+
+    def __init__(self):
+        super(Transformer, self).__init__()
+        self._transform_handlers = {}  # type: Dict[type, Callable or None]
+
+    def _transform_handler(self, cls: type):
+        try:
+            return self._transform_handlers[cls]
+        except KeyError:
+            handler = self._transform_handlers[cls] = _find_handler(self, 'transform_', cls)
+            return handler
+
+    def transform(self, node):
+        """
+        Transform a node and everything under it, returning what replaces the node
+        """
+        # Transformed children are pushed on the results stack, and their parent pops them once it is left
+        results = []
+        stack = [(node, False)]
+        pop = stack.pop
+        push = stack.append
+        while len(stack) != 0:
+            node, leaving = pop()
+            cls = type(node)
+            fields = CHILD_FIELDS[cls]
+
+            if not leaving:
+                push((node, True))
+                for name, many in reversed(fields):
+                    value = getattr(node, name)
+                    if value is None:
+                        continue
+                    if many:
+                        for child in reversed(value):
+                            push((child, False))
+                    else:
+                        push((value, False))
+                continue
+
+            # The results of the children are in order at the top of the stack
+            values = []
+            changed = False
+            for name, many in reversed(fields):
+                value = getattr(node, name)
+                if value is None:
+                    new = None
+                elif many:
+                    new = results[len(results) - len(value):]
+                    del results[len(results) - len(value):]
+                    changed = changed or any(a is not b for a, b in zip(value, new))
+                else:
+                    new = results.pop()
+                    changed = changed or new is not value
+                values.append((name, new))
+
+            if changed:
+                if isinstance(node, VType):
+                    node = cls(*(value for name, value in reversed(values)))
+                else:
+                    for name, value in values:
+                        setattr(node, name, value)
+
+            handler = self._transform_handler(cls)
+            results.append(node if handler is None else handler(node))
+
+        return results[0]